@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.db.models import Model
+from django.utils.html import format_html
 from typing import List, Type, Dict, Any, Optional
+from .models import SlowQuery
 
 
 class BaseModelAdmin(admin.ModelAdmin):
@@ -42,3 +44,45 @@ class BaseModelAdmin(admin.ModelAdmin):
         Get the list of fields to search by in the admin list view
         """
         return self.search_fields
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the slow query log, most total time first
+    """
+    list_display = ('short_sql', 'call_site', 'calls', 'total_ms', 'mean', 'max_ms', 'has_plan', 'last_seen')
+    list_filter = ('database', 'last_seen')
+    search_fields = ('normalized_sql', 'call_site', 'fingerprint')
+    ordering = ('-total_ms',)
+    readonly_fields = (
+        'fingerprint', 'database', 'call_site', 'calls', 'total_ms', 'max_ms', 'first_seen', 'last_seen',
+        'sql', 'plan', 'explained_at',
+    )
+    exclude = ('normalized_sql', 'explain')
+
+    @admin.display(description='SQL')
+    def short_sql(self, obj):
+        return obj.normalized_sql[:120]
+
+    @admin.display(description='Mean ms', ordering='total_ms')
+    def mean(self, obj):
+        return f'{obj.mean_ms:.1f}'
+
+    @admin.display(description='Plan', boolean=True)
+    def has_plan(self, obj):
+        return bool(obj.explain)
+
+    @admin.display(description='SQL')
+    def sql(self, obj):
+        return format_html('<pre style="white-space: pre-wrap">{}</pre>', obj.normalized_sql)
+
+    @admin.display(description='EXPLAIN')
+    def plan(self, obj):
+        return format_html('<pre>{}</pre>', obj.explain or '-')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -15,3 +15,14 @@ class CoreConfig(AppConfig):
             import apps.core.signals
         except ImportError:
             pass
+        else:
+            apps.core.signals.register_base_model_signals()
+
+        from .metrics import connect_celery_signals
+        connect_celery_signals()
+
+        from .tracing import configure_tracing
+        configure_tracing()
+
+        from .slow_queries import configure_slow_query_log
+        configure_slow_query_log()
@@ -0,0 +1,83 @@
+"""
+Performance budgets of the test suite.
+
+Tests declare query-count and relative timing budgets per endpoint with
+BaseAPITestCase.query_budget and assert_scales (apps.core.tests). Every
+check is recorded; when the REPORT_ENV variable names a file, records are
+appended to it as JSON lines, so parallel test processes all contribute.
+BudgetReportRunner (apps.core.test_runner) reads them back and prints the
+checks closest to, or over, their budget.
+"""
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+REPORT_ENV = 'PERFORMANCE_BUDGET_REPORT'
+
+
+@dataclass
+class BudgetRecord:
+    test: str
+    name: str
+    queries: int
+    max_queries: int
+    # Query counts per fixture size, for scaling checks
+    sizes: Optional[List[int]] = None
+    counts: Optional[List[int]] = None
+    time_ratio: Optional[float] = None
+    max_time_ratio: Optional[float] = None
+
+    @property
+    def usage(self) -> float:
+        """
+        Largest share of a budget used: 1.0 is exactly on budget
+        """
+        if self.max_queries:
+            usages = [self.queries / self.max_queries]
+        else:
+            usages = [float('inf') if self.queries else 0.0]
+        if self.time_ratio is not None and self.max_time_ratio:
+            usages.append(self.time_ratio / self.max_time_ratio)
+        return max(usages)
+
+
+def record(entry: BudgetRecord) -> None:
+    path = os.environ.get(REPORT_ENV)
+    if not path:
+        return
+    # One short append per record, so concurrent writers do not interleave
+    with open(path, 'a') as f:
+        f.write(json.dumps(asdict(entry)) + '\n')
+
+
+def load(path: str) -> List[BudgetRecord]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [BudgetRecord(**json.loads(line)) for line in f if line.strip()]
+
+
+def format_report(records: List[BudgetRecord], top: int = 10) -> str:
+    """
+    The ``top`` records using the largest share of their budget
+    """
+    if not records:
+        return 'No performance budgets were checked.'
+    worst = sorted(records, key=lambda entry: entry.usage, reverse=True)[:top]
+    rows = []
+    for entry in worst:
+        queries = f'{entry.queries}/{entry.max_queries}'
+        if entry.counts:
+            queries += f" ({' -> '.join(map(str, entry.counts))} for {' -> '.join(map(str, entry.sizes))} rows)"
+        timing = f'{entry.time_ratio:.2f}x/{entry.max_time_ratio}x' if entry.max_time_ratio else ''
+        usage = 'inf' if entry.usage == float('inf') else f'{entry.usage:.0%}'
+        rows.append((usage, entry.name, queries, timing, entry.test))
+    columns = ('usage', 'budget', 'queries', 'time', 'test')
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+    lines = [
+        f'Performance budgets: {len(worst)} of {len(records)} checks closest to their limit',
+        '  '.join(column.ljust(width) for column, width in zip(columns, widths)).rstrip(),
+    ]
+    lines.extend('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows)
+    return '\n'.join(lines)
@@ -0,0 +1,394 @@
+import json
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+
+class LocalLRUCache:
+    """
+    Thread-safe, bounded LRU map with a per-entry expiry
+    """
+
+    def __init__(self, max_entries: int = 1000, timeout: float = 5):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, timeout: Optional[float] = None) -> None:
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        if timeout <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _TierState:
+    """
+    Per-process L1, Redis client and invalidation listener for one cache alias.
+    Django creates a backend instance per thread; they all share this state.
+    """
+
+    def __init__(self, url: str, channel: str, client_class, client_kwargs: Dict[str, Any], l1: LocalLRUCache):
+        self.url = url
+        self.channel = channel
+        self.client_class = client_class
+        self.client_kwargs = client_kwargs
+        self.l1 = l1
+        self.client = None
+        self.pid = None
+        self.node_id = None
+        self.lock = threading.Lock()
+
+    def get_client(self):
+        """
+        Return the Redis client, (re)starting the invalidation listener in new processes
+        """
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    client_class = self.client_class
+                    if isinstance(client_class, str):
+                        client_class = import_string(client_class)
+                    self.client = client_class.from_url(self.url, **self.client_kwargs)
+                    self.node_id = uuid.uuid4().hex
+                    # Anything inherited from a parent process may be stale
+                    self.l1.clear()
+                    self._start_listener()
+                    self.pid = os.getpid()
+        return self.client
+
+    def _start_listener(self) -> None:
+        if self.l1.max_entries <= 0:
+            return
+        ready = threading.Event()
+        listener = threading.Thread(
+            target=self._listen, args=(self.client, self.node_id, ready), name='cache-invalidation', daemon=True
+        )
+        listener.start()
+        # Subscribe before the first read so no invalidation can be missed
+        ready.wait(timeout=1)
+
+    def _listen(self, client, node_id: str, ready: threading.Event) -> None:
+        while self.node_id == node_id:
+            pubsub = None
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Messages may have been lost while (re)connecting
+                self.l1.clear()
+                ready.set()
+                while self.node_id == node_id:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get('type') == 'message':
+                        self._handle_invalidation(message['data'])
+            except Exception:
+                logger.warning('Cache invalidation listener disconnected; retrying', exc_info=True)
+                ready.set()
+                time.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def _handle_invalidation(self, data: bytes) -> None:
+        payload = json.loads(data)
+        if payload.get('node') == self.node_id:
+            return
+        if payload.get('clear'):
+            self.l1.clear()
+        else:
+            self.l1.delete_many(payload.get('keys', []))
+
+    def invalidate(self, keys=None, clear: bool = False) -> None:
+        """
+        Drop keys from this process's L1 and broadcast to every other process
+        """
+        if clear:
+            self.l1.clear()
+        else:
+            self.l1.delete_many(keys)
+        if self.l1.max_entries <= 0:
+            return
+        payload = {'node': self.node_id, 'clear': True} if clear else {'node': self.node_id, 'keys': list(keys)}
+        try:
+            self.get_client().publish(self.channel, json.dumps(payload))
+        except Exception:
+            logger.warning('Failed to publish cache invalidation', exc_info=True)
+
+    def stop(self) -> None:
+        """
+        Stop the listener (it exits within a second) and drop L1
+        """
+        self.node_id = None
+        self.pid = None
+        self.l1.clear()
+
+
+_states: Dict[tuple, _TierState] = {}
+_states_lock = threading.Lock()
+
+
+# INCRBY only if the key exists, in one step: a key expiring between a separate
+# EXISTS and INCRBY would be recreated without its TTL. INCRBY keeps the TTL.
+INCR_EXISTING_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+return redis.call('INCRBY', KEYS[1], ARGV[1])
+"""
+
+
+class TwoTierCache(BaseCache):
+    """
+    Django cache backend with an in-process LRU (L1) in front of Redis (L2).
+
+    Reads are served from L1 when possible, so hot keys cost no network
+    round-trip. L1 entries only live for L1_TIMEOUT seconds. Every write,
+    delete and clear goes to Redis and is then broadcast on a pub/sub
+    channel, and each process drops those keys from its L1. Pub/sub is
+    fire-and-forget, so L1_TIMEOUT bounds how stale a process can be if a
+    message is missed. L1 is also flushed whenever the subscription
+    reconnects.
+
+    Values are pickled, except plain integers, which are stored as-is so
+    incr() maps to an atomic INCRBY (in a script that keeps the key's TTL). L1 keeps the serialized bytes, so
+    callers never share mutable objects.
+
+    clear() only deletes keys under this cache's KEY_PREFIX (with the
+    default KEY_FUNCTION), since the Redis database may also hold the
+    Celery broker's queues.
+
+    OPTIONS:
+        L1_MAX_ENTRIES   bounded L1 size per process (default 1000; 0 disables L1)
+        L1_TIMEOUT       L1 entry lifetime in seconds (default 5)
+        CHANNEL          pub/sub channel for invalidations
+        CLIENT_CLASS     redis-py compatible client class with from_url()
+                         (default redis.Redis; apps.core.fake_redis.FakeRedis offline)
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        url = server if isinstance(server, str) else server[0]
+        channel = options.get('CHANNEL', f'{self.key_prefix or "cache"}:invalidate')
+        state_key = (url, channel)
+        with _states_lock:
+            if state_key not in _states:
+                _states[state_key] = _TierState(
+                    url,
+                    channel,
+                    options.get('CLIENT_CLASS', 'redis.Redis'),
+                    options.get('CLIENT_KWARGS', {}),
+                    LocalLRUCache(int(options.get('L1_MAX_ENTRIES', 1000)), float(options.get('L1_TIMEOUT', 5))),
+                )
+            self._state = _states[state_key]
+        self.l1 = self._state.l1
+
+    def get_client(self):
+        """
+        Return the process-wide Redis client
+        """
+        return self._state.get_client()
+
+    def _invalidate(self, keys=None, clear: bool = False) -> None:
+        self._state.invalidate(keys, clear)
+
+    # Serialization
+
+    @staticmethod
+    def _dumps(value: Any):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(data: bytes) -> Any:
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        """
+        Seconds until expiry (Redis semantics): None persists, 0 or less deletes
+        """
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return None if timeout is None else max(0, int(timeout))
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        data = self.l1.get(key)
+        if data is None:
+            data = self.get_client().get(key)
+            if data is None:
+                return default
+            self.l1.set(key, data)
+        return self._loads(data)
+
+    def get_many(self, keys, version=None):
+        full_keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        found: Dict[str, Any] = {}
+        missing = []
+        for full_key, key in full_keys.items():
+            data = self.l1.get(full_key)
+            if data is None:
+                missing.append(full_key)
+            else:
+                found[key] = self._loads(data)
+        if missing:
+            for full_key, data in zip(missing, self.get_client().mget(missing)):
+                if data is not None:
+                    self.l1.set(full_key, data)
+                    found[full_keys[full_key]] = self._loads(data)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self.get_backend_timeout(timeout)
+        if timeout == 0:
+            self.get_client().delete(key)
+            self._invalidate([key])
+            return
+        data = self._dumps(value)
+        self.get_client().set(key, data, ex=timeout)
+        self._invalidate([key])
+        self.l1.set(key, self._encoded(data), timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self.get_backend_timeout(timeout)
+        if timeout == 0:
+            return False
+        data = self._dumps(value)
+        added = bool(self.get_client().set(key, data, ex=timeout, nx=True))
+        if added:
+            self._invalidate([key])
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.get_backend_timeout(timeout)
+        full = {self.make_and_validate_key(key, version=version): self._dumps(value) for key, value in data.items()}
+        if not full:
+            return []
+        client = self.get_client()
+        if timeout == 0:
+            client.delete(*full)
+        else:
+            pipeline = client.pipeline()
+            for key, value in full.items():
+                pipeline.set(key, value, ex=timeout)
+            pipeline.execute()
+        self._invalidate(list(full))
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self.get_backend_timeout(timeout)
+        client = self.get_client()
+        if timeout is None:
+            return bool(client.persist(key)) or bool(client.exists(key))
+        return bool(client.expire(key, timeout))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        deleted = bool(self.get_client().delete(key))
+        self._invalidate([key])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        full_keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if full_keys:
+            self.get_client().delete(*full_keys)
+            self._invalidate(full_keys)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.l1.get(key) is not None or bool(self.get_client().exists(key))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        try:
+            value = self.get_client().eval(INCR_EXISTING_SCRIPT, 1, key, delta)
+        except ResponseError as e:
+            # The stored value is not an integer
+            raise ValueError(str(e)) from e
+        if value is None:
+            raise ValueError(f"Key '{key}' not found.")
+        self._invalidate([key])
+        return value
+
+    # Keys scanned and unlinked per round-trip by clear()
+    CLEAR_BATCH_SIZE = 1000
+
+    def _key_pattern(self) -> str:
+        """
+        SCAN pattern matching every key make_key() builds, in any version
+        """
+        return re.sub(r'([*?\[\]\\])', r'\\\1', self.key_prefix) + ':*'
+
+    def clear(self):
+        # Not FLUSHDB: other data, such as queued Celery tasks, may share the database
+        client = self.get_client()
+        batch = []
+        for key in client.scan_iter(match=self._key_pattern(), count=self.CLEAR_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= self.CLEAR_BATCH_SIZE:
+                client.unlink(*batch)
+                batch = []
+        if batch:
+            client.unlink(*batch)
+        self._invalidate(clear=True)
+
+    def close(self, **kwargs):
+        # Connections are pooled per process and reused across requests
+        pass
+
+    @staticmethod
+    def _encoded(data) -> bytes:
+        # What Redis will hand back for this value on a later GET
+        return str(data).encode() if type(data) is int else data
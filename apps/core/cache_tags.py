@@ -0,0 +1,149 @@
+"""
+Tag-based cache invalidation.
+
+Cached entries declare the tags they depend on (``product:42``,
+``vendor:7:products``, ``category``...). Every tag has a generation
+stored in the cache, and the generations of an entry's tags are folded
+into its key. Invalidating a tag replaces its generation, so every entry
+built on the old one becomes unreachable at once, without enumerating
+keys; orphaned entries simply expire.
+
+Generations are nanosecond timestamps rather than counters starting at
+zero, so a tag whose generation was evicted never comes back with a
+value an old entry was keyed on.
+"""
+import hashlib
+import time
+from typing import Any, Dict, Iterable, List, Set
+
+from django.core.cache import caches
+from django.db.models import Model
+
+TAG_KEY_PREFIX = 'cache_tag'
+
+# Generations outlive any entry keyed on them; an expired one only causes a miss
+TAG_TIMEOUT = 7 * 24 * 3600
+
+LOADED_RELATIONS_ATTR = '_cache_tag_relations'
+
+
+def _tag_key(tag: str) -> str:
+    return f'{TAG_KEY_PREFIX}:{tag}'
+
+
+def get_tag_generations(tags: Iterable[str], cache_alias: str = 'default') -> Dict[str, int]:
+    """
+    Current generation of each tag, fetched in one round-trip.
+    Tags seen for the first time get a new generation.
+    """
+    backend = caches[cache_alias]
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = backend.get_many(keys)
+    generations = {keys[key]: generation for key, generation in found.items()}
+    for key, tag in keys.items():
+        if tag not in generations:
+            generation = time.time_ns()
+            if not backend.add(key, generation, TAG_TIMEOUT):
+                # Another process initialised it first
+                generation = backend.get(key, generation)
+            generations[tag] = generation
+    return generations
+
+
+def tagged_key(key: str, tags: Iterable[str], cache_alias: str = 'default') -> str:
+    """
+    Suffix a cache key with the generations of the tags it depends on
+    """
+    tags = sorted(set(tags))
+    if not tags:
+        return key
+    generations = get_tag_generations(tags, cache_alias)
+    fingerprint = ','.join(f'{tag}={generations[tag]}' for tag in tags)
+    return f'{key}:t{hashlib.blake2b(fingerprint.encode(), digest_size=8).hexdigest()}'
+
+
+def invalidate_tags(tags: Iterable[str], cache_alias: str = 'default') -> None:
+    """
+    Give every tag a new generation in one round-trip
+    """
+    generation = time.time_ns()
+    keys = {_tag_key(tag): generation for tag in set(tags)}
+    if keys:
+        caches[cache_alias].set_many(keys, TAG_TIMEOUT)
+
+
+def model_tag(model: Any, pk: Any = None) -> str:
+    """
+    ``product`` for every row of a model, ``product:42`` for one row
+    """
+    name = model._meta.model_name
+    return name if pk is None else f'{name}:{pk}'
+
+
+def relation_tag(field, value: Any) -> str:
+    """
+    Tag for the rows pointing at one parent through a foreign key,
+    named after the reverse accessor, e.g. ``vendor:7:products``
+    """
+    return f'{field.related_model._meta.model_name}:{value}:{field.remote_field.get_accessor_name()}'
+
+
+def _relation_fields(model) -> List[Any]:
+    return [
+        field for field in model._meta.concrete_fields
+        if field.is_relation and field.remote_field.get_accessor_name()
+    ]
+
+
+def tags_for_row(model, pk: Any, relations: Dict[Any, Iterable[Any]]) -> Set[str]:
+    """
+    Tags affected by a change to one row, given the foreign key values
+    (old and new) of each relation field
+    """
+    tags = {model_tag(model), model_tag(model, pk)}
+    for field, values in relations.items():
+        tags.update(relation_tag(field, value) for value in values if value is not None)
+    return tags
+
+
+def remember_relations(sender, instance: Model, **kwargs) -> None:
+    """
+    post_init receiver: record the loaded foreign keys, so a save that moves
+    a row to another parent also invalidates the one it left
+    """
+    instance.__dict__[LOADED_RELATIONS_ATTR] = {
+        field.attname: instance.__dict__.get(field.attname) for field in _relation_fields(sender)
+    }
+
+
+def instance_tags(instance: Model) -> Set[str]:
+    """
+    Tags affected by saving or deleting an instance, including the
+    parents it pointed at when it was loaded
+    """
+    loaded = instance.__dict__.get(LOADED_RELATIONS_ATTR) or {}
+    current = {}
+    relations = {}
+    for field in _relation_fields(type(instance)):
+        current[field.attname] = getattr(instance, field.attname)
+        relations[field] = {current[field.attname], loaded.get(field.attname)}
+    # Later saves of the same instance compare against what is stored now
+    instance.__dict__[LOADED_RELATIONS_ATTR] = current
+    return tags_for_row(type(instance), instance.pk, relations)
+
+
+def bulk_tags(model, pks: Iterable[Any]) -> Set[str]:
+    """
+    Tags affected by a bulk change to the given rows, loading their
+    foreign keys with one query
+    """
+    pks = list(pks)
+    if not pks:
+        return set()
+    tags = {model_tag(model)} | {model_tag(model, pk) for pk in pks}
+    fields = _relation_fields(model)
+    if fields:
+        rows = model._base_manager.filter(pk__in=pks).values_list('pk', *(field.attname for field in fields))
+        for pk, *values in rows:
+            tags |= tags_for_row(model, pk, {field: [value] for field, value in zip(fields, values)})
+    return tags
@@ -0,0 +1,289 @@
+"""
+In-process stand-in for the subset of the redis-py client used by
+apps.core.cache.TwoTierCache and the login rate limiter.
+
+Clients created with the same URL share one keyspace and one pub/sub bus.
+URL fragments are ignored, so caches configured with 'redis://fake#a' and
+'redis://fake#b' behave like two processes talking to the same server.
+Intended for tests and offline development only.
+"""
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError, ResponseError
+
+
+class FakeRedisError(RedisError):
+    pass
+
+
+class FakeResponseError(FakeRedisError, ResponseError):
+    """
+    An error the server would report, e.g. INCRBY on a non-integer
+    """
+
+
+def _glob_regex(pattern: bytes) -> re.Pattern:
+    """
+    Compile a Redis glob pattern (*, ?, [...] and backslash escapes)
+    """
+    parts, index = [], 0
+    while index < len(pattern):
+        char = pattern[index:index + 1]
+        if char == b'\\' and index + 1 < len(pattern):
+            index += 1
+            parts.append(re.escape(pattern[index:index + 1]))
+        elif char == b'*':
+            parts.append(b'.*')
+        elif char == b'?':
+            parts.append(b'.')
+        elif char == b'[' and b']' in pattern[index + 1:]:
+            end = pattern.index(b']', index + 1)
+            parts.append(pattern[index:end + 1])
+            index = end
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return re.compile(b''.join(parts) + b'\\Z', re.DOTALL)
+
+
+class _Server:
+    """
+    Shared state for every client connected to the same URL
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.subscribers: Dict[bytes, List['FakePubSub']] = {}
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value).encode()
+    raise FakeRedisError(f'Invalid input of type {type(value).__name__}')
+
+
+class FakePubSub:
+    def __init__(self, server: _Server, ignore_subscribe_messages: bool = False):
+        self.server = server
+        self.ignore_subscribe_messages = ignore_subscribe_messages
+        self.channels = set()
+        self.messages: 'queue.Queue[dict]' = queue.Queue()
+
+    def subscribe(self, *channels):
+        with self.server.lock:
+            for channel in map(_encode, channels):
+                self.channels.add(channel)
+                self.server.subscribers.setdefault(channel, []).append(self)
+                if not self.ignore_subscribe_messages:
+                    self.messages.put({'type': 'subscribe', 'channel': channel, 'data': len(self.channels)})
+
+    def unsubscribe(self, *channels):
+        with self.server.lock:
+            for channel in map(_encode, channels or list(self.channels)):
+                self.channels.discard(channel)
+                subscribers = self.server.subscribers.get(channel, [])
+                if self in subscribers:
+                    subscribers.remove(self)
+
+    def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        try:
+            return self.messages.get(timeout=timeout) if timeout else self.messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.unsubscribe()
+
+
+class FakePipeline:
+    """
+    Queues commands and runs them atomically on execute()
+    """
+
+    def __init__(self, client: 'FakeRedis'):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def queue_command(*args, **kwargs):
+            self.commands.append((method, args, kwargs))
+            return self
+        return queue_command
+
+    def execute(self):
+        with self.client.server.lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.commands = []
+
+
+class FakeRedis:
+    """
+    Minimal thread-safe Redis client with string keys, expiry, INCR, the
+    project's Lua scripts and pub/sub
+    """
+
+    _servers: Dict[str, _Server] = {}
+    _servers_lock = threading.Lock()
+
+    def __init__(self, url: str = 'redis://fake'):
+        url = url.split('#', 1)[0]
+        with self._servers_lock:
+            self.server = self._servers.setdefault(url, _Server())
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'FakeRedis':
+        return cls(url)
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Forget every fake server (call between tests)
+        """
+        with cls._servers_lock:
+            cls._servers.clear()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.server.data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self.server.data[key]
+            return None
+        return value
+
+    def get(self, key):
+        with self.server.lock:
+            return self._get(_encode(key))
+
+    def mget(self, keys, *args):
+        keys = list(keys) + list(args) if isinstance(keys, (list, tuple)) else [keys, *args]
+        with self.server.lock:
+            return [self._get(_encode(key)) for key in keys]
+
+    def set(self, key, value, ex=None, px=None, nx=False, xx=False, keepttl=False):
+        key = _encode(key)
+        with self.server.lock:
+            exists = self._get(key) is not None
+            if (nx and exists) or (xx and not exists):
+                return None
+            expires = None
+            if ex is not None:
+                expires = time.monotonic() + float(ex)
+            elif px is not None:
+                expires = time.monotonic() + float(px) / 1000
+            elif keepttl and exists:
+                expires = self.server.data[key][1]
+            self.server.data[key] = (_encode(value), expires)
+            return True
+
+    def delete(self, *keys):
+        with self.server.lock:
+            count = 0
+            for key in map(_encode, keys):
+                if self._get(key) is not None:
+                    del self.server.data[key]
+                    count += 1
+            return count
+
+    def unlink(self, *keys):
+        return self.delete(*keys)
+
+    def scan_iter(self, match=None, count=None, **kwargs):
+        regex = _glob_regex(_encode(match)) if match is not None else None
+        with self.server.lock:
+            keys = [key for key in list(self.server.data) if self._get(key) is not None]
+        return iter([key for key in keys if regex is None or regex.match(key)])
+
+    def exists(self, *keys):
+        with self.server.lock:
+            return sum(1 for key in map(_encode, keys) if self._get(key) is not None)
+
+    def incrby(self, key, amount=1):
+        key = _encode(key)
+        with self.server.lock:
+            current = self._get(key)
+            try:
+                value = int(current or 0) + int(amount)
+            except ValueError:
+                raise FakeResponseError('value is not an integer or out of range')
+            expires = self.server.data[key][1] if current is not None else None
+            self.server.data[key] = (_encode(value), expires)
+            return value
+
+    def incr(self, key, amount=1):
+        return self.incrby(key, amount)
+
+    def eval(self, script, numkeys, *keys_and_args):
+        """
+        Run one of the Lua scripts the project uses, implemented in Python
+        """
+        from .cache import INCR_EXISTING_SCRIPT
+
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        with self.server.lock:
+            if script == INCR_EXISTING_SCRIPT:
+                return self.incrby(keys[0], args[0]) if self._get(_encode(keys[0])) is not None else None
+        raise FakeResponseError('unknown script')
+
+    def expire(self, key, seconds):
+        key = _encode(key)
+        with self.server.lock:
+            if self._get(key) is None:
+                return False
+            self.server.data[key] = (self.server.data[key][0], time.monotonic() + float(seconds))
+            return True
+
+    def persist(self, key):
+        key = _encode(key)
+        with self.server.lock:
+            if self._get(key) is None:
+                return False
+            self.server.data[key] = (self.server.data[key][0], None)
+            return True
+
+    def ttl(self, key):
+        key = _encode(key)
+        with self.server.lock:
+            if self._get(key) is None:
+                return -2
+            expires = self.server.data[key][1]
+            return -1 if expires is None else max(0, int(round(expires - time.monotonic())))
+
+    def publish(self, channel, message):
+        channel, message = _encode(channel), _encode(message)
+        with self.server.lock:
+            subscribers = list(self.server.subscribers.get(channel, []))
+        for subscriber in subscribers:
+            subscriber.messages.put({'type': 'message', 'channel': channel, 'data': message})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> FakePubSub:
+        return FakePubSub(self.server, ignore_subscribe_messages)
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def ping(self):
+        return True
+
+    def close(self):
+        pass
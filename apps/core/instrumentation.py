@@ -0,0 +1,199 @@
+"""
+Per-request counters for SQL, cache and serializer time.
+
+RequestMetricsMiddleware activates a RequestMetrics for each request in a
+context variable. SQL is timed with connection.execute_wrapper; cache
+backends and DRF serializers are instrumented once at class level and
+only record while a request is active, so code running outside a request
+pays a single context variable lookup.
+"""
+import contextvars
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterator, Optional
+
+from django.core.cache import caches
+from django.db import connections
+
+_current: contextvars.ContextVar[Optional['RequestMetrics']] = contextvars.ContextVar('request_metrics', default=None)
+
+_MISSING = object()
+
+
+class RequestMetrics:
+    """
+    Counters collected while handling one request. Times are in nanoseconds.
+    """
+
+    __slots__ = (
+        'started', 'db_queries', 'db_ns', 'cache_hits', 'cache_misses', 'cache_calls', 'cache_ns',
+        'serialize_ns', '_depth',
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter_ns()
+        self.db_queries = 0
+        self.db_ns = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_calls = 0
+        self.cache_ns = 0
+        self.serialize_ns = 0
+        # Nesting per kind, so a cache call made by another (get_many -> get) is counted once
+        self._depth: Dict[str, int] = {}
+
+    def elapsed_ns(self) -> int:
+        return time.perf_counter_ns() - self.started
+
+    @contextmanager
+    def measure(self, kind: str) -> Iterator[bool]:
+        """
+        Time the block into ``{kind}_ns``; yields whether this is the outermost call
+        """
+        depth = self._depth.get(kind, 0)
+        self._depth[kind] = depth + 1
+        started = time.perf_counter_ns()
+        try:
+            yield depth == 0
+        finally:
+            self._depth[kind] = depth
+            if depth == 0:
+                attribute = f'{kind}_ns'
+                setattr(self, attribute, getattr(self, attribute) + time.perf_counter_ns() - started)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'duration_ms': round(self.elapsed_ns() / 1e6, 3),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_ns / 1e6, 3),
+            'cache_calls': self.cache_calls,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_ms': round(self.cache_ns / 1e6, 3),
+            'serialize_ms': round(self.serialize_ns / 1e6, 3),
+        }
+
+
+def current_metrics() -> Optional[RequestMetrics]:
+    """
+    The metrics of the request being handled by this thread, if any
+    """
+    return _current.get()
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter_ns()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_ns += time.perf_counter_ns() - started
+        metrics.db_queries += 1
+
+
+@contextmanager
+def collect_request_metrics() -> Iterator[RequestMetrics]:
+    """
+    Activate a fresh RequestMetrics and time SQL on every database connection
+    """
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_sql_wrapper))
+            yield metrics
+    finally:
+        _current.reset(token)
+
+
+# Cache instrumentation
+
+# Reads also count hits and misses
+_CACHE_READS = ('get', 'get_many', 'has_key')
+_CACHE_WRITES = ('set', 'add', 'set_many', 'delete', 'delete_many', 'incr', 'decr', 'touch', 'clear')
+
+
+def _instrument_cache_method(cls, name: str) -> None:
+    original = cls.__dict__.get(name)
+    if original is None:
+        # Inherited: wrap the implementation the class actually uses
+        original = getattr(cls, name, None)
+        if original is None:
+            return
+
+    @wraps(original)
+    def wrapper(self, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return original(self, *args, **kwargs)
+        with metrics.measure('cache') as outermost:
+            if name == 'get' and outermost:
+                # Ask for a sentinel so cached None/default values still count as hits
+                rest = list(args[1:])
+                key = args[0] if args else kwargs.pop('key')
+                default = rest.pop(0) if rest else kwargs.pop('default', None)
+                value = original(self, key, _MISSING, *rest, **kwargs)
+                metrics.cache_calls += 1
+                if value is _MISSING:
+                    metrics.cache_misses += 1
+                    return default
+                metrics.cache_hits += 1
+                return value
+            result = original(self, *args, **kwargs)
+            if outermost:
+                metrics.cache_calls += 1
+                if name == 'get_many':
+                    keys = list(args[0]) if args else list(kwargs.get('keys', []))
+                    metrics.cache_hits += len(result)
+                    metrics.cache_misses += max(0, len(keys) - len(result))
+                elif name == 'has_key':
+                    if result:
+                        metrics.cache_hits += 1
+                    else:
+                        metrics.cache_misses += 1
+            return result
+
+    wrapper._request_metrics_original = original
+    setattr(cls, name, wrapper)
+
+
+def instrument_cache_backends() -> None:
+    """
+    Instrument the classes of every configured cache backend (idempotent)
+    """
+    from django.conf import settings
+
+    for alias in settings.CACHES:
+        cls = type(caches[alias])
+        if cls.__dict__.get('_request_metrics_instrumented'):
+            continue
+        for name in _CACHE_READS + _CACHE_WRITES:
+            _instrument_cache_method(cls, name)
+        cls._request_metrics_instrumented = True
+
+
+def instrument_serializers() -> None:
+    """
+    Time the evaluation of ``serializer.data`` (including any lazy queries it runs)
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    prop = BaseSerializer.__dict__['data']
+    if getattr(prop.fget, '_request_metrics_original', None):
+        return
+    original = prop.fget
+
+    @wraps(original)
+    def data(self):
+        metrics = _current.get()
+        if metrics is None:
+            return original(self)
+        with metrics.measure('serialize'):
+            return original(self)
+
+    data._request_metrics_original = original
+    BaseSerializer.data = property(data)
@@ -0,0 +1,86 @@
+"""
+Non-blocking logging: records are put on an in-memory queue by the
+calling thread and written by a background QueueListener, so file (or
+network) I/O never happens on a request thread.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional, Sequence
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    QueueHandler that owns a QueueListener feeding the named handlers.
+
+    Usable from LOGGING (dictConfig), where target handlers are referenced
+    by name:
+
+        'queue': {
+            '()': 'apps.core.log_handlers.QueueListenerHandler',
+            'handlers': ['file', 'error_file'],
+        }
+
+    Target handlers keep their own levels. The listener is (re)started
+    lazily in every process, so it survives gunicorn's pre-fork model.
+    When the queue is full, records are dropped instead of blocking.
+    """
+
+    def __init__(self, handlers: Sequence[str] = (), maxsize: int = 10000, targets: Optional[List[logging.Handler]] = None):
+        super().__init__(queue.Queue(maxsize))
+        self.handler_names = list(handlers)
+        # Resolve now: handlers no logger refers to are only weakly
+        # registered and would be garbage collected before the first record
+        self.targets = targets if targets is not None else self._resolve_targets()
+        self.listener: Optional[QueueListener] = None
+        self.dropped = 0
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _resolve_targets(self) -> List[logging.Handler]:
+        # dictConfig registers every configured handler under its name
+        named = logging._handlers
+        missing = [name for name in self.handler_names if name not in named]
+        if missing:
+            # dictConfig retries handlers failing with this cause once the others exist
+            raise ValueError(f'Unable to resolve handlers {missing}') from KeyError('target not configured yet')
+        return [named[name] for name in self.handler_names]
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # A listener inherited from a parent process has no thread here
+            self.queue = queue.Queue(self.queue.maxsize)
+            self.listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+            self.listener.start()
+            self._pid = os.getpid()
+            atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """
+        Flush queued records and stop the listener thread
+        """
+        with self._start_lock:
+            if self.listener is not None and self._pid == os.getpid():
+                self.listener.stop()
+            self.listener = None
+            self._pid = None
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self.start()
+        super().emit(record)
+
+    def close(self) -> None:
+        self.stop()
+        super().close()
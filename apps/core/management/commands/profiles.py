@@ -0,0 +1,52 @@
+import glob
+import os
+from collections import Counter
+from typing import Dict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.profiling import FOLDED_SUFFIX, make_profile_token, read_folded, route_filename
+
+
+class Command(BaseCommand):
+    help = 'Merge the per-process folded stack profiles of each route and show the hottest functions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--token', action='store_true', help='Print a signed X-Profile header value and exit')
+        parser.add_argument('--dir', help='Profile directory (default: PROFILING["OUTPUT_DIR"])')
+        parser.add_argument('--route', help='Only this route (URL name, e.g. product-list)')
+        parser.add_argument('--output', help='Directory for the merged <route>.folded files (default: <dir>/merged)')
+        parser.add_argument('--top', type=int, default=10, help='Functions to list per route, by self samples')
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(make_profile_token())
+            return
+
+        directory = options['dir'] or str(settings.PROFILING.get('OUTPUT_DIR', 'logs/profiles'))
+        output = options['output'] or os.path.join(directory, 'merged')
+        pattern = f"{route_filename(options['route'])}.*" if options['route'] else '*'
+        files = glob.glob(os.path.join(directory, f'{pattern}{FOLDED_SUFFIX}'))
+        if not files:
+            raise CommandError(f'No profiles found in {directory}')
+
+        # <route>.<host>-<pid>.folded
+        profiles: Dict[str, Counter] = {}
+        for path in files:
+            route = os.path.basename(path)[:-len(FOLDED_SUFFIX)].rsplit('.', 1)[0]
+            profiles.setdefault(route, Counter()).update(read_folded(path))
+
+        os.makedirs(output, exist_ok=True)
+        for route, samples in sorted(profiles.items()):
+            merged = os.path.join(output, f'{route}{FOLDED_SUFFIX}')
+            with open(merged, 'w') as f:
+                f.writelines(f'{stack} {count}\n' for stack, count in samples.most_common())
+
+            total = sum(samples.values())
+            leaves = Counter()
+            for stack, count in samples.items():
+                leaves[stack.rsplit(';', 1)[-1]] += count
+            self.stdout.write(self.style.SUCCESS(f'{route}: {total} samples -> {merged}'))
+            for function, count in leaves.most_common(options['top']):
+                self.stdout.write(f'  {count / total:6.1%}  {function}')
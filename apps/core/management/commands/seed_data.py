@@ -0,0 +1,494 @@
+import csv
+import io
+import math
+import multiprocessing
+import random
+import time
+from bisect import bisect
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import django
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, models, transaction
+from django.utils import timezone
+
+from apps.core.cache_tags import invalidate_tags, model_tag
+from apps.notification.models import Notification
+from apps.order.models import Order, OrderItem
+from apps.order.utils import check_symbol, encode_base32
+from apps.product.models import Category, Product
+from apps.vendor.models import Vendor
+
+User = get_user_model()
+
+PASSWORD = 'seed-password'
+
+# Product names and descriptions are built from these, so searches hit a known share of rows
+WORDS = (
+    'wireless', 'organic', 'leather', 'steel', 'compact', 'vintage', 'smart', 'bamboo', 'ceramic', 'portable',
+    'cotton', 'digital', 'premium', 'handmade', 'outdoor', 'ergonomic', 'recycled', 'classic', 'modular', 'mini',
+)
+NOUNS = (
+    'headphones', 'lamp', 'backpack', 'mug', 'keyboard', 'chair', 'speaker', 'bottle', 'jacket', 'watch',
+    'charger', 'notebook', 'blender', 'tent', 'camera', 'wallet', 'desk', 'pillow', 'sneakers', 'kettle',
+)
+
+# Most orders are old and delivered; the recent ones are still moving
+ORDER_STATUS_WEIGHTS = {
+    Order.OrderStatus.DELIVERED: 70, Order.OrderStatus.SHIPPED: 8, Order.OrderStatus.PROCESSING: 7,
+    Order.OrderStatus.PENDING: 5, Order.OrderStatus.CANCELLED: 10,
+}
+NOTIFICATION_TYPE_WEIGHTS = {
+    Notification.NotificationType.ORDER_PLACED: 40, Notification.NotificationType.ORDER_UPDATED: 45,
+    Notification.NotificationType.PRODUCT_UPDATED: 10, Notification.NotificationType.SYSTEM: 5,
+}
+
+# (model, columns, rows)
+Table = Tuple[type, Sequence[str], List[tuple]]
+
+
+class Zipf:
+    """
+    Draw members of a population of ``n`` IDs starting at ``offset`` with
+    P(rank k) proportional to 1 / k**s. Ranks are spread over the IDs by a
+    fixed permutation, so the popular rows are not simply the oldest ones.
+    """
+
+    def __init__(self, n: int, s: float, offset: int):
+        self.n = n
+        self.offset = offset
+        self.cum_weights = list(accumulate(k ** -s for k in range(1, n + 1)))
+        self.total = self.cum_weights[-1]
+        # Any stride coprime with n maps ranks onto IDs one-to-one
+        self.stride = max(1, int(n * 0.6180339887))
+        while math.gcd(self.stride, n) != 1:
+            self.stride += 1
+
+    def __call__(self, rng: random.Random) -> int:
+        rank = min(bisect(self.cum_weights, rng.random() * self.total), self.n - 1)
+        return self.offset + rank * self.stride % self.n
+
+
+def weighted(weights: Dict[Any, int]):
+    """
+    Sampler for a small weighted choice
+    """
+    population = list(weights)
+    cum_weights = list(accumulate(weights.values()))
+
+    def choose(rng: random.Random):
+        return rng.choices(population, cum_weights=cum_weights)[0]
+    return choose
+
+
+def price_cents(index: int) -> int:
+    """
+    Deterministic price of the index-th seeded product, so order items need no lookup
+    """
+    return 199 + index * 2654435761 % 49800
+
+
+def cents(value: int) -> Decimal:
+    return Decimal(value).scaleb(-2)
+
+
+@dataclass
+class Plan:
+    """
+    Row counts, first primary keys and distributions of one run; shared by all workers
+    """
+    customers: int
+    vendors: int
+    categories: int
+    products: int
+    orders: int
+    notifications: int
+    max_items: int
+    zipf: float
+    days: int
+    seed: int
+    first_user: int
+    first_vendor: int
+    first_category: int
+    first_product: int
+    first_order: int
+    password: str
+    now: datetime
+
+    def __post_init__(self):
+        self._samplers: Dict[str, Any] = {}
+
+    def sampler(self, name: str) -> Zipf:
+        """
+        Zipf samplers, built once per process
+        """
+        if name not in self._samplers:
+            self._samplers[name] = {
+                # Heavy buyers place most orders and receive most notifications
+                'customer': lambda: Zipf(self.customers, 0.8, self.first_user),
+                # A few vendors own most of the catalog
+                'vendor': lambda: Zipf(self.vendors, 1.0, self.first_vendor),
+                'category': lambda: Zipf(self.categories, 0.6, self.first_category),
+                'product': lambda: Zipf(self.products, self.zipf, self.first_product),
+            }[name]()
+        return self._samplers[name]
+
+    def rng(self, table: str, start: int) -> random.Random:
+        # Every chunk has its own stream, so the data does not depend on --workers or on which rows already exist
+        return random.Random(f'{self.seed}:{table}:{start}')
+
+    def timestamp(self, index: int, count: int, rng: random.Random) -> datetime:
+        """
+        Creation times spread over the last ``days`` days, increasing with the row index
+        """
+        position = (index + rng.random()) / max(count, 1)
+        return self.now - timedelta(days=self.days * (1 - position))
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if key != '_samplers'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._samplers = {}
+
+
+def generate_users(plan: Plan, start: int, stop: int) -> List[Table]:
+    rng = plan.rng('users', start)
+    total = plan.customers + plan.vendors
+    rows = []
+    for index in range(start, stop):
+        pk = plan.first_user + index
+        role = User.Role.CUSTOMER.value if index < plan.customers else User.Role.VENDOR.value
+        name = f'{role.lower()}{pk}'
+        joined = plan.timestamp(index, total, rng)
+        rows.append((pk, plan.password, name, f'{name}@example.com', role, True, joined, joined))
+    columns = ('id', 'password', 'username', 'email', 'role', 'is_email_verified', 'date_joined', 'updated_at')
+    return [(User, columns, rows)]
+
+
+def generate_vendors(plan: Plan, start: int, stop: int) -> List[Table]:
+    rng = plan.rng('vendors', start)
+    rows = []
+    for index in range(start, stop):
+        created = plan.timestamp(index, plan.vendors, rng)
+        rows.append((plan.first_vendor + index, plan.first_user + plan.customers + index,
+                     f'{rng.choice(WORDS).title()} {rng.choice(NOUNS).title()} Co. {index}',
+                     f'{rng.randint(1, 999)} Market Street', created, created))
+    return [(Vendor, ('id', 'user_id', 'company_name', 'address', 'created_at', 'updated_at'), rows)]
+
+
+def generate_categories(plan: Plan, start: int, stop: int) -> List[Table]:
+    rows = []
+    for index in range(start, stop):
+        pk = plan.first_category + index
+        rows.append((pk, f'Category {pk}', f'category-{pk}', f'Synthetic category {pk}', plan.now, plan.now))
+    return [(Category, ('id', 'name', 'slug', 'description', 'created_at', 'updated_at'), rows)]
+
+
+def generate_products(plan: Plan, start: int, stop: int) -> List[Table]:
+    rng = plan.rng('products', start)
+    vendor = plan.sampler('vendor')
+    category = plan.sampler('category')
+    rows = []
+    for index in range(start, stop):
+        pk = plan.first_product + index
+        name = f'{rng.choice(WORDS)} {rng.choice(NOUNS)}'
+        created = plan.timestamp(index, plan.products, rng)
+        in_stock = rng.random() > 0.05
+        rows.append((
+            pk, vendor(rng), category(rng), f'{name.title()} {pk}', f'product-{pk}',
+            f'A {name} for everyday use. ' + ' '.join(rng.sample(WORDS, 5)),
+            cents(price_cents(index)), rng.randint(1, 5000) if in_stock else 0, in_stock and rng.random() > 0.03,
+            created, created,
+        ))
+    columns = ('id', 'vendor_id', 'category_id', 'name', 'slug', 'description', 'price', 'stock', 'is_available',
+               'created_at', 'updated_at')
+    return [(Product, columns, rows)]
+
+
+def generate_orders(plan: Plan, start: int, stop: int) -> List[Table]:
+    rng = plan.rng('orders', start)
+    customer = plan.sampler('customer')
+    product = plan.sampler('product')
+    status = weighted(ORDER_STATUS_WEIGHTS)
+    orders, items = [], []
+    for index in range(start, stop):
+        pk = plan.first_order + index
+        created = plan.timestamp(index, plan.orders, rng)
+        # 1 item for half the orders, then geometrically fewer
+        count = 1
+        while count < plan.max_items and rng.random() < 0.5:
+            count += 1
+        # Ordered, so the quantities drawn below do not depend on the primary keys
+        product_ids = dict.fromkeys(product(rng) for _ in range(count))
+        total = 0
+        for product_id in product_ids:
+            quantity = 1 if rng.random() < 0.8 else rng.randint(2, 5)
+            price = price_cents(product_id - plan.first_product)
+            total += price * quantity
+            items.append((pk, product_id, quantity, cents(price), created, created))
+        # Same format as generated order numbers, from the primary key so it is unique
+        orders.append((pk, encode_base32(pk) + check_symbol(pk), customer(rng), status(rng).value, cents(total),
+                       f'{rng.randint(1, 9999)} {rng.choice(NOUNS).title()} Road', created, created))
+    return [
+        (Order, ('id', 'order_number', 'customer_id', 'status', 'total_price', 'shipping_address',
+                 'created_at', 'updated_at'), orders),
+        (OrderItem, ('order_id', 'product_id', 'quantity', 'price', 'created_at', 'updated_at'), items),
+    ]
+
+
+def generate_notifications(plan: Plan, start: int, stop: int) -> List[Table]:
+    rng = plan.rng('notifications', start)
+    recipient = plan.sampler('customer')
+    notification_type = weighted(NOTIFICATION_TYPE_WEIGHTS)
+    # Labels are lazy translations; resolve them once
+    labels = {kind: str(kind.label) for kind in NOTIFICATION_TYPE_WEIGHTS}
+    rows = []
+    for index in range(start, stop):
+        kind = notification_type(rng)
+        if kind == Notification.NotificationType.PRODUCT_UPDATED:
+            related = ('Product', plan.first_product + rng.randrange(plan.products)) if plan.products else (None, None)
+        elif kind == Notification.NotificationType.SYSTEM or not plan.orders:
+            related = (None, None)
+        else:
+            related = ('Order', plan.first_order + rng.randrange(plan.orders))
+        created = plan.timestamp(index, plan.notifications, rng)
+        age = index / max(plan.notifications, 1)
+        # Old notifications have been read; the backlog of unread ones is recent
+        is_read = rng.random() > 0.02 + 0.6 * age ** 8
+        rows.append((recipient(rng), kind.value, f'{labels[kind]} #{index}', 'Something happened on your account.',
+                     related[1], related[0], is_read, created, created))
+    columns = ('recipient_id', 'notification_type', 'title', 'message', 'related_object_id',
+               'related_object_type', 'is_read', 'created_at', 'updated_at')
+    return [(Notification, columns, rows)]
+
+
+# In dependency order: name, row count, generator
+PHASES = (
+    ('users', lambda plan: plan.customers + plan.vendors, generate_users),
+    ('vendors', lambda plan: plan.vendors, generate_vendors),
+    ('categories', lambda plan: plan.categories, generate_categories),
+    ('products', lambda plan: plan.products, generate_products),
+    ('orders', lambda plan: plan.orders, generate_orders),
+    ('notifications', lambda plan: plan.notifications, generate_notifications),
+)
+GENERATORS = {name: generator for name, _, generator in PHASES}
+
+
+class TableWriter:
+    """
+    Insert generated rows without building model instances: multi-row
+    INSERT statements, or COPY on PostgreSQL. Columns the generator does
+    not set get the field default.
+    """
+
+    def __init__(self, model, columns: Sequence[str], use_copy: bool = False, batch_size: int = 5000,
+                 using: str = 'default'):
+        # Resolved once: every attribute access on django.db.connection goes through a context-local lookup
+        self.connection = connections[using]
+        connection = self.connection
+        opts = model._meta
+        fields = [opts.get_field(column) for column in columns]
+        defaults = [
+            field for field in opts.concrete_fields
+            if field not in fields and not (field.primary_key and isinstance(field, models.AutoField))
+        ]
+        self.table = opts.db_table
+        self.columns = [field.column for field in fields + defaults]
+        self.defaults = tuple(field.get_db_prep_save(field.get_default(), connection) for field in defaults)
+        self.datetime_positions = [
+            position for position, field in enumerate(fields) if isinstance(field, models.DateTimeField)
+        ]
+        self.adapt_datetime = connection.ops.adapt_datetimefield_value
+        self.use_copy = use_copy
+        params_per_statement = connection.features.max_query_params or batch_size * len(self.columns)
+        self.batch_size = max(1, min(batch_size, params_per_statement // len(self.columns)))
+
+    def prepare(self, row: tuple) -> tuple:
+        if self.datetime_positions:
+            row = list(row)
+            adapted = {}
+            for position in self.datetime_positions:
+                # created_at and updated_at are usually the same value
+                value = row[position]
+                if value not in adapted:
+                    adapted[value] = self.adapt_datetime(value)
+                row[position] = adapted[value]
+        return (*row, *self.defaults)
+
+    def write(self, rows: List[tuple]) -> None:
+        connection = self.connection
+        rows = [self.prepare(row) for row in rows]
+        with connection.cursor() as cursor:
+            if self.use_copy:
+                self.copy(cursor, rows)
+                return
+            quoted = ', '.join(connection.ops.quote_name(column) for column in self.columns)
+            placeholders = f"({', '.join(['%s'] * len(self.columns))})"
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                cursor.execute(
+                    f'INSERT INTO {connection.ops.quote_name(self.table)} ({quoted}) '
+                    f'VALUES {", ".join([placeholders] * len(batch))}',
+                    [value for row in batch for value in row],
+                )
+
+    def copy(self, cursor, rows: List[tuple]) -> None:
+        connection = self.connection
+        buffer = io.StringIO()
+        # Strings are quoted, so empty strings stay distinct from NULL (unquoted empty field)
+        csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(
+            tuple(str(value) if isinstance(value, (bool, Decimal, datetime)) else value for value in row)
+            for row in rows
+        )
+        sql = (f"COPY {connection.ops.quote_name(self.table)} "
+               f"({', '.join(connection.ops.quote_name(column) for column in self.columns)}) "
+               f"FROM STDIN WITH (FORMAT csv)")
+        if hasattr(cursor, 'copy_expert'):
+            # psycopg2
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def seed_chunk(plan: Plan, phase: str, start: int, stop: int, use_copy: bool, batch_size: int) -> Dict[str, int]:
+    """
+    Generate and insert rows [start, stop) of one phase in a transaction;
+    returns the rows written per table. Runs in a worker process when --workers > 1.
+    """
+    if not apps.ready:
+        django.setup()
+    counts = {}
+    tables = GENERATORS[phase](plan, start, stop)
+    with transaction.atomic():
+        for model, columns, rows in tables:
+            TableWriter(model, columns, use_copy, batch_size).write(rows)
+            counts[model._meta.label] = len(rows)
+    return counts
+
+
+def next_pk(model) -> int:
+    return (model.objects.aggregate(last=models.Max('pk'))['last'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a large synthetic dataset: users, vendors with skewed catalog sizes, products with Zipfian '
+        'popularity, multi-item orders and notification backlogs'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=10_000)
+        parser.add_argument('--vendors', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--orders', type=int, default=200_000, help='Orders; each has 1 to --max-items items')
+        parser.add_argument('--notifications', type=int, default=300_000)
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Multiply every count above (10 gives about 11M rows)')
+        parser.add_argument('--max-items', type=int, default=5, help='Maximum items per order')
+        parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent of product popularity')
+        parser.add_argument('--days', type=int, default=365, help='Spread creation times over this many days')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes, each inserting whole chunks')
+        parser.add_argument('--chunk-size', type=int, default=20_000, help='Rows generated per transaction')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT statement')
+        parser.add_argument('--copy', action='store_true', help='Load rows with COPY (PostgreSQL only)')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires PostgreSQL')
+        # Scaling down keeps at least one row of every model that was asked for
+        counts = {
+            key: max(1, int(options[key] * options['scale'])) if options[key] > 0 else 0
+            for key in ('customers', 'vendors', 'categories', 'products', 'orders', 'notifications')
+        }
+        if counts['orders'] and not (counts['customers'] and counts['products']):
+            raise CommandError('Orders need at least one customer and one product')
+        if counts['products'] and not (counts['vendors'] and counts['categories']):
+            raise CommandError('Products need at least one vendor and one category')
+        if counts['notifications'] and not counts['customers']:
+            raise CommandError('Notifications need at least one customer')
+
+        plan = Plan(
+            **counts,
+            max_items=max(1, options['max_items']),
+            zipf=options['zipf'],
+            days=options['days'],
+            seed=options['seed'],
+            first_user=next_pk(User),
+            first_vendor=next_pk(Vendor),
+            first_category=next_pk(Category),
+            first_product=next_pk(Product),
+            first_order=next_pk(Order),
+            password=make_password(PASSWORD),
+            now=timezone.now(),
+        )
+        workers = max(1, options['workers'])
+        chunk_size = max(1, options['chunk_size'])
+        extra = (options['copy'], options['batch_size'])
+
+        started = time.perf_counter()
+        totals: Dict[str, int] = {}
+        executor: Optional[ProcessPoolExecutor] = None
+        if workers > 1:
+            # Children must not share the parent's database connections
+            connections.close_all()
+            context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        try:
+            for phase, count, _ in PHASES:
+                phase_started = time.perf_counter()
+                chunks = [(start, min(start + chunk_size, count(plan))) for start in range(0, count(plan), chunk_size)]
+                if executor is None:
+                    results = [seed_chunk(plan, phase, start, stop, *extra) for start, stop in chunks]
+                else:
+                    futures = [executor.submit(seed_chunk, plan, phase, start, stop, *extra) for start, stop in chunks]
+                    results = [future.result() for future in futures]
+                written = self.add_counts(totals, results)
+                self.report(phase, written, time.perf_counter() - phase_started)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        elapsed = time.perf_counter() - started
+
+        seeded = [User, Vendor, Category, Product, Order, OrderItem, Notification]
+        # Primary keys were set explicitly, so move the sequences past them
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), seeded):
+                cursor.execute(sql)
+        # Rows were inserted without signals: drop everything cached for these models
+        invalidate_tags(model_tag(model) for model in seeded)
+
+        rows = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s): '
+            + ', '.join(f'{count} {label}' for label, count in totals.items())
+        ))
+
+    @staticmethod
+    def add_counts(totals: Dict[str, int], results: List[Dict[str, int]]) -> Dict[str, int]:
+        written: Dict[str, int] = {}
+        for result in results:
+            for label, count in result.items():
+                written[label] = written.get(label, 0) + count
+                totals[label] = totals.get(label, 0) + count
+        return written
+
+    def report(self, phase: str, written: Dict[str, int], elapsed: float) -> None:
+        if self.verbosity < 1 or not written:
+            return
+        rows = sum(written.values())
+        self.stdout.write(f'{phase}: {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)')
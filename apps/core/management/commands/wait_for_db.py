@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+
+class Command(BaseCommand):
+    help = 'Wait until the database accepts connections, using the project settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias (default: default)')
+        parser.add_argument('--attempts', type=int, default=30, help='Connection attempts before giving up')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between attempts')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        attempts = options['attempts']
+        for attempt in range(1, attempts + 1):
+            try:
+                connection.ensure_connection()
+            except OperationalError:
+                if attempt == attempts:
+                    raise CommandError(f'Database connection failed after {attempts} attempts')
+                self.stdout.write(f'Waiting for database... {attempt}/{attempts}')
+                time.sleep(options['interval'])
+            else:
+                break
+        # A short-lived process: do not hold a connection, or a pool, open
+        connection.close()
+        self.stdout.write(self.style.SUCCESS('Database connection established'))
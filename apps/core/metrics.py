@@ -0,0 +1,153 @@
+"""
+Prometheus metrics, exposed at ``/metrics``.
+
+Request metrics are recorded by RequestMetricsMiddleware from the
+counters it already collects (see apps.core.instrumentation); business
+metrics are recorded where the events happen. Every observation is an
+in-process counter update, so the metrics are always on.
+
+Under gunicorn (or a Celery worker pool) set PROMETHEUS_MULTIPROC_DIR to
+a directory shared by all processes before they start: prometheus_client
+then keeps every metric in per-process mmap'd files there, and the
+``/metrics`` view aggregates all of them. gunicorn.conf.py removes the
+files of a previous run on start and retires those of dead workers.
+Files are named after the host name and PID, so containers (each with
+its own PID namespace) can share one directory, e.g. web and Celery.
+"""
+import os
+import socket
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess, values
+
+# '_' separates the parts of metric file names
+_HOST = socket.gethostname().replace('_', '-')
+
+
+def process_identifier() -> str:
+    """
+    Name of this process in the multiprocess directory
+    """
+    return f'{_HOST}-{os.getpid()}'
+
+
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    # Must be replaced before the first metric is created
+    values.ValueClass = values.MultiProcessValue(process_identifier)
+
+METRICS_ROUTE = 'metrics'
+
+UNMATCHED_ROUTE = 'unmatched'
+
+# Seconds; finer at the low end, where the API normally answers
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by route, method and status',
+    ('route', 'method', 'status'), buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL queries run per request, by route', ('route',), buckets=COUNT_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests', 'Cache lookups made while handling requests, by result (hit or miss)', ('result',),
+)
+ORDERS_CREATED = Counter('orders_created', 'Orders committed to the database')
+STOCK_OUT_REJECTIONS = Counter(
+    'stock_out_rejections', 'Order items rejected because the product is out of stock',
+)
+CELERY_TASK_DURATION = Histogram(
+    'celery_task_duration_seconds', 'Celery task run time by task and final state',
+    ('task', 'state'), buckets=TASK_BUCKETS,
+)
+NOTIFICATION_FANOUT = Histogram(
+    'notification_fanout_size', 'Notifications created by one bulk notification call', buckets=COUNT_BUCKETS,
+)
+
+
+def route_name(request: HttpRequest) -> str:
+    """
+    Bounded label for a request: the URL name it resolved to, not its path
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED_ROUTE
+    return match.view_name or match.route or UNMATCHED_ROUTE
+
+
+def observe_request(request: HttpRequest, response: HttpResponse, metrics) -> None:
+    """
+    Record the latency, query count and cache lookups of a handled request
+    """
+    route = route_name(request)
+    if route == METRICS_ROUTE:
+        return
+    REQUEST_LATENCY.labels(route, request.method, str(response.status_code)).observe(metrics.elapsed_ns() / 1e9)
+    REQUEST_DB_QUERIES.labels(route).observe(metrics.db_queries)
+    if metrics.cache_hits:
+        CACHE_REQUESTS.labels('hit').inc(metrics.cache_hits)
+    if metrics.cache_misses:
+        CACHE_REQUESTS.labels('miss').inc(metrics.cache_misses)
+
+
+# Celery task timing
+
+_task_started: Dict[str, Tuple[float, str]] = {}
+_task_lock = threading.Lock()
+
+
+def _task_prerun(sender=None, task_id: Optional[str] = None, task=None, **kwargs) -> None:
+    with _task_lock:
+        _task_started[task_id] = (time.perf_counter(), getattr(task, 'name', None) or str(sender))
+
+
+def _task_postrun(sender=None, task_id: Optional[str] = None, state: Optional[str] = None, **kwargs) -> None:
+    with _task_lock:
+        started = _task_started.pop(task_id, None)
+    if started is not None:
+        started_at, name = started
+        CELERY_TASK_DURATION.labels(name, state or 'UNKNOWN').observe(time.perf_counter() - started_at)
+
+
+def connect_celery_signals() -> None:
+    """
+    Time every Celery task run by this process
+    """
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(_task_prerun, dispatch_uid='metrics_task_prerun', weak=False)
+    task_postrun.connect(_task_postrun, dispatch_uid='metrics_task_postrun', weak=False)
+
+
+# Exposition
+
+def get_registry():
+    """
+    The registry to scrape: all processes' files in multiprocess mode, else this process
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Prometheus text exposition. Requires ``Authorization: Bearer <METRICS_AUTH_TOKEN>``
+    when that setting is set.
+    """
+    token = getattr(settings, 'METRICS_AUTH_TOKEN', '')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -1,63 +1,205 @@
-import time
-import logging
 import json
+import logging
+import random
+import re
+import sys
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
 from django.utils.deprecation import MiddlewareMixin
 from django.http import HttpRequest, HttpResponse
-from typing import Callable, Any
+from typing import Callable, Any, Iterable, Optional
+from .instrumentation import collect_request_metrics, instrument_cache_backends, instrument_serializers
+from .metrics import observe_request, route_name
+from .profiling import PROFILE_HEADER, ProfileStore, StackSampler, check_profile_token
 
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('apps.core.access')
+
+DEFAULT_MASK_FIELDS = ('password', 'password2', 'old_password', 'new_password', 'token', 'refresh', 'access', 'otp')
+MASKED_HEADERS = ('HTTP_AUTHORIZATION', 'HTTP_COOKIE', 'HTTP_X_API_KEY')
+MASK = '******'
+# Bodies are only logged for these content types; others (e.g. uploads) are never read
+TEXT_CONTENT_TYPES = ('application/json', 'application/x-www-form-urlencoded', 'text/')
 
 
-class RequestLoggingMiddleware(MiddlewareMixin):
+def build_body_masker(fields: Iterable[str]) -> Callable[[str], str]:
     """
-    Middleware to log all requests and responses
+    Return a function that masks the given fields in a JSON or form-encoded
+    body at any nesting depth, using a regex instead of parsing the body
     """
-    
-    def process_request(self, request: HttpRequest) -> None:
-        """
-        Process the request and log it
-        """
-        request.start_time = time.time()
-        
-        # Log the request
-        logger.info(f"Request: {request.method} {request.path}")
-        
-        # Log request headers
-        headers = {k: v for k, v in request.META.items() if k.startswith('HTTP_')}
-        logger.debug(f"Request headers: {headers}")
-        
-        # Log request body for non-GET requests
-        if request.method != 'GET' and request.body:
-            try:
-                body = json.loads(request.body)
-                # Mask sensitive data
-                if 'password' in body:
-                    body['password'] = '******'
-                if 'password2' in body:
-                    body['password2'] = '******'
-                logger.debug(f"Request body: {body}")
-            except json.JSONDecodeError:
-                logger.debug(f"Request body: {request.body}")
-    
-    def process_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
-        """
-        Process the response and log it
-        """
-        # Calculate request duration
-        if hasattr(request, 'start_time'):
-            duration = time.time() - request.start_time
-            logger.info(f"Response: {request.method} {request.path} - {response.status_code} in {duration:.2f}s")
-        else:
-            logger.info(f"Response: {request.method} {request.path} - {response.status_code}")
-        
-        # Log response body for non-success responses
-        if response.status_code >= 400:
-            try:
-                body = json.loads(response.content)
-                logger.debug(f"Response body: {body}")
-            except json.JSONDecodeError:
-                logger.debug(f"Response body: {response.content}")
-        
+    names = '|'.join(re.escape(field) for field in fields)
+    # "field": "string" | number | true/false/null, anywhere in the document
+    json_pattern = re.compile(r'("(?:%s)"\s*:\s*)("(?:[^"\\]|\\.)*"|[^,}\]\s]+)' % names)
+    form_pattern = re.compile(r'((?:^|&)(?:%s)=)[^&]*' % names)
+
+    def mask(body: str) -> str:
+        body = json_pattern.sub(r'\1"%s"' % MASK, body)
+        return form_pattern.sub(r'\1%s' % MASK, body)
+    return mask
+
+
+class RequestLoggingMiddleware:
+    """
+    Log one line per response with its duration, plus masked headers and
+    bodies at DEBUG level.
+
+    Nothing is formatted, and no body or header is read, unless the
+    corresponding level is enabled. Successful responses are sampled with
+    REQUEST_LOGGING['SAMPLE_RATE']; 4xx/5xx responses are always logged.
+    Durations use perf_counter_ns. Pair with
+    apps.core.log_handlers.QueueListenerHandler so writing happens off the
+    request thread.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        config = getattr(settings, 'REQUEST_LOGGING', {})
+        self.sample_rate = float(config.get('SAMPLE_RATE', 1.0))
+        self.max_body_length = int(config.get('MAX_BODY_LENGTH', 2048))
+        self.mask_body = build_body_masker(config.get('MASK_FIELDS', DEFAULT_MASK_FIELDS))
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        started = time.perf_counter_ns()
+        if logger.isEnabledFor(logging.DEBUG):
+            self.log_request_details(request)
+
+        response = self.get_response(request)
+
+        status_code = response.status_code
+        if logger.isEnabledFor(logging.INFO) and (
+            status_code >= 400 or self.sample_rate >= 1 or random.random() < self.sample_rate
+        ):
+            logger.info(
+                'Response: %s %s - %s in %.3fms',
+                request.method, request.path, status_code, (time.perf_counter_ns() - started) / 1e6,
+            )
+            if status_code >= 400 and logger.isEnabledFor(logging.DEBUG):
+                self.log_response_body(response)
+        return response
+
+    def log_request_details(self, request: HttpRequest) -> None:
+        headers = {
+            key: MASK if key in MASKED_HEADERS else value
+            for key, value in request.META.items() if key.startswith('HTTP_')
+        }
+        logger.debug('Request: %s %s headers=%s', request.method, request.path, headers)
+
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return
+        body = self._readable_body(request.content_type, request.META.get('CONTENT_LENGTH'))
+        if body:
+            logger.debug('Request body: %s', self.mask_body(self._truncate(request.body)))
+
+    def log_response_body(self, response: HttpResponse) -> None:
+        if getattr(response, 'streaming', False) or not self._readable_body(response.get('Content-Type', ''), None):
+            return
+        logger.debug('Response body: %s', self.mask_body(self._truncate(response.content)))
+
+    def _readable_body(self, content_type: str, content_length: Optional[str]) -> bool:
+        if not content_type or not content_type.startswith(TEXT_CONTENT_TYPES):
+            return False
+        try:
+            return content_length is None or 0 < int(content_length)
+        except ValueError:
+            return False
+
+    def _truncate(self, body: bytes) -> str:
+        text = body[:self.max_body_length].decode('utf-8', errors='replace')
+        if len(body) > self.max_body_length:
+            text += f'... ({len(body)} bytes)'
+        return text
+
+
+class RequestMetricsMiddleware:
+    """
+    Collect per-request SQL, cache and serializer timings (see
+    apps.core.instrumentation) and emit them as one JSON line on the
+    ``apps.core.access`` logger and, when REQUEST_METRICS['SERVER_TIMING']
+    is set, as a Server-Timing header. They also feed the Prometheus
+    request metrics (apps.core.metrics) and are available to views as
+    ``request.metrics``.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        config = getattr(settings, 'REQUEST_METRICS', {})
+        self.server_timing = config.get('SERVER_TIMING', settings.DEBUG)
+        self.access_log = config.get('ACCESS_LOG', True)
+        instrument_cache_backends()
+        instrument_serializers()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        with collect_request_metrics() as metrics:
+            request.metrics = metrics
+            response = self.get_response(request)
+
+        size = None if getattr(response, 'streaming', False) else len(response.content)
+        if self.server_timing:
+            response['Server-Timing'] = self.format_server_timing(metrics)
+        if self.access_log and access_logger.isEnabledFor(logging.INFO):
+            user = getattr(request, 'user', None)
+            entry = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'user_id': user.pk if user is not None and user.is_authenticated else None,
+                'response_bytes': size,
+                **metrics.as_dict(),
+            }
+            access_logger.info(json.dumps(entry, separators=(',', ':')))
+        observe_request(request, response, metrics)
+        return response
+
+    @staticmethod
+    def format_server_timing(metrics) -> str:
+        return ', '.join((
+            f'db;dur={metrics.db_ns / 1e6:.3f};desc="{metrics.db_queries} queries"',
+            f'cache;dur={metrics.cache_ns / 1e6:.3f};desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+            f'serialize;dur={metrics.serialize_ns / 1e6:.3f}',
+            f'total;dur={metrics.elapsed_ns() / 1e6:.3f}',
+        ))
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in statistical profiling (see apps.core.profiling) of a sampled
+    share of requests (PROFILING['SAMPLE_RATE']) and of requests carrying
+    an ``X-Profile`` header signed by ``manage.py profiles --token``.
+    Samples are aggregated per route; forced requests also get an
+    ``X-Profile-Samples`` response header. Removed from the stack unless
+    PROFILING['ENABLED'] is set.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        config = getattr(settings, 'PROFILING', {})
+        if not config.get('ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config.get('SAMPLE_RATE', 0.0)
+        self.header_max_age = config.get('HEADER_MAX_AGE', 3600)
+        self.sampler = StackSampler(
+            ProfileStore(str(config.get('OUTPUT_DIR', 'logs/profiles'))),
+            interval=config.get('INTERVAL_MS', 5) / 1000,
+            dump_interval=config.get('DUMP_INTERVAL', 30),
+            max_depth=config.get('MAX_DEPTH', 128),
+        )
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        token = request.headers.get(PROFILE_HEADER)
+        forced = token is not None and check_profile_token(token, self.header_max_age)
+        if not forced and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return self.get_response(request)
+
+        # Stacks are recorded below this frame, leaving out the server and outer middleware
+        self.sampler.start(root=sys._getframe())
+        try:
+            response = self.get_response(request)
+        finally:
+            samples = self.sampler.stop()
+        self.sampler.store.add(route_name(request), samples)
+        if forced:
+            response['X-Profile-Samples'] = str(sum(samples.values()))
         return response
 
 
@@ -41,3 +41,33 @@ class BaseModel(models.Model):
         for key, value in kwargs.items():
             setattr(self, key, value)
         self.save()
+
+
+class SlowQuery(models.Model):
+    """
+    Statements slower than SLOW_QUERY_LOG['THRESHOLD_MS'], aggregated by
+    fingerprint (see apps.core.slow_queries). Not a BaseModel: rows are
+    written in the background and never soft deleted or cached.
+    """
+    fingerprint = models.CharField(max_length=32, unique=True)
+    database = models.CharField(max_length=64, default='default')
+    normalized_sql = models.TextField()
+    call_site = models.CharField(max_length=255, blank=True)
+    calls = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    explain = models.TextField(blank=True)
+    explained_at = models.DateTimeField(null=True, blank=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-total_ms']
+        verbose_name_plural = 'slow queries'
+
+    def __str__(self):
+        return f'{self.fingerprint} ({self.calls} calls, {self.total_ms:.0f}ms)'
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
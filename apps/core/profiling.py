@@ -0,0 +1,217 @@
+"""
+Statistical request profiling.
+
+A background thread wakes every few milliseconds and records the current
+stack of each thread that is handling a profiled request, read from
+``sys._current_frames()``. Nothing is installed in the profiled thread
+(no ``sys.setprofile``/``sys.settrace`` hooks), so a profiled request runs
+at close to full speed and unprofiled requests pay nothing.
+
+Stacks are aggregated per route and written by the sampler thread, in
+the collapsed ("folded") format read by flamegraph.pl, inferno and
+speedscope, to one file per route and process:
+``<OUTPUT_DIR>/<route>.<host>-<pid>.folded``. ``manage.py profiles``
+merges them.
+"""
+import atexit
+import os
+import re
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.core import signing
+
+PROFILE_HEADER = 'X-Profile'
+
+PROFILE_TOKEN_SALT = 'apps.core.profiling'
+
+PROFILE_TOKEN_VALUE = 'profile'
+
+FOLDED_SUFFIX = '.folded'
+
+_UNSAFE_FILENAME = re.compile(r'[^\w.-]+')
+
+
+def make_profile_token() -> str:
+    """
+    Signed value for the X-Profile header, which forces a request to be profiled
+    """
+    return signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).sign(PROFILE_TOKEN_VALUE)
+
+
+def check_profile_token(value: str, max_age: int) -> bool:
+    """
+    Whether a header value is a profile token signed with SECRET_KEY and not older than max_age seconds
+    """
+    try:
+        return signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).unsign(value, max_age=max_age) == PROFILE_TOKEN_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse_stack(frame: Optional[FrameType], root: Optional[FrameType] = None, max_depth: int = 128) -> str:
+    """
+    ``outer;...;inner`` labels of a stack, from ``root`` (exclusive) down to ``frame``
+    """
+    labels = []
+    while frame is not None and frame is not root and len(labels) < max_depth:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+def route_filename(route: str) -> str:
+    return _UNSAFE_FILENAME.sub('_', route) or 'unmatched'
+
+
+class ProfileStore:
+    """
+    Sample counts per route and stack for this process, dumped as folded files
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.profiles: Dict[str, Counter] = {}
+        self.requests: Counter = Counter()
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def add(self, route: str, samples: Counter) -> None:
+        with self._lock:
+            self.profiles.setdefault(route, Counter()).update(samples)
+            self.requests[route] += 1
+            self.dirty = True
+
+    def dump(self) -> None:
+        """
+        Rewrite this process's folded file of every route (cumulative counts)
+        """
+        with self._lock:
+            if not self.dirty:
+                return
+            snapshot = {route: dict(samples) for route, samples in self.profiles.items()}
+            self.dirty = False
+        os.makedirs(self.output_dir, exist_ok=True)
+        process = f"{socket.gethostname().replace('_', '-')}-{os.getpid()}"
+        for route, samples in snapshot.items():
+            path = os.path.join(self.output_dir, f'{route_filename(route)}.{process}{FOLDED_SUFFIX}')
+            with open(f'{path}.tmp', 'w') as f:
+                f.writelines(f'{stack} {count}\n' for stack, count in samples.items())
+            os.replace(f'{path}.tmp', path)
+
+
+class StackSampler:
+    """
+    One sampler thread per process, sampling only the threads registered with it.
+
+    Started lazily in each process, so it survives gunicorn's pre-fork model.
+    """
+
+    def __init__(self, store: ProfileStore, interval: float = 0.005, dump_interval: float = 30.0, max_depth: int = 128):
+        self.store = store
+        self.interval = interval
+        self.dump_interval = dump_interval
+        self.max_depth = max_depth
+        # thread id -> (frame to stop at, samples)
+        self._targets: Dict[int, Tuple[Optional[FrameType], Counter]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._last_dump = time.monotonic()
+
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A sampler inherited from a parent process has no thread here
+            self._targets = {}
+            thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.store.dump)
+
+    def start(self, root: Optional[FrameType] = None) -> Counter:
+        """
+        Start sampling the calling thread; stacks are collapsed below ``root``
+        """
+        self._ensure_started()
+        samples = Counter()
+        with self._lock:
+            self._targets[threading.get_ident()] = (root, samples)
+        self._wake.set()
+        return samples
+
+    def stop(self) -> Counter:
+        """
+        Stop sampling the calling thread and return its samples
+        """
+        with self._lock:
+            _, samples = self._targets.pop(threading.get_ident(), (None, Counter()))
+        return samples
+
+    def sample(self, targets: Iterable[Tuple[int, Tuple[Optional[FrameType], Counter]]]) -> None:
+        frames = sys._current_frames()
+        stacks = []
+        for thread_id, (root, samples) in targets:
+            frame = frames.get(thread_id)
+            stack = collapse_stack(frame, root, self.max_depth) if frame is not None else ''
+            # Empty while the thread is in the root frame itself
+            if stack:
+                stacks.append((thread_id, samples, stack))
+        with self._lock:
+            for thread_id, samples, stack in stacks:
+                # A thread that stopped meanwhile owns its Counter again: leave it alone
+                registered = self._targets.get(thread_id)
+                if registered is not None and registered[1] is samples:
+                    samples[stack] += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                targets = list(self._targets.items())
+                if not targets:
+                    self._wake.clear()
+            if targets:
+                self.sample(targets)
+                self._maybe_dump()
+                time.sleep(self.interval)
+            else:
+                self._maybe_dump()
+                # Park until a request is registered, waking up to flush pending samples
+                self._wake.wait(self.dump_interval)
+
+    def _maybe_dump(self) -> None:
+        now = time.monotonic()
+        if self.store.dirty and now - self._last_dump >= self.dump_interval:
+            self._last_dump = now
+            try:
+                self.store.dump()
+            except OSError:
+                # Profiling must never break the process; the next dump retries
+                pass
+
+
+def read_folded(path: str) -> Counter:
+    """
+    Parse a folded file into {stack: count}
+    """
+    samples = Counter()
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                samples[stack] += int(count)
+    return samples
@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, TypeVar, Generic, Type
+from typing import List, Dict, Any, Optional, TypeVar, Generic, Type, Iterable, Iterator, Union
 from django.db.models import Model, QuerySet
+from django.utils import timezone
+from .signals import bulk_changed
+from .tracing import trace_methods
 
 T = TypeVar('T', bound=Model)
 
@@ -52,8 +55,34 @@ class IRepository(Generic[T], ABC):
     def filter_by(self, **kwargs) -> QuerySet[T]:
         """Filter entities by given criteria"""
         pass
+    
+    @abstractmethod
+    def get_many(self, ids: Iterable[int], for_update: bool = False) -> Dict[int, T]:
+        """Get several entities by ID, keyed by ID, optionally locking them"""
+        pass
+    
+    @abstractmethod
+    def bulk_create(self, objs: Iterable[Union[T, Dict[str, Any]]], batch_size: Optional[int] = None, **kwargs) -> List[T]:
+        """Create several entities at once"""
+        pass
+    
+    @abstractmethod
+    def bulk_update(self, instances: Iterable[T], fields: List[str], batch_size: Optional[int] = None) -> int:
+        """Update the given fields on several entities at once"""
+        pass
+    
+    @abstractmethod
+    def bulk_soft_delete(self, ids: Iterable[int]) -> int:
+        """Soft delete several entities at once"""
+        pass
+    
+    @abstractmethod
+    def iterate(self, batch_size: int = 1000, queryset: Optional[QuerySet[T]] = None) -> Iterator[List[T]]:
+        """Iterate over entities in primary key ordered batches"""
+        pass
 
 
+@trace_methods
 class BaseRepository(IRepository[T]):
     """
     Base implementation of the repository interface.
@@ -62,6 +91,11 @@ class BaseRepository(IRepository[T]):
     Implements the Dependency Inversion Principle by depending on abstractions.
     """
     
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every public repository method is a span when tracing is enabled
+        trace_methods(cls)
+
     def __init__(self, model_class: Type[T]):
         self.model_class = model_class
     
@@ -104,3 +138,94 @@ class BaseRepository(IRepository[T]):
     def filter_by(self, **kwargs) -> QuerySet[T]:
         """Filter entities by given criteria"""
         return self.model_class.objects.filter(**kwargs)
+    
+    def get_many(self, ids: Iterable[int], for_update: bool = False) -> Dict[int, T]:
+        """
+        Get several entities by ID, keyed by ID, in a single query.
+        With for_update the rows stay locked until the transaction ends.
+        """
+        ids = list(ids)
+        if not ids:
+            return {}
+        queryset = self.model_class.objects.all()
+        if for_update:
+            # Locked in primary key order, so concurrent callers cannot deadlock
+            queryset = queryset.select_for_update().order_by('pk')
+        return queryset.in_bulk(ids)
+    
+    def bulk_create(self, objs: Iterable[Union[T, Dict[str, Any]]], batch_size: Optional[int] = None, **kwargs) -> List[T]:
+        """
+        Create several entities at once.
+        Accepts model instances or dicts of field values. Extra keyword
+        arguments (e.g. update_conflicts, unique_fields, update_fields)
+        are passed through to QuerySet.bulk_create.
+        """
+        instances = [
+            obj if isinstance(obj, self.model_class) else self.model_class(**obj)
+            for obj in objs
+        ]
+        if not instances:
+            return []
+        created = self.model_class.objects.bulk_create(instances, batch_size=batch_size, **kwargs)
+        self._send_bulk_changed('create', created)
+        return created
+    
+    def bulk_update(self, instances: Iterable[T], fields: List[str], batch_size: Optional[int] = None) -> int:
+        """
+        Update the given fields on several entities at once.
+        bulk_update bypasses auto_now, so updated_at is bumped here.
+        """
+        instances = list(instances)
+        if not instances:
+            return 0
+        fields = list(fields)
+        if self._has_field('updated_at'):
+            now = timezone.now()
+            for instance in instances:
+                instance.updated_at = now
+            if 'updated_at' not in fields:
+                fields.append('updated_at')
+        count = self.model_class.objects.bulk_update(instances, fields, batch_size=batch_size)
+        self._send_bulk_changed('update', instances)
+        return count
+    
+    def bulk_soft_delete(self, ids: Iterable[int]) -> int:
+        """Soft delete several entities at once"""
+        ids = list(ids)
+        if not ids:
+            return 0
+        count = self.model_class.objects.filter(pk__in=ids).update(
+            is_active=False,
+            updated_at=timezone.now()
+        )
+        self._send_bulk_changed('soft_delete', pks=ids)
+        return count
+    
+    def iterate(self, batch_size: int = 1000, queryset: Optional[QuerySet[T]] = None) -> Iterator[List[T]]:
+        """
+        Iterate over entities in primary key ordered batches.
+        Uses keyset pagination so each batch is a cheap indexed range scan.
+        """
+        if queryset is None:
+            queryset = self.model_class.objects.all()
+        queryset = queryset.order_by('pk')
+        last_pk = None
+        while True:
+            batch_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            batch = list(batch_queryset[:batch_size])
+            if not batch:
+                return
+            yield batch
+            if len(batch) < batch_size:
+                return
+            last_pk = batch[-1].pk
+    
+    def _has_field(self, name: str) -> bool:
+        """Check whether the model defines the given concrete field"""
+        return any(field.name == name for field in self.model_class._meta.concrete_fields)
+    
+    def _send_bulk_changed(self, action: str, instances: Optional[List[T]] = None, pks: Optional[List[Any]] = None) -> None:
+        """Fire a single aggregated change event for a bulk operation"""
+        if pks is None:
+            pks = [instance.pk for instance in instances or [] if instance.pk is not None]
+        bulk_changed.send(sender=self.model_class, action=action, instances=instances, pks=pks)
@@ -0,0 +1,111 @@
+"""
+Full-response caching for read-heavy, user-independent endpoints.
+
+Decorate a viewset action with ``cache_response('product', 'category')``.
+Rendered bytes are cached per normalized URL, accepted renderer and
+auth scope (``get_response_cache_scope()`` on the view, 'public' by
+default) and dropped through the cache tags (see apps.core.cache_tags)
+whenever a row of a listed model changes. Authentication, permissions
+and throttling still run on every request; only the handler is skipped.
+
+Responses are marked ``Vary: Accept, Authorization``. Anonymous requests
+to public-scope endpoints are also marked cacheable by shared caches for
+RESPONSE_CACHE_SHARED_MAX_AGE seconds, so nginx can micro-cache them.
+"""
+import hashlib
+import logging
+from functools import wraps
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+
+from .cache_tags import tagged_key
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_SCOPE = 'public'
+
+# Only machine formats; the browsable API embeds the user and a CSRF token
+CACHEABLE_FORMATS = {'json'}
+
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def response_cache_key(request, view, scope: str) -> str:
+    """
+    Cache key for a request: absolute path, sorted query string, renderer and scope
+    """
+    query = sorted((key, tuple(values)) for key, values in request.query_params.lists())
+    renderer = request.accepted_renderer
+    parts = (request.build_absolute_uri(request.path), query, renderer.format, request.accepted_media_type, scope)
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'response:{view.basename}:{view.action}:{digest}'
+
+
+def _set_cache_headers(request, response, scope: str) -> None:
+    patch_vary_headers(response, ('Accept', 'Authorization'))
+    shared_max_age = getattr(settings, 'RESPONSE_CACHE_SHARED_MAX_AGE', 0)
+    if scope == PUBLIC_SCOPE and not request.user.is_authenticated and shared_max_age:
+        patch_cache_control(response, public=True, max_age=0, s_maxage=shared_max_age)
+    else:
+        patch_cache_control(response, private=True, max_age=0)
+
+
+def cache_response(*tags: str, timeout: Optional[int] = None, cache_alias: str = 'default') -> Callable:
+    """
+    Cache the rendered 200 responses of a viewset action, invalidated by the given tags
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.accepted_renderer.format not in CACHEABLE_FORMATS:
+                return handler(view, request, *args, **kwargs)
+
+            get_scope = getattr(view, 'get_response_cache_scope', None)
+            scope = get_scope(request) if get_scope else PUBLIC_SCOPE
+            backend = caches[cache_alias]
+            try:
+                key = tagged_key(response_cache_key(request, view, scope), tags, cache_alias)
+                cached = backend.get(key)
+            except Exception:
+                logger.warning('Response cache unavailable', exc_info=True)
+                return handler(view, request, *args, **kwargs)
+
+            if cached is not None:
+                content, content_type, validators = cached
+                response = HttpResponse(content, content_type=content_type)
+                for header, value in validators.items():
+                    response[header] = value
+                response['X-Cache'] = 'HIT'
+                _set_cache_headers(request, response, scope)
+                # Replay the conditional GET handling the view would have done
+                return get_conditional_response(
+                    request,
+                    etag=validators.get('ETag'),
+                    last_modified=parse_http_date_safe(validators.get('Last-Modified', '')),
+                    response=response,
+                )
+
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                ttl = timeout if timeout is not None else getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+
+                def store(rendered):
+                    try:
+                        validators = {
+                            header: rendered[header] for header in VALIDATOR_HEADERS if rendered.has_header(header)
+                        }
+                        backend.set(key, (rendered.content, rendered['Content-Type'], validators), ttl)
+                    except Exception:
+                        logger.warning('Failed to store cached response', exc_info=True)
+
+                response.add_post_render_callback(store)
+                response['X-Cache'] = 'MISS'
+                _set_cache_headers(request, response, scope)
+            return response
+        return wrapper
+    return decorator
@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, TypeVar, Generic, Type
+from typing import List, Dict, Any, Optional, TypeVar, Generic, Type, Iterable, Iterator, Union
 from django.db.models import Model, QuerySet
 from .repositories import IRepository
+from .tracing import trace_methods
 
 T = TypeVar('T', bound=Model)
 
@@ -53,8 +54,34 @@ class IService(Generic[T], ABC):
     def filter_by(self, **kwargs) -> QuerySet[T]:
         """Filter entities by given criteria"""
         pass
+    
+    @abstractmethod
+    def get_many(self, ids: Iterable[int], for_update: bool = False) -> Dict[int, T]:
+        """Get several entities by ID, keyed by ID, optionally locking them"""
+        pass
+    
+    @abstractmethod
+    def bulk_create(self, objs: Iterable[Union[T, Dict[str, Any]]], batch_size: Optional[int] = None, **kwargs) -> List[T]:
+        """Create several entities at once"""
+        pass
+    
+    @abstractmethod
+    def bulk_update(self, instances: Iterable[T], fields: List[str], batch_size: Optional[int] = None) -> int:
+        """Update the given fields on several entities at once"""
+        pass
+    
+    @abstractmethod
+    def bulk_soft_delete(self, ids: Iterable[int]) -> int:
+        """Soft delete several entities at once"""
+        pass
+    
+    @abstractmethod
+    def iterate(self, batch_size: int = 1000, queryset: Optional[QuerySet[T]] = None) -> Iterator[List[T]]:
+        """Iterate over entities in primary key ordered batches"""
+        pass
 
 
+@trace_methods
 class BaseService(IService[T]):
     """
     Base implementation of the service interface.
@@ -63,6 +90,11 @@ class BaseService(IService[T]):
     Implements the Dependency Inversion Principle by depending on abstractions.
     """
     
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every public service method is a span when tracing is enabled
+        trace_methods(cls)
+
     def __init__(self, repository: IRepository[T]):
         self.repository = repository
     
@@ -107,3 +139,23 @@ class BaseService(IService[T]):
     def filter_by(self, **kwargs) -> QuerySet[T]:
         """Filter entities by given criteria"""
         return self.repository.filter_by(**kwargs)
+    
+    def get_many(self, ids: Iterable[int], for_update: bool = False) -> Dict[int, T]:
+        """Get several entities by ID, keyed by ID, optionally locking them"""
+        return self.repository.get_many(ids, for_update=for_update)
+    
+    def bulk_create(self, objs: Iterable[Union[T, Dict[str, Any]]], batch_size: Optional[int] = None, **kwargs) -> List[T]:
+        """Create several entities at once"""
+        return self.repository.bulk_create(objs, batch_size=batch_size, **kwargs)
+    
+    def bulk_update(self, instances: Iterable[T], fields: List[str], batch_size: Optional[int] = None) -> int:
+        """Update the given fields on several entities at once"""
+        return self.repository.bulk_update(instances, fields, batch_size=batch_size)
+    
+    def bulk_soft_delete(self, ids: Iterable[int]) -> int:
+        """Soft delete several entities at once"""
+        return self.repository.bulk_soft_delete(ids)
+    
+    def iterate(self, batch_size: int = 1000, queryset: Optional[QuerySet[T]] = None) -> Iterator[List[T]]:
+        """Iterate over entities in primary key ordered batches"""
+        return self.repository.iterate(batch_size, queryset)
@@ -1,29 +1,58 @@
-from django.db.models.signals import post_save, post_delete, pre_save
-from django.dispatch import receiver
-from django.core.cache import cache
+from django.db.models.signals import post_init, post_save, post_delete, pre_save
+from django.dispatch import receiver, Signal
+from .cache_tags import bulk_tags, instance_tags, invalidate_tags, remember_relations
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Sent once per bulk repository operation instead of one post_save per row.
+# Receivers get ``action`` ('create', 'update' or 'soft_delete'), ``pks`` and,
+# when available, the affected ``instances``.
+bulk_changed = Signal()
+
 
 def invalidate_cache(sender, instance, **kwargs):
     """
-    Invalidate cache for the given model instance
+    Invalidate every cache tag that depends on the given model instance
+    """
+    tags = instance_tags(instance)
+    invalidate_tags(tags)
+
+    logger.debug(f"Cache tags invalidated: {', '.join(sorted(tags))}")
+
+
+def invalidate_bulk_cache(sender, instances=None, pks=None, **kwargs):
+    """
+    Invalidate the cache tags of all instances touched by a bulk operation in one round-trip
     """
-    model_name = sender.__name__.lower()
-    cache_key = f"{model_name}_{instance.pk}"
-    cache.delete(cache_key)
-    
-    # Also invalidate list cache
-    list_cache_key = f"{model_name}_list"
-    cache.delete(list_cache_key)
-    
-    logger.debug(f"Cache invalidated for {cache_key} and {list_cache_key}")
+    if instances:
+        tags = set().union(*(instance_tags(instance) for instance in instances))
+    else:
+        tags = bulk_tags(sender, pks or [])
+    invalidate_tags(tags)
+
+    logger.debug(f"Cache invalidated for {len(tags)} {sender.__name__.lower()} tags")
 
 
 def register_model_signals(model):
     """
     Register signals for the given model
     """
-    post_save.connect(invalidate_cache, sender=model)
-    post_delete.connect(invalidate_cache, sender=model)
+    uid = f'cache_tags_{model._meta.label_lower}'
+    if any(field.is_relation for field in model._meta.concrete_fields):
+        post_init.connect(remember_relations, sender=model, dispatch_uid=uid)
+    post_save.connect(invalidate_cache, sender=model, dispatch_uid=uid)
+    post_delete.connect(invalidate_cache, sender=model, dispatch_uid=uid)
+    bulk_changed.connect(invalidate_bulk_cache, sender=model, dispatch_uid=uid)
+
+
+def register_base_model_signals():
+    """
+    Register cache invalidation for every concrete BaseModel subclass
+    """
+    from django.apps import apps
+    from .models import BaseModel
+
+    for model in apps.get_models():
+        if issubclass(model, BaseModel):
+            register_model_signals(model)
@@ -0,0 +1,276 @@
+"""
+Slow query log.
+
+An execute wrapper installed on every database connection times each
+statement. Statements slower than THRESHOLD_MS are queued in memory with
+the application frame that issued them; nothing else happens on the
+calling thread. A background thread normalizes them into fingerprints
+(literals and IN lists removed), aggregates them into the SlowQuery
+table every FLUSH_INTERVAL seconds and runs EXPLAIN (ANALYZE when
+EXPLAIN_ANALYZE is set) for a sample of the SELECT statements, at most
+once per fingerprint every EXPLAIN_INTERVAL seconds. The admin ranks
+them by total time.
+"""
+import hashlib
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import IntegrityError, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Frames of these modules are never reported as the call site
+INSTRUMENTATION_MODULES = frozenset((
+    __name__, 'apps.core.instrumentation', 'apps.core.tracing', 'apps.core.middleware',
+))
+
+_PLACEHOLDER = re.compile(r'%s|%\(\w+\)s')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?\b')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+# (database alias, sql, params, executemany, duration in ms, call site)
+SlowQueryEvent = Tuple[str, str, Any, bool, float, str]
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Replace literals and placeholders with ``?`` and value lists with ``(...)``,
+    so the same statement with different arguments has one fingerprint
+    """
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _VALUE_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def sql_fingerprint(alias: str, normalized_sql: str) -> str:
+    return hashlib.blake2b(f'{alias}:{normalized_sql}'.encode(), digest_size=16).hexdigest()
+
+
+def find_call_site() -> str:
+    """
+    ``module:function:line`` of the innermost application frame on the stack
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith('apps.') and module not in INSTRUMENTATION_MODULES:
+            return f'{module}:{frame.f_code.co_name}:{frame.f_lineno}'
+        frame = frame.f_back
+    return ''
+
+
+class SlowQueryLog:
+    """
+    Execute wrapper recording slow statements, and the writer that stores them
+    """
+
+    def __init__(self, threshold_ms: float = 100, explain_sample_rate: float = 0.1, explain_analyze: bool = False,
+                 explain_interval: float = 3600, flush_interval: float = 5, max_pending: int = 10000,
+                 background: bool = True):
+        self.threshold_ns = int(threshold_ms * 1e6)
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_analyze = explain_analyze
+        self.explain_interval = explain_interval
+        self.flush_interval = flush_interval
+        self.background = background
+        self.queue: queue.Queue = queue.Queue(max_pending)
+        self.dropped = 0
+        # fingerprint -> monotonic time of its last EXPLAIN
+        self._explained: Dict[str, float] = {}
+        # Set while flushing, so the writer's own statements are not recorded
+        self._local = threading.local()
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(self._local, 'flushing', False):
+            return execute(sql, params, many, context)
+        started = time.perf_counter_ns()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter_ns() - started
+            if duration >= self.threshold_ns:
+                self.record(context['connection'].alias, sql, params, many, duration / 1e6)
+
+    def record(self, alias: str, sql: str, params: Any, many: bool, duration_ms: float) -> None:
+        if self.background and self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait((alias, sql, params, many, duration_ms, find_call_site()))
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # A writer inherited from a parent process has no thread here
+            self.queue = queue.Queue(self.queue.maxsize)
+            threading.Thread(target=self._run, name='slow-query-log', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to store slow queries')
+            finally:
+                # Connections opened by this thread are its own
+                connections.close_all()
+
+    def _drain(self) -> List[SlowQueryEvent]:
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _should_explain(self, fingerprint: str, sql: str) -> bool:
+        if sql.lstrip()[:6].upper() != 'SELECT' or ' FOR UPDATE' in sql.upper():
+            return False
+        now = time.monotonic()
+        if now - self._explained.get(fingerprint, -self.explain_interval) < self.explain_interval:
+            return False
+        if random.random() >= self.explain_sample_rate:
+            return False
+        self._explained[fingerprint] = now
+        return True
+
+    def flush(self) -> int:
+        """
+        Store the queued statements; returns the number of fingerprints written
+        """
+        events = self._drain()
+        if not events:
+            return 0
+        aggregated: Dict[str, Dict[str, Any]] = {}
+        for alias, sql, params, many, duration_ms, call_site in events:
+            normalized = normalize_sql(sql)
+            fingerprint = sql_fingerprint(alias, normalized)
+            entry = aggregated.get(fingerprint)
+            if entry is None:
+                entry = aggregated[fingerprint] = {
+                    'database': alias, 'normalized_sql': normalized, 'call_site': call_site,
+                    'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'sample': None,
+                }
+            entry['calls'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            if not many and entry['sample'] is None and self._should_explain(fingerprint, sql):
+                entry['sample'] = (sql, params)
+
+        self._local.flushing = True
+        try:
+            for fingerprint, entry in aggregated.items():
+                sample = entry.pop('sample')
+                plan = self.explain(entry['database'], *sample) if sample else ''
+                self._save(fingerprint, entry, plan)
+                logger.warning(
+                    'Slow query %s: %d calls, max %.1fms at %s: %.300s',
+                    fingerprint, entry['calls'], entry['max_ms'], entry['call_site'] or '?', entry['normalized_sql'],
+                )
+        finally:
+            self._local.flushing = False
+        return len(aggregated)
+
+    def explain(self, alias: str, sql: str, params: Any) -> str:
+        """
+        The plan of a statement, in the database's own text format
+        """
+        connection = connections[alias]
+        try:
+            prefix = connection.ops.explain_query_prefix(**({'analyze': True} if self.explain_analyze else {}))
+        except ValueError:
+            # Backend without ANALYZE (e.g. SQLite)
+            prefix = connection.ops.explain_query_prefix()
+        try:
+            # A failed EXPLAIN must not break a surrounding transaction
+            with transaction.atomic(using=alias), connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+        except Exception as exc:
+            return f'EXPLAIN failed: {exc}'
+        return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+    def _save(self, fingerprint: str, entry: Dict[str, Any], plan: str) -> None:
+        from .models import SlowQuery
+
+        now = timezone.now()
+        changes = {
+            'calls': F('calls') + entry['calls'],
+            'total_ms': F('total_ms') + entry['total_ms'],
+            'max_ms': Greatest('max_ms', Value(entry['max_ms'])),
+            'call_site': entry['call_site'][:255],
+            'last_seen': now,
+        }
+        if plan:
+            changes.update(explain=plan, explained_at=now)
+        if SlowQuery.objects.filter(fingerprint=fingerprint).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                SlowQuery.objects.create(
+                    fingerprint=fingerprint,
+                    database=entry['database'],
+                    normalized_sql=entry['normalized_sql'],
+                    call_site=entry['call_site'][:255],
+                    calls=entry['calls'],
+                    total_ms=entry['total_ms'],
+                    max_ms=entry['max_ms'],
+                    explain=plan,
+                    explained_at=now if plan else None,
+                    last_seen=now,
+                )
+        except IntegrityError:
+            # Created by another process in the meantime
+            SlowQuery.objects.filter(fingerprint=fingerprint).update(**changes)
+
+
+slow_query_log: Optional[SlowQueryLog] = None
+
+
+def _install(sender, connection, **kwargs) -> None:
+    if slow_query_log is not None and slow_query_log not in connection.execute_wrappers:
+        # Outermost, so it also times the wrappers added per request
+        connection.execute_wrappers.insert(0, slow_query_log)
+
+
+def configure_slow_query_log() -> Optional[SlowQueryLog]:
+    """
+    Install the slow query log on every new connection when SLOW_QUERY_LOG['ENABLED'] is set
+    """
+    from django.conf import settings
+
+    global slow_query_log
+    config = getattr(settings, 'SLOW_QUERY_LOG', {})
+    if not config.get('ENABLED', False):
+        return None
+    slow_query_log = SlowQueryLog(
+        threshold_ms=config.get('THRESHOLD_MS', 100),
+        explain_sample_rate=config.get('EXPLAIN_SAMPLE_RATE', 0.1),
+        explain_analyze=config.get('EXPLAIN_ANALYZE', False),
+        explain_interval=config.get('EXPLAIN_INTERVAL', 3600),
+        flush_interval=config.get('FLUSH_INTERVAL', 5),
+        max_pending=config.get('MAX_PENDING', 10000),
+    )
+    connection_created.connect(_install, dispatch_uid='slow_query_log')
+    return slow_query_log
@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+
+from django.test.runner import DiscoverRunner
+
+from .budgets import REPORT_ENV, format_report, load
+
+
+class BudgetReportRunner(DiscoverRunner):
+    """
+    Test runner printing the performance budget checks that came closest
+    to their limit once the tests have run (``--budget-report N``)
+    """
+
+    def __init__(self, budget_report: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.budget_report = budget_report
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--budget-report', type=int, default=0, metavar='N',
+            help='Print the N performance budget checks closest to their limit.',
+        )
+
+    def run_tests(self, test_labels, **kwargs):
+        if not self.budget_report:
+            return super().run_tests(test_labels, **kwargs)
+        fd, path = tempfile.mkstemp(prefix='budgets-', suffix='.jsonl')
+        os.close(fd)
+        # Inherited by the parallel test processes
+        os.environ[REPORT_ENV] = path
+        try:
+            return super().run_tests(test_labels, **kwargs)
+        finally:
+            del os.environ[REPORT_ENV]
+            sys.stderr.write('\n' + format_report(load(path), self.budget_report) + '\n')
+            os.unlink(path)
@@ -1,10 +1,43 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from io import StringIO
+from unittest import mock
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.urls import reverse
+from prometheus_client import REGISTRY
 from django.contrib.auth import get_user_model
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
 from rest_framework_simplejwt.tokens import RefreshToken
+from .budgets import REPORT_ENV, BudgetRecord, format_report, load as load_budgets, record as record_budget
+from .cache import TwoTierCache
+from .cache_tags import get_tag_generations, invalidate_tags
+from .tracing import current_span, span, traced
+from .utils import cache_result, measure_execution_time
+from .fake_redis import FakeRedis
+from .instrumentation import collect_request_metrics, instrument_cache_backends
+from .log_handlers import QueueListenerHandler
+from .middleware import ProfilingMiddleware, RequestLoggingMiddleware, build_body_masker
+from .models import SlowQuery
+from .slow_queries import SlowQueryLog, normalize_sql
+from .profiling import ProfileStore, StackSampler, make_profile_token, read_folded
 
 User = get_user_model()
 
@@ -57,6 +90,8 @@ class BaseAPITestCase(APITestCase):
         """
         Set up test data
         """
+        # Cached responses and rate limits must not leak between tests
+        cache.clear()
         self.client = APIClient()
 
         self.admin_user = User.objects.create_user(
@@ -127,3 +162,894 @@ class BaseAPITestCase(APITestCase):
         """
         for key in expected_keys:
             self.assertIn(key, response.data)
+
+    def measure_request(self, request: Callable[[], Any], repeat: int = 1) -> Tuple[Any, int, float]:
+        """
+        Call ``request`` ``repeat`` times with an empty cache, so the uncached
+        path is measured. Returns the last response, its query count and the
+        median time in milliseconds.
+        """
+        timings = []
+        for _ in range(repeat):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = request()
+                timings.append((time.perf_counter() - started) * 1000)
+        self.assertLess(response.status_code, 400, f'Measured request failed with {response.status_code}')
+        return response, len(queries), statistics.median(timings)
+
+    @contextmanager
+    def query_budget(self, name: str, max_queries: int):
+        """
+        Assert that the block runs at most ``max_queries`` database queries
+        """
+        with CaptureQueriesContext(connection) as queries:
+            yield queries
+        record_budget(BudgetRecord(self.id(), name, len(queries), max_queries))
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{name}: {len(queries)} queries, budget {max_queries}:\n'
+            + '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
+
+    def assert_scales(self, name: str, request: Callable[[], Any], grow: Callable[[int], None],
+                      sizes: Sequence[int] = (1, 20), max_queries: Optional[int] = None, per_item: int = 0,
+                      max_time_ratio: Optional[float] = None, repeat: int = 5):
+        """
+        Budgets that scale with the fixture: ``grow(size)`` brings the fixture
+        to each of ``sizes`` before ``request`` is measured.
+
+        - queries may rise by at most ``per_item`` per extra fixture row
+          (0: O(1) queries), starting from at most ``max_queries``
+        - the median time at the largest size may be at most
+          ``max_time_ratio`` times the one at the smallest
+        """
+        counts, timings = [], []
+        for size in sizes:
+            grow(size)
+            _, count, elapsed = self.measure_request(request, repeat)
+            counts.append(count)
+            timings.append(elapsed)
+
+        budget = (counts[0] if max_queries is None else max_queries) + per_item * (sizes[-1] - sizes[0])
+        time_ratio = timings[-1] / timings[0] if timings[0] else 1.0
+        record_budget(BudgetRecord(
+            self.id(), name, counts[-1], budget, sizes=list(sizes), counts=counts,
+            time_ratio=round(time_ratio, 2), max_time_ratio=max_time_ratio,
+        ))
+        if max_queries is not None:
+            self.assertLessEqual(counts[0], max_queries, f'{name}: {counts[0]} queries, budget {max_queries}')
+        self.assertLessEqual(
+            counts[-1], budget,
+            f'{name}: {counts} queries for {list(sizes)} rows; at most {per_item} more per row allowed',
+        )
+        if max_time_ratio is not None:
+            self.assertLessEqual(
+                time_ratio, max_time_ratio,
+                f'{name}: {timings[-1]:.1f}ms for {sizes[-1]} rows is {time_ratio:.1f}x the time '
+                f'for {sizes[0]}, budget {max_time_ratio}x',
+            )
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    """
+    Tests for the L1/L2 cache backend, using FakeRedis as the shared server
+    """
+
+    def setUp(self):
+        # Two caches on the same fake server behave like two worker processes
+        self.server = f'redis://fake-{uuid.uuid4().hex}'
+        self.first = self.make_cache('a')
+        self.second = self.make_cache('b')
+
+    def make_cache(self, node, **options):
+        cache = TwoTierCache(f'{self.server}#{node}', {
+            'OPTIONS': {'CLIENT_CLASS': 'apps.core.fake_redis.FakeRedis', 'L1_TIMEOUT': 60, **options},
+        })
+        cache.get_client()
+        self.addCleanup(cache._state.stop)
+        return cache
+
+    def wait_for(self, predicate):
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            if predicate():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_set_and_get(self):
+        """Test round-tripping values through both tiers"""
+        self.first.set('key', {'a': 1})
+        self.first.set('count', 5)
+        self.assertEqual(self.second.get('key'), {'a': 1})
+        self.assertEqual(self.second.get('count'), 5)
+        self.assertIsNone(self.second.get('missing'))
+        self.assertEqual(self.second.get_many(['key', 'count', 'missing']), {'key': {'a': 1}, 'count': 5})
+
+    def test_l1_serves_hot_keys_without_redis(self):
+        """Test that repeated reads are served from the local tier"""
+        self.first.set('key', 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+
+        with mock.patch.object(FakeRedis, 'get', side_effect=AssertionError('L2 hit')):
+            self.assertEqual(self.second.get('key'), 'value')
+
+    def test_l1_returns_copies(self):
+        """Test that mutating a returned value does not change the cached one"""
+        self.first.set('key', [1, 2])
+        self.first.get('key').append(3)
+        self.assertEqual(self.first.get('key'), [1, 2])
+
+    def test_writes_invalidate_other_processes(self):
+        """Test that set, delete and clear are broadcast to every L1"""
+        self.first.set('key', 'old')
+        self.assertEqual(self.second.get('key'), 'old')
+
+        self.first.set('key', 'new')
+        self.assertTrue(self.wait_for(lambda: self.second.get('key') == 'new'))
+
+        self.first.delete('key')
+        self.assertTrue(self.wait_for(lambda: self.second.get('key') is None))
+
+        self.first.set('key', 'again')
+        self.assertEqual(self.second.get('key'), 'again')
+        self.first.clear()
+        self.assertTrue(self.wait_for(lambda: self.second.get('key') is None))
+
+    def test_clear_keeps_other_data(self):
+        """Test that clear removes this cache's keys in every version and nothing else"""
+        prefixed = TwoTierCache(f'{self.server}#c', {
+            'KEY_PREFIX': 'shop*',
+            'OPTIONS': {'CLIENT_CLASS': 'apps.core.fake_redis.FakeRedis', 'L1_TIMEOUT': 60},
+        })
+        self.addCleanup(prefixed._state.stop)
+        client = self.first.get_client()
+        # A Celery queue in the same database
+        client.set('celery', 'queued task')
+        self.first.set('key', 'value')
+        self.first.set('key', 'value', version=2)
+        prefixed.set('key', 'other')
+
+        prefixed.clear()
+        self.assertEqual(self.first.get('key'), 'value')
+        self.assertIsNone(prefixed.get('key'))
+
+        with mock.patch.object(TwoTierCache, 'CLEAR_BATCH_SIZE', 1):
+            self.first.clear()
+        self.assertIsNone(self.second.get('key'))
+        self.assertIsNone(self.second.get('key', version=2))
+        self.assertEqual(client.get('celery'), b'queued task')
+
+    def test_add_and_incr(self):
+        """Test atomic add and incr semantics"""
+        self.assertTrue(self.first.add('key', 1))
+        self.assertFalse(self.second.add('key', 2))
+        self.assertEqual(self.second.incr('key'), 2)
+        self.assertTrue(self.wait_for(lambda: self.first.get('key') == 2))
+        with self.assertRaises(ValueError):
+            self.first.incr('missing')
+
+    def test_incr_keeps_ttl_and_rejects_non_integers(self):
+        """Test that incr keeps the key's expiry and raises ValueError like Django's backends"""
+        self.first.set('attempts', 1, timeout=60)
+        self.assertEqual(self.first.incr('attempts', 2), 3)
+        self.assertGreater(self.first.get_client().ttl(self.first.make_key('attempts')), 0)
+
+        self.first.set('pickled', 'text')
+        with self.assertRaises(ValueError):
+            self.first.incr('pickled')
+
+    def test_timeouts(self):
+        """Test that a zero timeout deletes and None persists"""
+        self.first.set('key', 'value', timeout=0)
+        self.assertIsNone(self.second.get('key'))
+
+        self.first.set('key', 'value', timeout=None)
+        self.assertEqual(self.first.get_client().ttl(self.first.make_key('key')), -1)
+
+    def test_l1_is_bounded(self):
+        """Test that the local tier evicts least recently used entries"""
+        cache = self.make_cache('c', L1_MAX_ENTRIES=2)
+        for i in range(5):
+            cache.set(f'key{i}', i)
+        self.assertEqual(len(cache.l1), 2)
+        self.assertEqual(cache.get('key0'), 0)
+
+
+class CacheResultTests(SimpleTestCase):
+    """
+    Tests for the cache_result decorator
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def test_key_is_stable_across_instances_and_call_styles(self):
+        """Test that self is ignored and arguments are bound before hashing"""
+        calls = self.calls
+
+        class Service:
+            @cache_result(timeout=60)
+            def lookup(self, product_id, include_stock=False):
+                calls.append(product_id)
+                return {'id': product_id}
+
+        self.assertEqual(Service().lookup(1), {'id': 1})
+        self.assertEqual(Service().lookup(product_id=1), {'id': 1})
+        self.assertEqual(Service().lookup(1, include_stock=False), {'id': 1})
+        self.assertEqual(calls, [1])
+
+        Service().lookup(2)
+        self.assertEqual(calls, [1, 2])
+
+    def test_model_arguments_are_keyed_by_primary_key(self):
+        """Test that model instances hash by label and pk, not repr"""
+        User = get_user_model()
+
+        @cache_result(timeout=60)
+        def describe(user):
+            self.calls.append(user.pk)
+            return user.pk
+
+        describe(User(pk=1, username='a'))
+        describe(User(pk=1, username='b'))
+        self.assertEqual(self.calls, [1])
+
+    def test_unstable_arguments_are_rejected(self):
+        """Test that objects without a stable identity raise TypeError"""
+        @cache_result(timeout=60)
+        def describe(value):
+            return value
+
+        with self.assertRaises(TypeError):
+            describe(object())
+
+    def test_none_is_cached(self):
+        """Test negative caching"""
+        @cache_result(timeout=60)
+        def find(name):
+            self.calls.append(name)
+            return None
+
+        self.assertIsNone(find('missing'))
+        self.assertIsNone(find('missing'))
+        self.assertEqual(self.calls, ['missing'])
+
+    def test_single_flight(self):
+        """Test that concurrent misses compute the value once"""
+        @cache_result(timeout=60)
+        def slow(value):
+            self.calls.append(value)
+            time.sleep(0.2)
+            return value * 2
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow(21))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [42] * 8)
+        self.assertEqual(self.calls, [21])
+        self.assertEqual(slow.stats()['waits'], 7)
+
+    def test_early_refresh(self):
+        """Test that XFetch recomputes a value before it expires"""
+        @cache_result(timeout=60)
+        def compute(value):
+            self.calls.append(value)
+            return value
+
+        compute(1)
+        # Pretend the value took long to compute, so it is refreshed well before expiry
+        cache.set(compute.cache_key(1), (1, 1000.0, time.time() + 60), 60)
+        with mock.patch('apps.core.utils.random.random', return_value=0.5):
+            compute(1)
+        self.assertEqual(self.calls, [1, 1])
+        self.assertEqual(compute.stats()['early_refreshes'], 1)
+
+    def test_stats_and_invalidate(self):
+        """Test hit/miss counters and explicit invalidation"""
+        @cache_result(timeout=60)
+        def compute(value):
+            self.calls.append(value)
+            return value
+
+        compute(1)
+        compute(1)
+        compute.invalidate(1)
+        compute(1)
+
+        stats = compute.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertAlmostEqual(stats['hit_rate'], 1 / 3)
+        self.assertEqual(self.calls, [1, 1])
+
+
+class CacheTagTests(BaseTestCase):
+    """
+    Tests for tag-based cache invalidation
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        from apps.product.models import Category, Product
+        from apps.vendor.models import Vendor
+
+        self.vendor = Vendor.objects.create(user=self.vendor_user, company_name='Tag Vendor', address='1 Tag St')
+        self.category = Category.objects.create(name='Tags')
+        self.other_category = Category.objects.create(name='Other Tags')
+        self.product = Product.objects.create(
+            vendor=self.vendor, category=self.category, name='Tagged', description='Tagged', price=10, stock=1
+        )
+
+    def test_invalidate_changes_generation(self):
+        """Test that invalidating a tag changes only its own generation"""
+        before = get_tag_generations(['a', 'b'])
+        self.assertEqual(get_tag_generations(['a', 'b']), before)
+
+        invalidate_tags(['a'])
+
+        after = get_tag_generations(['a', 'b'])
+        self.assertNotEqual(after['a'], before['a'])
+        self.assertEqual(after['b'], before['b'])
+
+    def test_save_invalidates_instance_and_relation_tags(self):
+        """Test that saving a product bumps its own, its model's and its parents' tags"""
+        tags = [
+            'product', f'product:{self.product.pk}', f'vendor:{self.vendor.pk}:products',
+            f'category:{self.category.pk}:products', f'category:{self.other_category.pk}:products', 'vendor',
+        ]
+        before = get_tag_generations(tags)
+
+        self.product.category = self.other_category
+        self.product.save()
+
+        after = get_tag_generations(tags)
+        changed = {tag for tag in tags if after[tag] != before[tag]}
+        # The category the product moved away from is invalidated as well
+        self.assertEqual(changed, set(tags) - {'vendor'})
+
+    def test_bulk_soft_delete_invalidates_relation_tags(self):
+        """Test that a bulk change loads foreign keys to find the affected tags"""
+        from apps.product.services import ProductService
+
+        tag = f'vendor:{self.vendor.pk}:products'
+        before = get_tag_generations([tag])[tag]
+
+        ProductService().bulk_soft_delete([self.product.pk])
+
+        self.assertNotEqual(get_tag_generations([tag])[tag], before)
+
+    def test_cache_result_tags(self):
+        """Test that tagged cache_result entries are dropped when a dependent row changes"""
+        from apps.product.models import Product
+        calls = []
+
+        @cache_result(timeout=60, tags=['vendor:{vendor_id}:products'])
+        def count_products(vendor_id):
+            calls.append(vendor_id)
+            return Product.objects.filter(vendor_id=vendor_id).count()
+
+        self.assertEqual(count_products(self.vendor.pk), 1)
+        self.assertEqual(count_products(self.vendor.pk), 1)
+        self.assertEqual(len(calls), 1)
+
+        Product.objects.create(vendor=self.vendor, name='Another', description='x', price=1, stock=1)
+
+        self.assertEqual(count_products(self.vendor.pk), 2)
+        self.assertEqual(len(calls), 2)
+
+
+class RequestLoggingMiddlewareTests(SimpleTestCase):
+    """
+    Tests for RequestLoggingMiddleware
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def make_middleware(self, status_code=200, content=b'{}', **config):
+        with self.settings(REQUEST_LOGGING=config):
+            return RequestLoggingMiddleware(
+                lambda request: HttpResponse(content, status=status_code, content_type='application/json')
+            )
+
+    def test_masks_nested_fields_without_parsing(self):
+        """Test that sensitive fields are masked at any depth, in JSON and form bodies"""
+        mask = build_body_masker(['password', 'token'])
+
+        masked = mask('{"user": {"password": "se\\"cret", "name": "x"}, "token": 12, "items": [{"token": null}]}')
+        self.assertNotIn('cret', masked)
+        self.assertEqual(masked.count('"******"'), 3)
+        self.assertIn('"name": "x"', masked)
+        self.assertEqual(mask('username=a&password=b&next=c'), 'username=a&password=******&next=c')
+
+    def test_body_is_not_read_unless_debug_is_enabled(self):
+        """Test that request bodies and headers are left alone at INFO level"""
+        middleware = self.make_middleware()
+        request = self.factory.post('/api/', data='{"password": "x"}', content_type='application/json')
+
+        with mock.patch.object(type(request), 'body', new_callable=mock.PropertyMock) as body:
+            with self.assertLogs('apps.core.middleware', level='INFO') as logs:
+                middleware(request)
+        body.assert_not_called()
+        self.assertEqual(len(logs.records), 1)
+        self.assertRegex(logs.output[0], r'POST /api/ - 200 in \d+\.\d{3}ms')
+
+    def test_debug_logs_masked_body(self):
+        """Test that DEBUG logging masks bodies and credentials"""
+        middleware = self.make_middleware(status_code=400, content=b'{"detail": "bad", "access": "abc"}')
+        request = self.factory.post(
+            '/api/', data='{"password": "hunter2"}', content_type='application/json', HTTP_AUTHORIZATION='Bearer t'
+        )
+
+        with self.assertLogs('apps.core.middleware', level='DEBUG') as logs:
+            middleware(request)
+
+        output = '\n'.join(logs.output)
+        for secret in ('hunter2', 'Bearer t', 'abc'):
+            self.assertNotIn(secret, output)
+        self.assertIn('"password": "******"', output)
+
+    def test_sampling_keeps_errors(self):
+        """Test that sampled-out successes are not logged but errors always are"""
+        request = self.factory.get('/api/')
+
+        with self.assertNoLogs('apps.core.middleware', level='INFO'):
+            self.make_middleware(SAMPLE_RATE=0)(request)
+        with self.assertLogs('apps.core.middleware', level='INFO'):
+            self.make_middleware(status_code=500, SAMPLE_RATE=0)(request)
+
+
+class QueueListenerHandlerTests(SimpleTestCase):
+    """
+    Tests for the non-blocking logging handler
+    """
+
+    def test_records_are_written_by_the_listener_thread(self):
+        """Test that records reach the target handler from another thread, at its own level"""
+        written = []
+
+        class Target(logging.Handler):
+            def emit(self, record):
+                written.append((record.getMessage(), threading.current_thread()))
+
+        target = Target(level=logging.WARNING)
+        handler = QueueListenerHandler(targets=[target])
+        test_logger = logging.getLogger('apps.core.tests.queue')
+        test_logger.addHandler(handler)
+        test_logger.propagate = False
+        try:
+            test_logger.warning('disk is %s', 'slow')
+            test_logger.info('ignored by the target')
+        finally:
+            test_logger.removeHandler(handler)
+            handler.close()
+
+        self.assertEqual([message for message, _ in written], ['disk is slow'])
+        self.assertIsNot(written[0][1], threading.current_thread())
+
+
+class RequestMetricsTests(BaseAPITestCase):
+    """
+    Tests for per-request SQL, cache and serializer metrics
+    """
+
+    def test_cache_hits_and_misses(self):
+        """Test that cache reads are counted once each, including cached None values"""
+        instrument_cache_backends()
+        with collect_request_metrics() as metrics:
+            cache.set('metrics_a', None)
+            self.assertIsNone(cache.get('metrics_a', 'default'))
+            self.assertEqual(cache.get('metrics_b', 'default'), 'default')
+            cache.get_many(['metrics_a', 'metrics_b'])
+
+        self.assertEqual((metrics.cache_calls, metrics.cache_hits, metrics.cache_misses), (4, 2, 2))
+        self.assertGreater(metrics.cache_ns, 0)
+
+    def test_server_timing_and_access_log(self):
+        """Test the Server-Timing header and the JSON access log line"""
+        self.authenticate_as_customer()
+        url = reverse('user-me')
+
+        # The test client loads its middleware on the first request
+        with self.settings(REQUEST_METRICS={'SERVER_TIMING': True}):
+            with self.assertLogs('apps.core.access', level='INFO') as logs:
+                response = self.client.get(url)
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['path'], url)
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['user_id'], self.customer_user.pk)
+        self.assertEqual(entry['response_bytes'], len(response.content))
+        self.assertGreaterEqual(entry['db_queries'], 1)
+        self.assertGreater(entry['serialize_ms'], 0)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn(f'desc="{entry["db_queries"]} queries"', response['Server-Timing'])
+
+
+class PrometheusMetricsTests(BaseAPITestCase):
+    """
+    Tests for the Prometheus metrics and the /metrics endpoint
+    """
+
+    def test_request_metrics_are_labelled_by_route(self):
+        """Test that requests are recorded under their URL name, not their path"""
+        labels = {'route': 'product-list', 'method': 'GET', 'status': '200'}
+        before = REGISTRY.get_sample_value('http_request_duration_seconds_count', labels) or 0
+
+        response = self.client.get(reverse('product-list'))
+
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(REGISTRY.get_sample_value('http_request_duration_seconds_count', labels), before + 1)
+        self.assertIsNotNone(REGISTRY.get_sample_value('http_request_db_queries_count', {'route': 'product-list'}))
+
+    def test_metrics_endpoint(self):
+        """Test the text exposition, which does not record itself"""
+        response = self.client.get('/metrics')
+
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'# TYPE http_request_duration_seconds histogram', response.content)
+        self.assertIsNone(REGISTRY.get_sample_value('http_request_duration_seconds_count', {
+            'route': 'metrics', 'method': 'GET', 'status': '200',
+        }))
+
+    def test_metrics_endpoint_token(self):
+        """Test that a configured token is required as a bearer token"""
+        with self.settings(METRICS_AUTH_TOKEN='scrape-secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_401_UNAUTHORIZED)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assert_status(response, status.HTTP_200_OK)
+
+    def test_celery_task_duration(self):
+        """Test that Celery task runs are timed by task name and state"""
+        from celery.signals import task_postrun, task_prerun
+
+        task = mock.Mock()
+        task.name = 'apps.core.tasks.example'
+        labels = {'task': task.name, 'state': 'SUCCESS'}
+        before = REGISTRY.get_sample_value('celery_task_duration_seconds_count', labels) or 0
+
+        task_prerun.send(sender=task, task_id='task-1', task=task)
+        task_postrun.send(sender=task, task_id='task-1', task=task, state='SUCCESS')
+
+        self.assertEqual(REGISTRY.get_sample_value('celery_task_duration_seconds_count', labels), before + 1)
+
+
+def _busy_profiled_function(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class ProfilingTests(BaseAPITestCase):
+    """
+    Tests for the statistical profiler and ProfilingMiddleware
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+
+    def profiling_settings(self, **overrides):
+        config = {'ENABLED': True, 'SAMPLE_RATE': 0.0, 'INTERVAL_MS': 1, 'OUTPUT_DIR': self.output_dir}
+        config.update(overrides)
+        return self.settings(PROFILING=config)
+
+    def test_sampler_records_stacks_below_root(self):
+        """Test that the sampler thread records the calling thread's stack, outermost first"""
+        sampler = StackSampler(ProfileStore(self.output_dir), interval=0.001)
+        sampler.start(root=sys._getframe())
+        _busy_profiled_function(0.05)
+        samples = sampler.stop()
+
+        self.assertGreater(sum(samples.values()), 0)
+        stack = samples.most_common(1)[0][0]
+        self.assertTrue(stack.startswith('apps.core.tests:_busy_profiled_function'))
+        self.assertNotIn('test_sampler_records_stacks_below_root', stack)
+
+    def test_sampler_leaves_stopped_threads_alone(self):
+        """Test that samples taken while a thread stops never reach the Counter handed back to it"""
+        sampler = StackSampler(ProfileStore(self.output_dir), interval=60)
+        sampler._pid = os.getpid()  # no sampler thread; sample() is driven by hand
+        sampler.start(root=sys._getframe())
+        targets = list(sampler._targets.items())
+        samples = sampler.stop()
+
+        sampler.sample(targets)
+        self.assertEqual(samples, Counter())
+
+    def test_signed_header_forces_profiling(self):
+        """Test that only a valid signed X-Profile header profiles a request when nothing is sampled"""
+        url = reverse('product-list')
+        with self.profiling_settings():
+            response = self.client.get(url, HTTP_X_PROFILE='forged')
+            self.assertNotIn('X-Profile-Samples', response)
+
+            response = self.client.get(url, HTTP_X_PROFILE=make_profile_token())
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertIn('X-Profile-Samples', response)
+
+    def test_disabled_by_default(self):
+        """Test that the middleware removes itself unless enabled"""
+        with self.settings(PROFILING={}):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: HttpResponse())
+
+    def test_dump_and_merge(self):
+        """Test the per-process folded files and their merge by the profiles command"""
+        store = ProfileStore(self.output_dir)
+        store.add('product-list', Counter({'a:view;b:serialize': 3, 'a:view': 1}))
+        store.add('product-list', Counter({'a:view;b:serialize': 2}))
+        store.dump()
+
+        out = StringIO()
+        call_command('profiles', dir=self.output_dir, stdout=out)
+
+        merged = read_folded(os.path.join(self.output_dir, 'merged', 'product-list.folded'))
+        self.assertEqual(merged, Counter({'a:view;b:serialize': 5, 'a:view': 1}))
+        self.assertIn('product-list: 6 samples', out.getvalue())
+        self.assertIn('b:serialize', out.getvalue())
+
+
+class TracingTests(BaseTestCase):
+    """
+    Tests for spans and the automatic tracing of services and repositories
+    """
+
+    def sample(self, name: str, metric: str = 'traced_function_duration_seconds_count') -> float:
+        return REGISTRY.get_sample_value(metric, {'function': name}) or 0
+
+    def test_disabled_spans_record_nothing(self):
+        """Test that nothing is recorded while tracing is disabled"""
+        with self.settings(TRACING={'ENABLED': False}):
+            with span('tests.disabled') as outer:
+                self.assertIsNone(current_span())
+        self.assertEqual(outer.duration_ns, 0)
+        self.assertEqual(self.sample('tests.disabled'), 0)
+
+    def test_nested_spans_split_self_time(self):
+        """Test that a parent's self time excludes its children"""
+        with self.settings(TRACING={'ENABLED': True}):
+            with span('tests.outer') as outer:
+                with span('tests.inner') as inner:
+                    self.assertIs(current_span(), inner)
+                    time.sleep(0.01)
+                self.assertIs(current_span(), outer)
+
+        self.assertEqual(outer.child_ns, inner.duration_ns)
+        self.assertLess(outer.self_ns, inner.duration_ns)
+        self.assertEqual(self.sample('tests.outer'), 1)
+        self.assertGreaterEqual(self.sample('tests.inner', 'traced_function_self_seconds_total'), 0.01)
+
+    def test_service_and_repository_methods_are_traced(self):
+        """Test that subclass methods are named after the concrete class, repository calls nested"""
+        from apps.product.services import CategoryService
+
+        before = self.sample('CategoryService.get_all'), self.sample('CategoryRepository.get_all')
+        with self.settings(TRACING={'ENABLED': True}):
+            CategoryService().get_all()
+
+        self.assertEqual(self.sample('CategoryService.get_all'), before[0] + 1)
+        self.assertEqual(self.sample('CategoryRepository.get_all'), before[1] + 1)
+
+    def test_traced_decorator(self):
+        """Test the decorator, bare and named, and the measure_execution_time alias"""
+        @traced
+        def bare():
+            return 'bare'
+
+        @traced(name='tests.named')
+        def named():
+            return 'named'
+
+        @measure_execution_time
+        def legacy():
+            return 'legacy'
+
+        with self.settings(TRACING={'ENABLED': True}):
+            self.assertEqual((bare(), named(), legacy()), ('bare', 'named', 'legacy'))
+
+        self.assertEqual(self.sample(bare.__qualname__), 1)
+        self.assertEqual(self.sample('tests.named'), 1)
+        self.assertEqual(self.sample(legacy.__qualname__), 1)
+
+
+class SlowQueryLogTests(BaseTestCase):
+    """
+    Tests for the slow query log
+    """
+
+    def test_normalize_sql(self):
+        """Test that literals, placeholders and value lists are stripped, identifiers kept"""
+        self.assertEqual(
+            normalize_sql('SELECT "t1"."col_2" FROM t1\n WHERE id IN (%s, %s,%s) AND name = \'x\' LIMIT 21'),
+            'SELECT "t1"."col_2" FROM t1 WHERE id IN (...) AND name = ? LIMIT ?',
+        )
+        self.assertEqual(normalize_sql('SELECT 1.5, -3'), 'SELECT ?, ?')
+
+    def test_records_aggregates_and_explains(self):
+        """Test that slow statements are grouped by fingerprint with their call site and a plan"""
+        log = SlowQueryLog(threshold_ms=0, explain_sample_rate=1, background=False)
+        with connection.execute_wrapper(log):
+            list(User.objects.filter(username__icontains='admin'))
+            list(User.objects.filter(username__icontains='customer'))
+        self.assertEqual(log.flush(), 1)
+
+        entry = SlowQuery.objects.get()
+        self.assertEqual(entry.calls, 2)
+        self.assertIn('LIKE ?', entry.normalized_sql)
+        self.assertTrue(entry.call_site.startswith('apps.core.tests:test_records_aggregates_and_explains:'))
+        self.assertTrue(entry.explain)
+        self.assertIsNotNone(entry.explained_at)
+        self.assertGreaterEqual(entry.total_ms, entry.max_ms)
+
+        # Later flushes add up, without explaining the same statement again
+        with connection.execute_wrapper(log):
+            list(User.objects.filter(username__icontains='vendor'))
+        log.flush()
+        entry.refresh_from_db()
+        self.assertEqual(entry.calls, 3)
+        self.assertEqual(SlowQuery.objects.count(), 1)
+
+    def test_fast_statements_are_ignored(self):
+        """Test that statements under the threshold are not queued"""
+        log = SlowQueryLog(threshold_ms=10_000, background=False)
+        with connection.execute_wrapper(log):
+            User.objects.count()
+        self.assertEqual(log.flush(), 0)
+
+    def test_admin_ranks_by_total_time(self):
+        """Test the read-only admin changelist"""
+        SlowQuery.objects.create(fingerprint='a' * 32, normalized_sql='SELECT ?', calls=1, total_ms=5, max_ms=5)
+        SlowQuery.objects.create(fingerprint='b' * 32, normalized_sql='SELECT ? FROM t', calls=2, total_ms=50, max_ms=30)
+        self.client.force_login(self.admin_user)
+
+        response = self.client.get(reverse('admin:core_slowquery_changelist'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry.total_ms for entry in response.context['cl'].result_list], [50, 5])
+
+
+class SeedDataCommandTests(BaseTestCase):
+    """
+    Tests for the seed_data management command
+    """
+
+    def seed(self, **options):
+        defaults = {'customers': 20, 'vendors': 3, 'categories': 2, 'products': 30, 'orders': 40,
+                    'notifications': 50, 'chunk_size': 7, 'stdout': StringIO()}
+        call_command('seed_data', **{**defaults, **options})
+
+    def test_seeds_consistent_rows(self):
+        """Test that every model is seeded after the existing rows, with consistent orders"""
+        from apps.notification.models import Notification
+        from apps.order.models import Order, OrderItem
+        from apps.order.utils import is_valid_order_number
+        from apps.product.models import Product
+        from apps.vendor.models import Vendor
+
+        self.seed()
+
+        self.assertEqual(User.objects.filter(role=User.Role.CUSTOMER).count(), 21)
+        self.assertEqual(Vendor.objects.count(), 3)
+        self.assertEqual(Product.objects.count(), 30)
+        self.assertEqual(Order.objects.count(), 40)
+        self.assertEqual(Notification.objects.count(), 50)
+        self.assertTrue(User.objects.get(username=f'customer{self.customer_user.pk + 1}').check_password('seed-password'))
+        for order in Order.objects.prefetch_related('items'):
+            self.assertTrue(is_valid_order_number(order.order_number))
+            self.assertTrue(1 <= len(order.items.all()) <= 5)
+            self.assertEqual(order.total_price, sum(item.price * item.quantity for item in order.items.all()))
+        self.assertFalse(OrderItem.objects.exclude(product__in=Product.objects.all()).exists())
+
+        # Sequences continue after the explicit primary keys
+        self.assertGreater(User.objects.create_user('after', 'after@example.com').pk, self.customer_user.pk + 23)
+
+    def test_same_seed_gives_same_data(self):
+        """Test that a seed gives the same data again, after other rows"""
+        from apps.order.models import Order
+
+        def seeded_orders(**options):
+            first_user = User.objects.latest('pk').pk + 1
+            self.seed(seed=7, **options)
+            return [
+                (customer_id - first_user, status, total_price)
+                for customer_id, status, total_price in Order.objects.order_by('pk').values_list(
+                    'customer_id', 'status', 'total_price')
+            ]
+
+        first = seeded_orders()
+        Order.objects.all().delete()
+        second = seeded_orders()
+        self.assertEqual(first, second)
+
+
+class WaitForDbCommandTests(SimpleTestCase):
+    """
+    Tests for the wait_for_db management command
+    """
+
+    def wait(self, outcomes, attempts=3):
+        output = StringIO()
+        with mock.patch.object(connections['default'], 'ensure_connection', side_effect=outcomes) as connect, \
+                mock.patch('apps.core.management.commands.wait_for_db.time.sleep') as sleep:
+            call_command('wait_for_db', attempts=attempts, interval=0.5, stdout=output)
+        return connect, sleep, output.getvalue()
+
+    def test_retries_until_connected(self):
+        """Test that the command retries until the database accepts a connection"""
+        connect, sleep, output = self.wait([OperationalError, OperationalError, None])
+        self.assertEqual(connect.call_count, 3)
+        sleep.assert_called_with(0.5)
+        self.assertIn('Waiting for database... 2/3', output)
+        self.assertIn('Database connection established', output)
+
+    def test_gives_up_after_attempts(self):
+        """Test that the command fails once every attempt has failed"""
+        with self.assertRaisesMessage(CommandError, 'after 2 attempts'):
+            self.wait(OperationalError, attempts=2)
+
+
+class PerformanceBudgetTests(BaseAPITestCase):
+    """
+    Tests for the query-count and timing budget helpers
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Keep the deliberately failing checks out of the run's budget report
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
+        os.environ.pop(REPORT_ENV, None)
+
+    def n_plus_one(self):
+        for user in User.objects.all():
+            list(user.groups.all())
+        return HttpResponse()
+
+    def test_assert_scales_catches_growing_query_counts(self):
+        """Test that one query per row fails an O(1) budget, but passes a per-row one"""
+        def grow(size):
+            for i in range(User.objects.count(), size):
+                User.objects.create_user(username=f'budget{i}', email=f'budget{i}@example.com')
+
+        with self.assertRaisesMessage(AssertionError, 'at most 0 more per row allowed'):
+            self.assert_scales('n-plus-one', self.n_plus_one, grow, sizes=(3, 6), repeat=1)
+        self.assert_scales('n-plus-one', self.n_plus_one, grow, sizes=(6, 9), per_item=1, repeat=1)
+
+    def test_query_budget(self):
+        """Test that a fixed budget fails with the captured SQL"""
+        with self.query_budget('count', max_queries=1):
+            User.objects.count()
+        with self.assertRaisesMessage(AssertionError, 'count: 2 queries, budget 1'):
+            with self.query_budget('count', max_queries=1):
+                User.objects.count()
+                User.objects.count()
+
+    def test_records_are_reported_worst_first(self):
+        """Test that checks are appended to the report file and ranked by budget usage"""
+        path = os.path.join(tempfile.mkdtemp(), 'budgets.jsonl')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with mock.patch.dict(os.environ, {REPORT_ENV: path}):
+            with self.query_budget('one-of-four', max_queries=4):
+                User.objects.count()
+            with self.query_budget('two-of-two', max_queries=2):
+                User.objects.count()
+                User.objects.count()
+
+        records = load_budgets(path)
+        self.assertEqual([entry.name for entry in records], ['one-of-four', 'two-of-two'])
+        report = format_report(records, top=1).splitlines()
+        self.assertEqual(len(report), 3)
+        self.assertEqual(report[2].split()[:3], ['100%', 'two-of-two', '2/2'])
+        self.assertEqual(BudgetRecord('t', 'none', 1, 0).usage, float('inf'))
@@ -0,0 +1,180 @@
+"""
+Lightweight function tracing.
+
+``span('name')`` is a context manager and ``@traced`` a decorator; both
+time a block with ``perf_counter_ns`` as a span. Spans nest: a span's
+self time excludes the spans opened inside it. Every finished span is
+aggregated per name into Prometheus metrics (see apps.core.metrics):
+
+- ``traced_function_duration_seconds{function}``: histogram of total time
+- ``traced_function_self_seconds_total{function}``: time spent in the
+  function itself, which is what adds up to the request time
+
+BaseService and BaseRepository trace the public methods of every
+subclass (``trace_methods``), named after the concrete class, e.g.
+``ProductRepository.get_many``. Tracing is off unless TRACING['ENABLED']
+is set; a disabled wrapper costs one global lookup per call.
+"""
+import contextvars
+import inspect
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from prometheus_client import Counter, Histogram
+
+from .metrics import LATENCY_BUCKETS
+
+TRACED_ATTR = '_traced'
+
+FUNCTION_DURATION = Histogram(
+    'traced_function_duration_seconds', 'Time spent in a traced function, including the spans it opened',
+    ('function',), buckets=(0.0001, 0.0005, 0.001, 0.0025) + LATENCY_BUCKETS,
+)
+FUNCTION_SELF_TIME = Counter(
+    'traced_function_self_seconds', 'Time spent in a traced function itself, excluding nested spans', ('function',),
+)
+
+_enabled = False
+
+_current: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('trace_span', default=None)
+
+# Labelled children per span name, so recording skips the labels() lookup
+_recorders: Dict[str, Tuple[Any, Any]] = {}
+
+
+def enable_tracing(enabled: bool = True) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def tracing_enabled() -> bool:
+    return _enabled
+
+
+def configure_tracing() -> None:
+    """
+    Apply TRACING['ENABLED']
+    """
+    from django.conf import settings
+
+    enable_tracing(bool(getattr(settings, 'TRACING', {}).get('ENABLED', False)))
+
+
+@receiver(setting_changed)
+def _reconfigure(sender, setting: str, **kwargs) -> None:
+    if setting == 'TRACING':
+        configure_tracing()
+
+
+def _record(name: str, duration_ns: int, self_ns: int) -> None:
+    recorders = _recorders.get(name)
+    if recorders is None:
+        recorders = _recorders[name] = (FUNCTION_DURATION.labels(name), FUNCTION_SELF_TIME.labels(name))
+    recorders[0].observe(duration_ns / 1e9)
+    recorders[1].inc(self_ns / 1e9)
+
+
+class Span:
+    """
+    A timed block. Does nothing when tracing is disabled.
+    """
+
+    __slots__ = ('name', 'started', 'duration_ns', 'child_ns', 'parent', '_token')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0
+        self.duration_ns = 0
+        self.child_ns = 0
+        self.parent: Optional[Span] = None
+        self._token = None
+
+    @property
+    def self_ns(self) -> int:
+        return self.duration_ns - self.child_ns
+
+    def __enter__(self) -> 'Span':
+        if _enabled:
+            self.parent = _current.get()
+            self._token = _current.set(self)
+            self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._token is None:
+            return
+        self.duration_ns = time.perf_counter_ns() - self.started
+        _current.reset(self._token)
+        self._token = None
+        if self.parent is not None:
+            self.parent.child_ns += self.duration_ns
+        _record(self.name, self.duration_ns, self.self_ns)
+
+
+def span(name: str) -> Span:
+    """
+    Context manager timing a block as a span
+    """
+    return Span(name)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def _wrap(func: Callable, label: Callable[[tuple], str]) -> Callable:
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        with Span(label(args)):
+            return func(*args, **kwargs)
+
+    setattr(wrapper, TRACED_ATTR, True)
+    return wrapper
+
+
+def traced(func: Optional[Callable] = None, *, name: Optional[str] = None) -> Callable:
+    """
+    Decorator tracing every call of a function as a span named ``name``
+    (default: its qualified name). Usable bare or with arguments.
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+        return _wrap(func, lambda args: label)
+
+    return decorator(func) if func is not None else decorator
+
+
+def _method_label(func: Callable) -> Callable[[tuple], str]:
+    names: Dict[type, str] = {}
+
+    def label(args: tuple) -> str:
+        cls = type(args[0])
+        name = names.get(cls)
+        if name is None:
+            name = names[cls] = f'{cls.__name__}.{func.__name__}'
+        return name
+    return label
+
+
+def trace_methods(cls: type) -> type:
+    """
+    Class decorator tracing the public methods a class defines, named
+    after the class of the instance they are called on. Generators,
+    static/class methods and properties are left alone.
+    """
+    for attr, value in list(vars(cls).items()):
+        if (
+            attr.startswith('_')
+            or not inspect.isfunction(value)
+            or getattr(value, TRACED_ATTR, False)
+            or getattr(value, '__isabstractmethod__', False)
+            or inspect.isgeneratorfunction(value)
+        ):
+            continue
+        setattr(cls, attr, _wrap(value, _method_label(value)))
+    return cls
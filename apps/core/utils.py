@@ -1,13 +1,27 @@
+import csv
+import datetime
+import hashlib
+import inspect
+import json
 import logging
-from typing import Any, Dict, List, Optional, Union
-from django.db.models import QuerySet
-from django.core.cache import cache
+import math
+import random
+import threading
+import uuid
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+from django.db.models import Model, QuerySet
+from django.core.cache import caches
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from functools import wraps
 import time
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
+from .cache_tags import tagged_key
+from .tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -19,48 +33,176 @@ def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
 
 
-def cache_result(timeout: int = 300):
+def _canonical(value: Any) -> Any:
     """
-    Decorator to cache the result of a function
+    Reduce a cache_result argument to a structure with a stable repr.
+    Models are keyed by label and primary key; objects can opt in with a
+    ``cache_key`` attribute. Anything else raises TypeError rather than
+    silently producing a key that includes a memory address.
+    """
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if isinstance(value, (Decimal, datetime.date, datetime.time, datetime.timedelta, uuid.UUID, Enum)):
+        return (type(value).__name__, str(value))
+    if isinstance(value, Model):
+        return ('model', value._meta.label, value.pk)
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_canonical(item) for item in value))
+    if isinstance(value, (set, frozenset)):
+        return ('set', tuple(sorted((_canonical(item) for item in value), key=repr)))
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted(((_canonical(k), _canonical(v)) for k, v in value.items()), key=repr)))
+    if hasattr(value, 'cache_key'):
+        key = value.cache_key
+        return ('obj', type(value).__qualname__, _canonical(key() if callable(key) else key))
+    raise TypeError(
+        f"cache_result cannot build a stable key from {type(value).__name__}; "
+        f"pass primitives or model instances, or give the object a cache_key attribute"
+    )
+
+
+class CacheStats:
+    """
+    Thread-safe counters for a cache_result-decorated function
+    """
+
+    FIELDS = ('hits', 'misses', 'early_refreshes', 'waits', 'errors')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def incr(self, field: str) -> None:
+        with self._lock:
+            self._counts[field] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['hits'] + counts['misses']
+        counts['hit_rate'] = counts['hits'] / lookups if lookups else 0.0
+        return counts
+
+
+def cache_result(timeout: int = 300, none_timeout: Optional[int] = None, key_prefix: Optional[str] = None,
+                 lock_timeout: int = 30, wait_timeout: float = 5.0, beta: float = 1.0, cache_alias: str = 'default',
+                 tags: Optional[Union[Iterable[str], Callable[..., Iterable[str]]]] = None):
+    """
+    Decorator to cache the result of a function.
+
+    - Keys are a hash of the function's qualified name and its bound
+      arguments, so f(1) and f(x=1) share an entry; ``self``/``cls`` are
+      ignored, so every instance of a service shares its method's cache.
+    - None is cached too (for none_timeout seconds, default timeout),
+      so "not found" results do not hit the database on every call.
+    - On a miss, only the caller that wins a cache.add() lock computes
+      the value. The others wait up to wait_timeout for it, then compute
+      it themselves if it still has not appeared.
+    - Entries are refreshed early with probability rising towards expiry
+      (XFetch, scaled by how long the value took to compute and by beta),
+      so hot keys are recomputed by one caller before they expire.
+    - tags (see apps.core.cache_tags) are format strings filled from the
+      bound arguments, e.g. ['product', 'vendor:{vendor_id}:products'],
+      or a callable taking the function's arguments. Invalidating any of
+      them drops the entry.
+
+    The wrapper exposes cache_key(*args, **kwargs),
+    invalidate(*args, **kwargs) and stats() (hits, misses, early refreshes,
+    waits, errors and hit rate for this process).
     """
     def decorator(func):
+        signature = inspect.signature(func)
+        skip = [name for name in list(signature.parameters)[:1] if name in ('self', 'cls')]
+        prefix = key_prefix or f'cache_result:{func.__module__}.{func.__qualname__}'
+        stats = CacheStats()
+
+        def cache_key(*args, **kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            parts = tuple(
+                (name, _canonical(value)) for name, value in bound.arguments.items() if name not in skip
+            )
+            digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+            key = f'{prefix}:{digest}'
+            if tags is None:
+                return key
+            if callable(tags):
+                entry_tags = tags(*args, **kwargs)
+            else:
+                entry_tags = [tag.format(**bound.arguments) for tag in tags]
+            return tagged_key(key, entry_tags, cache_alias)
+
+        def compute_and_store(backend, key, args, kwargs):
+            started = time.perf_counter()
+            try:
+                value = func(*args, **kwargs)
+            except Exception:
+                stats.incr('errors')
+                raise
+            delta = time.perf_counter() - started
+            ttl = timeout if value is not None or none_timeout is None else none_timeout
+            backend.set(key, (value, delta, time.time() + ttl), ttl)
+            return value
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Create a cache key based on function name and arguments
-            key_parts = [func.__name__]
-            key_parts.extend([str(arg) for arg in args])
-            key_parts.extend([f"{k}:{v}" for k, v in sorted(kwargs.items())])
-            cache_key = ":".join(key_parts)
+            backend = caches[cache_alias]
+            key = cache_key(*args, **kwargs)
+            lock_key = f'{key}:lock'
 
-            # Try to get from cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                return cached_result
+            entry = backend.get(key)
+            if entry is not None:
+                value, delta, expiry = entry
+                # XFetch: -log(random) is exponentially distributed, so early refreshes are rare until close to expiry
+                if time.time() - delta * beta * math.log(1.0 - random.random()) < expiry:
+                    stats.incr('hits')
+                    return value
+                if not backend.add(lock_key, True, lock_timeout):
+                    # Someone else is refreshing: keep serving the current value
+                    stats.incr('hits')
+                    return value
+                stats.incr('early_refreshes')
+            else:
+                stats.incr('misses')
+                if not backend.add(lock_key, True, lock_timeout):
+                    stats.incr('waits')
+                    deadline = time.monotonic() + wait_timeout
+                    delay = 0.005
+                    while time.monotonic() < deadline:
+                        time.sleep(delay)
+                        delay = min(delay * 2, 0.1)
+                        entry = backend.get(key)
+                        if entry is not None:
+                            return entry[0]
+                    # The holder is slow or died; compute without the lock
+                    return compute_and_store(backend, key, args, kwargs)
 
-            # If not in cache, call the function
-            result = func(*args, **kwargs)
+            try:
+                return compute_and_store(backend, key, args, kwargs)
+            finally:
+                backend.delete(lock_key)
 
-            # Store in cache
-            cache.set(cache_key, result, timeout)
+        def invalidate(*args, **kwargs) -> None:
+            caches[cache_alias].delete(cache_key(*args, **kwargs))
 
-            return result
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = invalidate
+        wrapper.stats = stats.as_dict
+        wrapper.reset_stats = stats.reset
         return wrapper
     return decorator
 
 
 def measure_execution_time(func):
     """
-    Decorator to measure the execution time of a function
+    Decorator to measure the execution time of a function.
+    Kept for compatibility: equivalent to ``apps.core.tracing.traced``.
     """
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        execution_time = end_time - start_time
-        logger.debug(f"Function {func.__name__} took {execution_time:.4f} seconds to execute")
-        return result
-    return wrapper
+    return traced(func)
 
 
 def paginate_queryset(queryset: QuerySet, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
@@ -99,6 +241,47 @@ def get_object_or_none(queryset: QuerySet, **kwargs) -> Optional[Any]:
         return None
 
 
+class _Echo:
+    """
+    File-like object that returns what is written, so csv.writer can format rows in memory
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def stream_csv(rows: Iterable[Dict[str, Any]], fieldnames: Sequence[str], rows_per_chunk: int = 500) -> Iterator[str]:
+    """
+    Render dict rows as CSV text chunks for a StreamingHttpResponse.
+    Rows are grouped so each chunk holds rows_per_chunk lines.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fieldnames)
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow([row[name] for name in fieldnames]))
+        if len(chunk) >= rows_per_chunk:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream_ndjson(rows: Iterable[Dict[str, Any]], rows_per_chunk: int = 500) -> Iterator[str]:
+    """
+    Render dict rows as newline-delimited JSON text chunks for a StreamingHttpResponse
+    """
+    encoder = DjangoJSONEncoder()
+    chunk = []
+    for row in rows:
+        chunk.append(encoder.encode(row) + '\n')
+        if len(chunk) >= rows_per_chunk:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
 def custom_exception_handler(exc, context):
     """
     Custom exception handler for DRF
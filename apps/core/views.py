@@ -2,9 +2,14 @@ from rest_framework import viewsets, mixins, status, views
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from typing import Type, Dict, Any, Optional, List, Callable
-from django.db.models import Model, QuerySet
-from django.http import Http404
+from typing import Type, Dict, Any, Optional, List, Callable, Sequence, Tuple
+import datetime
+import hashlib
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max, Model, QuerySet
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers, quote_etag
+from django.utils.http import http_date
 from .services import IService
 from .serializers import BaseModelSerializer
 
@@ -50,7 +55,200 @@ class BaseAPIViewSet(viewsets.GenericViewSet):
         return queryset
 
 
-class BaseModelViewSet(BaseAPIViewSet,
+# (ETag, Last-Modified or None)
+Validators = Tuple[str, Optional[datetime.datetime]]
+
+
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified support for retrieve and list.
+
+    Validators come from the timestamps in ``conditional_fields`` (paths
+    into related models are allowed) plus the row count. A detail's are
+    read off the object (checked for permissions first), or with one
+    aggregate query when they are not all loaded with it; a list's cover
+    the rows of the page and the total count, read off the page that is
+    loaded anyway. Matching If-None-Match or If-Modified-Since requests get
+    a 304 before any serialization. Lists only get an ETag: removing a row
+    does not move MAX(updated_at), so Last-Modified alone could not detect it.
+    """
+
+    conditional_fields: Sequence[str] = ('updated_at',)
+
+    def _conditional_fields(self, model) -> List[List[Any]]:
+        """
+        The configured fields that exist on the model, each as its chain of model fields
+        """
+        paths = []
+        for name in self.conditional_fields:
+            chain, current = [], model
+            try:
+                for part in name.split('__'):
+                    field = current._meta.get_field(part)
+                    chain.append(field)
+                    current = field.related_model
+            except (FieldDoesNotExist, AttributeError):
+                continue
+            paths.append((name, chain))
+        return paths
+
+    def _make_validators(self, request, count: int, values: List[Any], detail: bool,
+                         keys: Sequence[Any] = ()) -> Validators:
+        stamps = [value for value in values if value is not None]
+        # Responses vary on Authorization, so the user need not be part of the tag
+        parts = (
+            request.get_full_path(), request.accepted_media_type,
+            count, [value.isoformat() if value else None for value in values], list(keys),
+        )
+        etag = quote_etag(hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest())
+        return etag, max(stamps) if detail and stamps else None
+
+    def _aggregate_validators(self, request, queryset: QuerySet, detail: bool) -> Optional[Validators]:
+        fields = self._conditional_fields(queryset.model)
+        if not fields or queryset.query.is_sliced:
+            return None
+        aggregates = {'count': Count('pk', distinct=True)}
+        aggregates.update({f'v{index}': Max(name) for index, (name, _) in enumerate(fields)})
+        row = queryset.order_by().aggregate(**aggregates)
+        if detail and not row['count']:
+            # Let retrieve() raise the 404
+            return None
+        return self._make_validators(request, row['count'], [row[f'v{index}'] for index in range(len(fields))], detail)
+
+    def _instance_validators(self, request, instance: Model) -> Optional[Validators]:
+        """
+        Validators read from an already loaded instance, when every field
+        is reachable through forward relations (the same values the
+        aggregate query would return)
+        """
+        fields = self._conditional_fields(type(instance))
+        if not fields:
+            return None
+        values = []
+        for _, chain in fields:
+            value = instance
+            for field in chain:
+                if field.is_relation and (field.one_to_many or field.many_to_many or not field.concrete):
+                    return None
+                value = getattr(value, field.name) if value is not None else None
+            values.append(value)
+        return self._make_validators(request, 1, values, detail=True)
+
+    @staticmethod
+    def _loaded_values(rows: Sequence[Model], chain: List[Any]) -> Optional[List[Any]]:
+        """
+        The values at the end of a field chain across loaded rows, or None
+        when a reverse relation on the way was not prefetched
+        """
+        values = list(rows)
+        for field in chain:
+            if not field.is_relation:
+                return [getattr(value, field.name) for value in values]
+            if field.concrete:
+                # Forward relations must have been loaded with the row (select_related)
+                if any(not field.is_cached(value) for value in values):
+                    return None
+                values = [getattr(value, field.name) for value in values]
+            else:
+                accessor = field.get_accessor_name() if hasattr(field, 'get_accessor_name') else field.name
+                if any(accessor not in getattr(value, '_prefetched_objects_cache', {}) for value in values):
+                    return None
+                values = [related for value in values for related in getattr(value, accessor).all()]
+            values = [value for value in values if value is not None]
+        return values
+
+    def get_page_validators(self, model, rows: Sequence[Model], count: int) -> Optional[Validators]:
+        """
+        List validators from the rows of a page: the total count, the page's
+        primary keys and the largest value of each field over those rows.
+        Fields are read off the loaded rows when their relations are loaded,
+        otherwise with one aggregate over the page.
+        """
+        fields = self._conditional_fields(model)
+        if not fields:
+            return None
+        keys = [row.pk for row in rows]
+        values = []
+        for name, chain in fields:
+            loaded = self._loaded_values(rows, chain)
+            if loaded is None:
+                aggregates = {f'v{index}': Max(name) for index, (name, _) in enumerate(fields)}
+                row = model._base_manager.filter(pk__in=keys).aggregate(**aggregates)
+                values = [row[f'v{index}'] for index in range(len(fields))]
+                break
+            stamps = [value for value in loaded if value is not None]
+            values.append(max(stamps) if stamps else None)
+        return self._make_validators(self.request, count, values, detail=False, keys=keys)
+
+    def get_detail_validators(self) -> Optional[Validators]:
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self._aggregate_validators(self.request, queryset, detail=True)
+
+    @staticmethod
+    def set_validators(response, validators: Optional[Validators]) -> None:
+        if validators is None or response.status_code != 200:
+            return
+        etag, last_modified = validators
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+
+    def conditional_response(self, request, validators: Optional[Validators]):
+        """
+        A 304 (or 412) response when the request's preconditions say so, otherwise None
+        """
+        if validators is None:
+            return None
+        etag, last_modified = validators
+        headers = HttpResponse()
+        self.set_validators(headers, validators)
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+            response=headers,
+        )
+        return None if response is headers else response
+
+    def retrieve(self, request, *args, **kwargs):
+        # Resolve the object first: get_object() checks object permissions, so
+        # preconditions never reveal whether an object exists or changed
+        instance = self.get_object()
+        # Read the validators off the loaded object instead of querying when possible
+        validators = self._instance_validators(request, instance)
+        if validators is None:
+            validators = self.get_detail_validators()
+        response = self.conditional_response(request, validators)
+        if response is not None:
+            return response
+        response = Response(self.get_serializer(instance).data)
+        self.set_validators(response, validators)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        # The page is loaded either way, so the validators cost no query of their own
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            rows, count = page, self.paginator.page.paginator.count
+        else:
+            rows = list(queryset)
+            count = len(rows)
+        validators = self.get_page_validators(queryset.model, rows, count)
+        response = self.conditional_response(request, validators)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(rows, many=True)
+        response = self.get_paginated_response(serializer.data) if page is not None else Response(serializer.data)
+        self.set_validators(response, validators)
+        return response
+
+
+class BaseModelViewSet(ConditionalGetMixin,
+                      BaseAPIViewSet,
                       mixins.CreateModelMixin,
                       mixins.RetrieveModelMixin,
                       mixins.UpdateModelMixin,
@@ -115,7 +313,8 @@ class BaseModelViewSet(BaseAPIViewSet,
         return Response(status=status.HTTP_404_NOT_FOUND)
 
 
-class BaseReadOnlyViewSet(BaseAPIViewSet,
+class BaseReadOnlyViewSet(ConditionalGetMixin,
+                         BaseAPIViewSet,
                          mixins.RetrieveModelMixin,
                          mixins.ListModelMixin):
     """
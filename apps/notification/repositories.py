@@ -3,6 +3,7 @@ from .models import Notification
 from typing import Optional, List, Dict, Any, Union
 from django.db.models import Q, QuerySet
 from django.core.cache import cache
+from django.utils import timezone
 
 
 class NotificationRepository(BaseRepository):
@@ -23,7 +24,9 @@ class NotificationRepository(BaseRepository):
         if cached_queryset is not None:
             return cached_queryset
         
-        queryset = self.model_class.objects.filter(recipient_id=recipient_id).order_by('-created_at')
+        queryset = self.model_class.objects.filter(
+            recipient_id=recipient_id
+        ).select_related('recipient').order_by('-created_at')
         cache.set(cache_key, queryset, 300)  # Cache for 5 minutes
         
         return queryset
@@ -69,7 +72,8 @@ class NotificationRepository(BaseRepository):
         """
         Mark all notifications for a recipient as read
         """
-        count = self.get_unread_by_recipient_id(recipient_id).update(is_read=True)
+        # update() skips auto_now, and the list ETags are built from updated_at
+        count = self.get_unread_by_recipient_id(recipient_id).update(is_read=True, updated_at=timezone.now())
         
         # Invalidate cache
         cache_key = f'user_notifications_{recipient_id}'
@@ -96,3 +100,15 @@ class NotificationRepository(BaseRepository):
         cache.delete(cache_key)
         
         return notification
+    
+    def create_notifications(self, notifications: List[Dict[str, Any]]) -> List[Notification]:
+        """
+        Create several notifications with a single INSERT
+        """
+        created = self.bulk_create(notifications)
+        
+        # Invalidate cache once per recipient
+        recipient_ids = {notification.recipient_id for notification in created}
+        cache.delete_many([f'user_notifications_{recipient_id}' for recipient_id in recipient_ids])
+        
+        return created
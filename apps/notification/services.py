@@ -3,6 +3,7 @@ from .repositories import NotificationRepository
 from .models import Notification
 from typing import Optional, List, Dict, Any, Union
 from django.db.models import QuerySet
+from apps.core.metrics import NOTIFICATION_FANOUT
 
 
 class NotificationService(BaseService):
@@ -63,6 +64,13 @@ class NotificationService(BaseService):
             related_object_id=related_object_id
         )
     
+    def create_notifications(self, notifications: List[Dict[str, Any]]) -> List[Notification]:
+        """
+        Create several notifications at once
+        """
+        NOTIFICATION_FANOUT.observe(len(notifications))
+        return self.repository.create_notifications(notifications)
+    
     def create_system_notification(self, recipient_id: int, title: str, message: str) -> Notification:
         """
         Create a system notification
@@ -156,6 +156,19 @@ class NotificationAPITests(BaseAPITestCase):
         ).count()
         self.assertEqual(unread_count, 0)
 
+    def test_mark_all_as_read_changes_list_etag(self):
+        """Test that a conditional list request after marking all as read gets the read notifications"""
+        self.authenticate_as_customer()
+        url = reverse('notification-list')
+        etag = self.client.get(url)['ETag']
+
+        self.assert_status(self.client.post(reverse('notification-mark-all-as-read')), status.HTTP_200_OK)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertTrue(all(notification['is_read'] for notification in response.data['results']))
+
     def test_unread_notifications(self):
         """Test getting unread notifications"""
         # Create a read notification
@@ -215,3 +228,27 @@ class NotificationAPITests(BaseAPITestCase):
             related_object_id=order_id
         )
         self.assertTrue(vendor_notifications.exists())
+
+    def test_unread_notifications_query_budget(self):
+        """Test that the unread notifications endpoint runs O(1) queries in the backlog size"""
+        url = reverse('notification-unread')
+        self.authenticate_as_customer()
+
+        def grow(size):
+            unread = Notification.objects.filter(recipient=self.customer_user, is_read=False).count()
+            Notification.objects.bulk_create([
+                Notification(
+                    recipient=self.customer_user,
+                    notification_type=Notification.NotificationType.ORDER_UPDATED,
+                    title=f'Backlog {i}',
+                    message='Your order was updated',
+                    related_object_type='Order',
+                    related_object_id=i,
+                )
+                for i in range(unread, size)
+            ])
+
+        self.assert_scales(
+            'notification-unread', lambda: self.client.get(url), grow, sizes=(1, 30), max_queries=4,
+            max_time_ratio=4,
+        )
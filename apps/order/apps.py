@@ -7,3 +7,7 @@ class OrderConfig(AppConfig):
 
     def ready(self):
         import apps.order.signals
+        from .utils import default_node_id
+
+        # Fail at startup, not on the first order, when ORDER_NUMBER_NODE_ID is out of range
+        default_node_id()
@@ -1,9 +1,9 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
 from apps.product.models import Product
-import uuid
 from model_utils import FieldTracker
 from apps.core.models import BaseModel
+from .utils import generate_order_number
 
 
 class Order(BaseModel):
@@ -34,10 +34,22 @@ class Order(BaseModel):
     # Track changes to fields
     tracker = FieldTracker(fields=['status'])
 
+    # Inserts tried with fresh order numbers before giving up on a clash
+    ORDER_NUMBER_ATTEMPTS = 3
+
     def save(self, *args, **kwargs):
-        if not self.order_number:
-            self.order_number = str(uuid.uuid4()).split('-')[0].upper()
-        super().save(*args, **kwargs)
+        if self.order_number:
+            return super().save(*args, **kwargs)
+        for attempt in range(1, self.ORDER_NUMBER_ATTEMPTS + 1):
+            self.order_number = generate_order_number()
+            try:
+                # A savepoint, so a clash does not abort the surrounding transaction
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                clash = Order.objects.filter(order_number=self.order_number).exists()
+                if attempt == self.ORDER_NUMBER_ATTEMPTS or not clash:
+                    raise
 
     def __str__(self):
         return f"Order {self.order_number}"
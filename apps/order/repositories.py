@@ -1,7 +1,7 @@
 from apps.core.repositories import BaseRepository
 from .models import Order, OrderItem
 from typing import Optional, List, Dict, Any, Union
-from django.db.models import Q, QuerySet, Count, Sum, Avg, F
+from django.db.models import Q, QuerySet, Count, Sum, Avg, F, Prefetch
 from datetime import datetime, timedelta
 
 
@@ -79,13 +79,32 @@ class OrderRepository(BaseRepository):
         """
         Get orders with all relations preloaded
         """
-        return self.get_with_customer().prefetch_related(
-            'items',
-            'items__product',
-            'items__product__vendor',
-            'items__product__category'
+        return self.with_all_relations(self.model_class.objects.all())
+
+    def with_all_relations(self, queryset: QuerySet) -> QuerySet:
+        """
+        Preload everything an order is serialized with: its customer, and its
+        items with their product, vendor (and vendor user) and category in one query
+        """
+        return queryset.select_related('customer').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product__vendor__user', 'product__category'))
         )
     
+    def get_export_values(self, fields: List[str], start_date: Optional[datetime] = None,
+                          end_date: Optional[datetime] = None, status: Optional[str] = None) -> QuerySet:
+        """
+        Get plain order rows for export, ordered by ID.
+        Uses values() so no model instances are built.
+        """
+        queryset = self.model_class.objects.all()
+        if start_date:
+            queryset = queryset.filter(created_at__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(created_at__lt=end_date)
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset.order_by('pk').values(*fields)
+    
     def get_total_sales(self) -> float:
         """
         Get total sales
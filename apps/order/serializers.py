@@ -3,6 +3,7 @@ from .models import Order, OrderItem
 from apps.product.serializers import ProductSerializer
 from apps.product.models import Product
 from apps.user.serializers import UserProfileSerializer
+from apps.core.metrics import STOCK_OUT_REJECTIONS
 
 class OrderItemSerializer(serializers.ModelSerializer):
     """
@@ -41,7 +42,10 @@ class OrderItemCreateSerializer(serializers.ModelSerializer):
     def validate_product_id(self, value):
         try:
             product = Product.objects.get(pk=value)
-            if not product.is_available or product.stock <= 0:
+            if not product.is_available:
+                raise serializers.ValidationError("Product is not available")
+            if product.stock <= 0:
+                STOCK_OUT_REJECTIONS.inc()
                 raise serializers.ValidationError("Product is not available")
         except Product.DoesNotExist:
             raise serializers.ValidationError("Product does not exist")
@@ -2,10 +2,11 @@ from apps.core.services import BaseService
 from .repositories import OrderRepository, OrderItemRepository
 from apps.product.services import ProductService
 from .models import Order, OrderItem
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, Iterator
 from django.db.models import QuerySet
 from datetime import datetime, timedelta
 from django.db import transaction
+from apps.core.metrics import STOCK_OUT_REJECTIONS
 
 
 class OrderItemService(BaseService):
@@ -85,6 +86,33 @@ class OrderItemService(BaseService):
 
         return order_item
 
+    def create_order_items(self, order: Order, items: List[Dict[str, Any]],
+                           products: Optional[Dict[int, Any]] = None) -> List[OrderItem]:
+        """
+        Create all items of an order and update product stock in bulk
+        """
+        if products is None:
+            products = self.product_service.get_many(item['product_id'] for item in items)
+
+        # Create the order items in one INSERT
+        order_items = self.bulk_create([
+            OrderItem(
+                order=order,
+                product=products[item['product_id']],
+                quantity=item['quantity'],
+                price=products[item['product_id']].price
+            )
+            for item in items
+        ])
+
+        # Update product stock, aggregating repeated products
+        quantities = {}
+        for item in items:
+            quantities[item['product_id']] = quantities.get(item['product_id'], 0) - item['quantity']
+        self.product_service.update_stock_many(quantities, products)
+
+        return order_items
+
 
 class OrderService(BaseService):
     """
@@ -149,6 +177,22 @@ class OrderService(BaseService):
         """
         return self.repository.get_with_all_relations()
 
+    def with_all_relations(self, queryset: QuerySet) -> QuerySet:
+        """
+        Preload the relations orders are serialized with
+        """
+        return self.repository.with_all_relations(queryset)
+
+    def iter_export_rows(self, fields: List[str], start_date: Optional[datetime] = None,
+                         end_date: Optional[datetime] = None, status: Optional[str] = None,
+                         chunk_size: int = 2000) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over order rows for export without loading them all into memory.
+        On PostgreSQL this uses a server-side cursor.
+        """
+        queryset = self.repository.get_export_values(fields, start_date, end_date, status)
+        return queryset.iterator(chunk_size=chunk_size)
+
     def get_total_sales(self) -> float:
         """
         Get total sales
@@ -170,23 +214,31 @@ class OrderService(BaseService):
         if not hasattr(self, 'product_service'):
             self.product_service = ProductService()
 
-        # Validate items
+        # Load all products in a single query, locked until the order is committed so
+        # concurrent orders check and decrement stock one after the other
+        products = self.product_service.get_many((item['product_id'] for item in items), for_update=True)
+
+        # Validate items, adding up lines that repeat a product as create_order_items does
+        quantities = {}
         for item in items:
-            product = self.product_service.get_by_id(item['product_id'])
+            quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
             if not product:
-                raise ValueError(f"Product with ID {item['product_id']} not found")
+                raise ValueError(f"Product with ID {product_id} not found")
 
             if not product.is_available:
                 raise ValueError(f"Product {product.name} is not available")
 
-            if product.stock < item['quantity']:
-                raise ValueError(f"Not enough stock for product {product.name}. Available: {product.stock}, Requested: {item['quantity']}")
+            if product.stock < quantity:
+                STOCK_OUT_REJECTIONS.inc()
+                raise ValueError(f"Not enough stock for product {product.name}. Available: {product.stock}, Requested: {quantity}")
 
         # Calculate total price
         total_price = 0
         for item in items:
-            product = self.product_service.get_by_id(item['product_id'])
-            total_price += product.price * item['quantity']
+            total_price += products[item['product_id']].price * item['quantity']
 
         # Create the order
         order = self.create(
@@ -197,12 +249,7 @@ class OrderService(BaseService):
         )
 
         # Create order items
-        for item in items:
-            self.order_item_service.create_order_item(
-                order_id=order.id,
-                product_id=item['product_id'],
-                quantity=item['quantity']
-            )
+        self.order_item_service.create_order_items(order, items, products)
 
         return order
 
@@ -1,9 +1,14 @@
+from django.db.models import prefetch_related_objects
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import Order, OrderItem
-from django.core.mail import send_mail
+from django.core.mail import send_mail, send_mass_mail
 from django.conf import settings
+from django.db import transaction
+from apps.core.metrics import ORDERS_CREATED
+from apps.core.signals import bulk_changed
 from apps.notification.models import Notification
+from apps.notification.services import NotificationService
 from django.core.cache import cache
 import logging
 
@@ -17,6 +22,7 @@ def order_created(sender, instance, created, **kwargs):
     if created:
         # Log the order creation
         logger.info(f"New order created: {instance.order_number}")
+        transaction.on_commit(ORDERS_CREATED.inc)
 
         # Create notification for the customer
         Notification.objects.create(
@@ -83,3 +89,48 @@ def notify_vendor(sender, instance, created, **kwargs):
             )
         except Exception as e:
             logger.error(f"Failed to send vendor notification email: {str(e)}")
+
+@receiver(bulk_changed, sender=OrderItem)
+def notify_vendors_bulk(sender, action, instances=None, **kwargs):
+    """
+    Signal to notify vendors when order items are created in bulk.
+    Builds all vendor notifications in one INSERT and sends the emails
+    over a single SMTP connection.
+    """
+    if action != 'create' or not instances:
+        return
+
+    # Load vendors, vendor users and customers without a query per item
+    prefetch_related_objects(instances, 'product__vendor__user', 'order__customer')
+
+    notifications = []
+    emails = []
+    for instance in instances:
+        vendor = instance.product.vendor
+        vendor_user = vendor.user
+        order = instance.order
+
+        logger.info(f"Notifying vendor {vendor.company_name} about new order item")
+
+        notifications.append({
+            'recipient_id': vendor_user.id,
+            'notification_type': Notification.NotificationType.ORDER_PLACED,
+            'title': f"New Order #{order.order_number}",
+            'message': f"You have received a new order #{order.order_number} from {order.customer.username} for {instance.product.name}. Quantity: {instance.quantity}.",
+            'related_object_id': order.id,
+            'related_object_type': 'Order',
+        })
+        emails.append((
+            'New Order for Your Product',
+            f'You have a new order for {instance.product.name}. Quantity: {instance.quantity}.',
+            settings.DEFAULT_FROM_EMAIL,
+            [vendor_user.email],
+        ))
+
+    # Create the notifications and invalidate each vendor's cache once
+    NotificationService().create_notifications(notifications)
+
+    try:
+        send_mass_mail(emails, fail_silently=False)
+    except Exception as e:
+        logger.error(f"Failed to send vendor notification emails: {str(e)}")
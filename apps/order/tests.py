@@ -1,11 +1,20 @@
+import json
+import threading
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
+from prometheus_client import REGISTRY
 from .models import Order, OrderItem
+from .utils import WORKER_INDEX_ENV, OrderNumberGenerator, default_node_id, is_valid_order_number
 from apps.vendor.models import Vendor
 from apps.product.models import Category, Product
-from apps.core.tests import BaseAPITestCase
+from apps.product.repositories import ProductRepository
+from apps.core.tests import BaseAPITestCase, BaseTestCase
+from apps.notification.models import Notification
 
 User = get_user_model()
 
@@ -95,6 +104,33 @@ class OrderAPITests(BaseAPITestCase):
         self.assertEqual(response.data['customer']['username'], 'customer')
         self.assertEqual(len(response.data['items']), 1)
 
+    def test_order_detail_etag_follows_items(self):
+        """Test that a change to an order item produces a new ETag for its order"""
+        url = reverse('order-detail', kwargs={'pk': self.order.id})
+        self.authenticate_as_customer()
+        etag = self.client.get(url)['ETag']
+
+        self.assert_status(self.client.get(url, HTTP_IF_NONE_MATCH=etag), status.HTTP_304_NOT_MODIFIED)
+
+        self.order_item.quantity = 2
+        self.order_item.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_order_detail_preconditions_check_object_permissions(self):
+        """Test that a client without object permission cannot probe an order with If-None-Match"""
+        url = reverse('order-detail', kwargs={'pk': self.order.id})
+        self.authenticate_as_customer()
+        etag = self.client.get(url)['ETag']
+
+        with mock.patch('apps.order.views.IsCustomerOwnerOrVendorOrAdmin.has_object_permission', return_value=False):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assert_status(response, status.HTTP_403_FORBIDDEN)
+            self.assertNotIn('ETag', response)
+            self.assert_status(self.client.get(url, HTTP_IF_MATCH='"other"'), status.HTTP_403_FORBIDDEN)
+
     def test_order_detail_not_found(self):
         """Test retrieving non-existent order detail"""
         url = reverse('order-detail', kwargs={'pk': 999})
@@ -148,14 +184,18 @@ class OrderAPITests(BaseAPITestCase):
             ]
         }
 
-        response = self.client.post(url, data, format='json')
+        created_before = REGISTRY.get_sample_value('orders_created_total')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, data, format='json')
         self.assert_status(response, status.HTTP_201_CREATED)
 
-        # Verify the order was created
+        # Verify the order was created and counted
         self.assertEqual(Order.objects.count(), 2)  # 1 from setup + 1 new
+        self.assertEqual(REGISTRY.get_sample_value('orders_created_total'), created_before + 1)
         new_order = Order.objects.latest('created_at')
         self.assertEqual(new_order.shipping_address, '789 New Address St')
         self.assertEqual(new_order.customer, self.customer_user)
+        self.assertTrue(is_valid_order_number(new_order.order_number))
 
         # Verify the order items were created
         self.assertEqual(OrderItem.objects.filter(order=new_order).count(), 1)
@@ -167,6 +207,46 @@ class OrderAPITests(BaseAPITestCase):
         self.product.refresh_from_db()
         self.assertEqual(self.product.stock, 8)  # 10 initial - 2 ordered
 
+    def test_create_order_with_multiple_items(self):
+        """Test creating an order with several items updates stock and notifies the vendor per item"""
+        other_product = Product.objects.create(
+            vendor=self.vendor,
+            category=self.category,
+            name='Other Product',
+            description='Other Product Description',
+            price=10,
+            stock=5,
+            is_available=True
+        )
+        url = reverse('order-list')
+        self.authenticate_as_customer()
+
+        data = {
+            'shipping_address': '789 New Address St',
+            'items': [
+                {'product_id': self.product.id, 'quantity': 2},
+                {'product_id': other_product.id, 'quantity': 3},
+            ]
+        }
+
+        response = self.client.post(url, data, format='json')
+        self.assert_status(response, status.HTTP_201_CREATED)
+
+        new_order = Order.objects.latest('created_at')
+        self.assertEqual(new_order.items.count(), 2)
+
+        # Verify the product stock was updated
+        self.product.refresh_from_db()
+        other_product.refresh_from_db()
+        self.assertEqual(self.product.stock, 8)
+        self.assertEqual(other_product.stock, 2)
+
+        # Verify the vendor got one notification per item
+        self.assertEqual(
+            Notification.objects.filter(recipient=self.vendor_user, related_object_id=new_order.id).count(),
+            2
+        )
+
     def test_create_order_with_invalid_data(self):
         """Test creating an order with invalid data"""
         url = reverse('order-list')
@@ -203,12 +283,51 @@ class OrderAPITests(BaseAPITestCase):
             ]
         }
 
+        rejections_before = REGISTRY.get_sample_value('stock_out_rejections_total')
         response = self.client.post(url, data, format='json')
         self.assert_status(response, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(REGISTRY.get_sample_value('stock_out_rejections_total'), rejections_before + 1)
 
         # Verify no order was created
         self.assertEqual(Order.objects.count(), 1)  # Still only 1 from setup
 
+    def test_create_order_with_repeated_product_over_stock(self):
+        """Test that lines repeating a product are checked against its stock together"""
+        url = reverse('order-list')
+        self.authenticate_as_customer()
+
+        data = {
+            'shipping_address': '789 New Address St',
+            'items': [
+                {'product_id': self.product.id, 'quantity': 6},
+                {'product_id': self.product.id, 'quantity': 6},
+            ]
+        }
+        response = self.client.post(url, data, format='json')
+
+        self.assert_status(response, status.HTTP_400_BAD_REQUEST)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_create_order_locks_products(self):
+        """Test that products are locked while their stock is checked and decremented"""
+        url = reverse('order-list')
+        self.authenticate_as_customer()
+        data = {
+            'shipping_address': '789 New Address St',
+            'items': [{'product_id': self.product.id, 'quantity': 2}]
+        }
+
+        with mock.patch('apps.product.repositories.ProductRepository.get_many',
+                        autospec=True, side_effect=ProductRepository.get_many) as get_many:
+            response = self.client.post(url, data, format='json')
+
+        self.assert_status(response, status.HTTP_201_CREATED)
+        self.assertTrue(any(call.kwargs.get('for_update') for call in get_many.call_args_list))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 8)
+
     def test_create_order_as_vendor(self):
         """Test creating an order as vendor (should be allowed as vendors can also be customers)"""
         url = reverse('order-list')
@@ -302,3 +421,156 @@ class OrderAPITests(BaseAPITestCase):
 
         response = self.client.get(url)
         self.assert_status(response, status.HTTP_401_UNAUTHORIZED)
+
+    def add_orders(self, size):
+        """
+        Bring the customer's orders up to ``size``, each with two items of the vendor's products
+        """
+        for i in range(Order.objects.count(), size):
+            order = Order.objects.create(
+                customer=self.customer_user, total_price=20, shipping_address=f'{i} Customer St'
+            )
+            for j in range(2):
+                product = Product.objects.create(
+                    vendor=self.vendor, category=self.category, name=f'Budget Product {i}-{j}',
+                    description='Budget product', price=10, stock=5,
+                )
+                OrderItem.objects.create(order=order, product=product, quantity=1, price=10)
+
+    def test_order_list_query_budget(self):
+        """Test that listing orders with their items runs O(1) queries in the number of orders"""
+        url = reverse('order-list')
+        self.authenticate_as_customer()
+
+        self.assert_scales(
+            'order-list', lambda: self.client.get(url), self.add_orders, sizes=(1, 10), max_queries=4,
+            max_time_ratio=4,
+        )
+
+    def test_vendor_orders_query_budget(self):
+        """Test that the vendor orders endpoint runs O(1) queries in the number of orders"""
+        url = reverse('order-vendor-orders')
+        self.authenticate_as_vendor()
+
+        self.assert_scales(
+            'order-vendor-orders', lambda: self.client.get(url), self.add_orders, sizes=(1, 10), max_queries=4,
+            max_time_ratio=4,
+        )
+
+    def test_export_orders_csv_as_admin(self):
+        """Test streaming orders as CSV as admin"""
+        url = reverse('order-export')
+        self.authenticate_as_admin()
+
+        response = self.client.get(url)
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['id', 'order_number'])
+        self.assertEqual(len(lines), 2)  # header + 1 order from setup
+        self.assertIn(self.order.order_number, lines[1])
+
+    def test_export_orders_ndjson_with_filters(self):
+        """Test streaming orders as NDJSON filtered by status"""
+        Order.objects.create(
+            customer=self.customer_user,
+            total_price=10,
+            shipping_address='123 Customer St',
+            status=Order.OrderStatus.SHIPPED
+        )
+        url = f"{reverse('order-export')}?export_format=ndjson&status=SHIPPED"
+        self.authenticate_as_admin()
+
+        response = self.client.get(url)
+        self.assert_status(response, status.HTTP_200_OK)
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['status'], 'SHIPPED')
+        self.assertEqual(rows[0]['customer__username'], 'customer')
+
+    def test_export_orders_as_non_admin(self):
+        """Test that only admins can export orders"""
+        url = reverse('order-export')
+        self.authenticate_as_customer()
+
+        response = self.client.get(url)
+        self.assert_status(response, status.HTTP_403_FORBIDDEN)
+
+
+class OrderNumberGeneratorTests(SimpleTestCase):
+    """
+    Tests for the Snowflake-style order number generator
+    """
+
+    def test_numbers_are_unique_and_increasing_across_threads(self):
+        """Test that concurrent generation never repeats and stays ordered per thread"""
+        generator = OrderNumberGenerator(node_id=1)
+        results = [[] for _ in range(8)]
+
+        def generate(bucket):
+            for _ in range(2000):
+                bucket.append(generator.generate())
+
+        threads = [threading.Thread(target=generate, args=(bucket,)) for bucket in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        numbers = [number for bucket in results for number in bucket]
+        self.assertEqual(len(set(numbers)), len(numbers))
+        for bucket in results:
+            self.assertEqual(bucket, sorted(bucket))
+
+    def test_monotonic_when_clock_moves_backwards(self):
+        """Test that a clock step backwards does not produce smaller numbers"""
+        generator = OrderNumberGenerator(node_id=1)
+        with mock.patch.object(generator, '_now_ms', side_effect=[1000, 1000, 900, 900]):
+            numbers = [generator.generate() for _ in range(4)]
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertEqual(len(set(numbers)), 4)
+
+    def test_nodes_do_not_collide(self):
+        """Test that two nodes generating in the same millisecond get different numbers"""
+        first, second = OrderNumberGenerator(node_id=1), OrderNumberGenerator(node_id=2)
+        with mock.patch.object(first, '_now_ms', return_value=1000), \
+                mock.patch.object(second, '_now_ms', return_value=1000):
+            self.assertNotEqual(first.generate(), second.generate())
+
+    def test_node_id_from_host_and_worker_index(self):
+        """Test that each gunicorn worker adds its index to the host's node ID, within range"""
+        with override_settings(ORDER_NUMBER_NODE_ID=16), mock.patch.dict('os.environ', {WORKER_INDEX_ENV: '3'}):
+            self.assertEqual(default_node_id(), 19)
+            self.assertEqual(OrderNumberGenerator().next_id() >> 11 & 1023, 19)
+        with override_settings(ORDER_NUMBER_NODE_ID=1022), mock.patch.dict('os.environ', {WORKER_INDEX_ENV: '2'}):
+            with self.assertRaises(ImproperlyConfigured):
+                default_node_id()
+        with self.assertRaises(ValueError):
+            OrderNumberGenerator(node_id=1024)
+
+    def test_check_symbol(self):
+        """Test that the check symbol detects typos"""
+        number = OrderNumberGenerator(node_id=1).generate()
+        self.assertEqual(len(number), 14)
+        self.assertTrue(is_valid_order_number(number))
+
+        typo = number[:5] + ('0' if number[5] != '0' else '1') + number[6:]
+        self.assertFalse(is_valid_order_number(typo))
+        self.assertFalse(is_valid_order_number(number[:-1]))
+        self.assertFalse(is_valid_order_number('I' + number[1:]))
+
+
+class OrderNumberClashTests(BaseTestCase):
+    """
+    Tests for the unique constraint fallback of order numbers
+    """
+
+    def test_save_retries_with_a_new_number(self):
+        """Test that an order number already taken is replaced by a fresh one"""
+        existing = Order.objects.create(customer=self.customer_user, total_price=1, shipping_address='x')
+        with mock.patch('apps.order.models.generate_order_number', side_effect=[existing.order_number, 'FRESH']):
+            order = Order.objects.create(customer=self.customer_user, total_price=2, shipping_address='y')
+        self.assertEqual(order.order_number, 'FRESH')
+        self.assertEqual(Order.objects.count(), 2)
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Crockford's base32 alphabet (no I, L, O, U) plus the five extra check symbols
+ENCODING = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+CHECK_SYMBOLS = ENCODING + '*~$=U'
+
+# 42 bits of milliseconds since EPOCH_MS, 10 bits of node ID, 11 bits of sequence
+EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+NODE_BITS = 10
+SEQUENCE_BITS = 11
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+ID_LENGTH = 13  # 63 bits in base32
+
+# Index of this gunicorn worker on its host, set by gunicorn.conf.py
+WORKER_INDEX_ENV = 'GUNICORN_WORKER_INDEX'
+
+
+def encode_base32(value: int, length: int = ID_LENGTH) -> str:
+    """
+    Encode a non-negative integer as fixed-width Crockford base32
+    """
+    chars = []
+    for _ in range(length):
+        value, remainder = divmod(value, 32)
+        chars.append(ENCODING[remainder])
+    return ''.join(reversed(chars))
+
+
+def check_symbol(value: int) -> str:
+    """
+    Crockford mod-37 check symbol; catches single-character typos and most transpositions
+    """
+    return CHECK_SYMBOLS[value % 37]
+
+
+def is_valid_order_number(order_number: str) -> bool:
+    """
+    Check the format and check symbol of an order number
+    """
+    if len(order_number) != ID_LENGTH + 1:
+        return False
+    body, check = order_number[:-1], order_number[-1]
+    value = 0
+    for char in body:
+        index = ENCODING.find(char)
+        if index < 0:
+            return False
+        value = value * 32 + index
+    return check_symbol(value) == check
+
+
+def default_node_id() -> int:
+    """
+    Node ID of this process: settings.ORDER_NUMBER_NODE_ID, the first node ID
+    of the host, plus the index of this gunicorn worker (GUNICORN_WORKER_INDEX,
+    set by gunicorn.conf.py; 0 outside gunicorn)
+    """
+    base = getattr(settings, 'ORDER_NUMBER_NODE_ID', None) or 0
+    index = int(os.environ.get(WORKER_INDEX_ENV, 0))
+    node_id = base + index
+    if base < 0 or not 0 <= node_id <= MAX_NODE_ID:
+        raise ImproperlyConfigured(
+            f'Order number node ID {node_id} (ORDER_NUMBER_NODE_ID={base} + worker {index}) '
+            f'is outside 0-{MAX_NODE_ID}'
+        )
+    return node_id
+
+
+class OrderNumberGenerator:
+    """
+    Snowflake-style order number generator.
+
+    Numbers are 13 Crockford base32 characters encoding a millisecond
+    timestamp, a node ID and a per-node sequence, followed by a check
+    symbol. They are unique without a database round-trip, strictly
+    increasing per node and roughly time-ordered across nodes, so inserts
+    land at the right edge of the unique index instead of fragmenting it.
+
+    Each process needs a distinct node ID. gunicorn.conf.py gives every
+    worker of a host a distinct index, added to ORDER_NUMBER_NODE_ID; hosts
+    need ORDER_NUMBER_NODE_ID values at least GUNICORN_WORKERS apart. Other
+    processes (shells, management commands) use the host's first node ID,
+    and the unique constraint on Order.order_number catches the rare clash
+    with the first worker (see Order.save).
+    """
+
+    def __init__(self, node_id: Optional[int] = None):
+        if node_id is not None and not 0 <= node_id <= MAX_NODE_ID:
+            raise ValueError(f'Node ID {node_id} is outside 0-{MAX_NODE_ID}')
+        self._configured_node_id = node_id
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        # Resolved on first use: a forked gunicorn worker learns its index after the fork
+        self.node_id = self._configured_node_id
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _now_ms(self) -> int:
+        return time.time_ns() // 1_000_000 - EPOCH_MS
+
+    def next_id(self) -> int:
+        """
+        Return the next 63-bit ID for this node
+        """
+        with self._lock:
+            if self.node_id is None:
+                self.node_id = default_node_id()
+            now = self._now_ms()
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                # Same millisecond, or the clock moved backwards: stay on the last timestamp
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    # Sequence exhausted: borrow the next millisecond to stay monotonic
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (self._last_ms << (NODE_BITS + SEQUENCE_BITS)) | (self.node_id << SEQUENCE_BITS) | self._sequence
+
+    def generate(self) -> str:
+        """
+        Return the next order number
+        """
+        value = self.next_id()
+        return encode_base32(value) + check_symbol(value)
+
+
+_generator = OrderNumberGenerator()
+
+# Forked workers (e.g. gunicorn) get a fresh node ID and sequence
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_generator._reset)
+
+
+def generate_order_number() -> str:
+    """
+    Generate a new unique order number
+    """
+    return _generator.generate()
@@ -1,6 +1,9 @@
 from rest_framework import permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Order
 from .serializers import OrderSerializer, OrderCreateSerializer
@@ -8,7 +11,8 @@ from .permissions import IsCustomerOwnerOrVendorOrAdmin
 from apps.user.permissions import IsAdmin, IsVendor, IsCustomer
 from .services import OrderService
 from apps.core.views import BaseModelViewSet
-from datetime import datetime
+from apps.core.utils import stream_csv, stream_ndjson
+from datetime import datetime, timedelta
 
 class OrderViewSet(BaseModelViewSet):
     """
@@ -23,12 +27,22 @@ class OrderViewSet(BaseModelViewSet):
     filterset_fields = ['status']
     ordering_fields = ['created_at', 'updated_at', 'total_price']
     permission_classes = [IsCustomerOwnerOrVendorOrAdmin]
+    # Orders embed their customer, their items and each item's product with its vendor and category
+    conditional_fields = (
+        'updated_at', 'customer__updated_at', 'items__updated_at', 'items__product__updated_at',
+        'items__product__vendor__updated_at', 'items__product__vendor__user__updated_at',
+        'items__product__category__updated_at',
+    )
+    export_fields = [
+        'id', 'order_number', 'customer_id', 'customer__username', 'customer__email',
+        'status', 'total_price', 'shipping_address', 'created_at', 'updated_at',
+    ]
+    export_chunk_size = 2000
 
     def get_queryset(self):
         service = self.get_service()
 
-        # Get orders with all relations
-        queryset = service.get_with_all_relations()
+        queryset = service.get_all()
 
         # Filter based on user role
         user = self.request.user
@@ -48,7 +62,7 @@ class OrderViewSet(BaseModelViewSet):
             end_date = datetime.strptime(end_date, '%Y-%m-%d')
             queryset = service.get_by_date_range(start_date, end_date)
 
-        return queryset
+        return service.with_all_relations(queryset)
 
     def perform_create(self, serializer):
         service = self.get_service()
@@ -57,12 +71,15 @@ class OrderViewSet(BaseModelViewSet):
         # Extract items data
         items_data = validated_data.pop('items')
 
-        # Create order for the current user
-        instance = service.create_order(
-            customer_id=self.request.user.id,
-            shipping_address=validated_data['shipping_address'],
-            items=items_data
-        )
+        # Create order for the current user; stock is only checked here, with repeated products added up
+        try:
+            instance = service.create_order(
+                customer_id=self.request.user.id,
+                shipping_address=validated_data['shipping_address'],
+                items=items_data
+            )
+        except ValueError as e:
+            raise ValidationError({'items': [str(e)]})
 
         serializer.instance = instance
 
@@ -92,7 +109,7 @@ class OrderViewSet(BaseModelViewSet):
         Get orders containing products from the current vendor
         """
         service = self.get_service()
-        queryset = service.get_by_vendor_id(request.user.vendor_profile.id)
+        queryset = service.with_all_relations(service.get_by_vendor_id(request.user.vendor_profile.id))
 
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -101,3 +118,53 @@ class OrderViewSet(BaseModelViewSet):
 
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdmin])
+    def export(self, request):
+        """
+        Stream all matching orders as CSV or NDJSON (admin only).
+        Accepts export_format (csv or ndjson), start_date and end_date
+        (YYYY-MM-DD, both inclusive) and status. Rows are read with a
+        server-side cursor, so memory use does not grow with the export size.
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in ('csv', 'ndjson'):
+            return Response(
+                {"detail": "export_format must be 'csv' or 'ndjson'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            start_date = self._parse_export_date(request.query_params.get('start_date'))
+            end_date = self._parse_export_date(request.query_params.get('end_date'))
+        except ValueError:
+            return Response(
+                {"detail": "Dates must use the YYYY-MM-DD format"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if end_date:
+            end_date += timedelta(days=1)
+
+        service = self.get_service()
+        rows = service.iter_export_rows(
+            self.export_fields,
+            start_date=start_date,
+            end_date=end_date,
+            status=request.query_params.get('status'),
+            chunk_size=self.export_chunk_size
+        )
+
+        if export_format == 'csv':
+            response = StreamingHttpResponse(stream_csv(rows, self.export_fields), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(stream_ndjson(rows), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="orders.{export_format}"'
+        return response
+
+    def _parse_export_date(self, value):
+        """
+        Parse a YYYY-MM-DD query parameter into an aware datetime
+        """
+        if not value:
+            return None
+        return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
@@ -0,0 +1,311 @@
+import csv
+import json
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.exceptions import ValidationError
+
+from apps.product.models import Category
+from apps.product.serializers import ProductBulkItemSerializer
+from apps.product.services import ProductService
+from apps.vendor.models import Vendor
+
+Row = Tuple[int, Dict[str, Any]]
+
+
+class CachedLookup:
+    """
+    Resolve natural keys (e.g. category slugs) to primary keys.
+    Misses are loaded for a whole batch with one query and cached,
+    including keys that do not exist.
+    """
+
+    def __init__(self, queryset, field_name: str):
+        self.queryset = queryset
+        self.field_name = field_name
+        self.cache: Dict[Any, Optional[int]] = {}
+
+    def load(self, keys: Iterable[Any]) -> None:
+        """
+        Load all keys that are not cached yet
+        """
+        missing = {key for key in keys if key not in self.cache}
+        if not missing:
+            return
+        found = dict(
+            self.queryset.filter(**{f'{self.field_name}__in': missing}).values_list(self.field_name, 'pk')
+        )
+        for key in missing:
+            self.cache[key] = found.get(key)
+
+    def get(self, key: Any) -> Optional[int]:
+        return self.cache.get(key)
+
+    @staticmethod
+    def is_key(value: Any) -> bool:
+        """
+        Whether a value can be looked up: NDJSON may hold lists or objects, which cannot
+        """
+        return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+
+def read_lines(path: str, start: int, end: Optional[int]) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (offset, line) for every line starting in the byte range [start, end)
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        offset = start
+        for raw in f:
+            if end is not None and offset >= end:
+                break
+            yield offset, raw.decode('utf-8')
+            offset += len(raw)
+
+
+def parse_rows(path: str, file_format: str, start: int, end: Optional[int], first_line: int,
+               fieldnames: Optional[List[str]]) -> Iterator[Row]:
+    """
+    Parse a byte range of a CSV or NDJSON file into (line number, row) pairs.
+    Empty CSV cells are dropped so they count as missing fields.
+    """
+    lines = read_lines(path, start, end)
+    line_numbers = iter(range(first_line, first_line + 2 ** 62))
+
+    if file_format == 'ndjson':
+        for line_number, (_, line) in zip(line_numbers, lines):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                row = {'__error__': f'Invalid JSON: {exc.msg}'}
+            yield line_number, row
+        return
+
+    # Skip the header when reading from the start of the file
+    if start == 0:
+        next(lines, None)
+        next(line_numbers)
+    for line_number, values in zip(line_numbers, csv.reader(line for _, line in lines)):
+        if not values:
+            continue
+        row = {key: value for key, value in zip(fieldnames, values) if value != ''}
+        yield line_number, row
+
+
+def batched(rows: Iterable[Row], batch_size: int) -> Iterator[List[Row]]:
+    """
+    Group an iterable of rows into lists of at most batch_size rows
+    """
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class ImportPipeline:
+    """
+    parse -> resolve -> validate -> batched upsert pipeline for one file range.
+    Only one batch is held in memory at a time.
+    """
+
+    def __init__(self, default_vendor_id: Optional[int] = None, max_errors: int = 100):
+        self.default_vendor_id = default_vendor_id
+        self.max_errors = max_errors
+        self.categories = CachedLookup(Category.objects.all(), 'slug')
+        self.vendors = CachedLookup(Vendor.objects.filter(is_active=True), 'pk')
+        self.serializer = ProductBulkItemSerializer()
+        self.service = ProductService()
+        self.stats = {'processed': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+
+    def fail(self, line_number: int, errors: Any) -> None:
+        self.stats['failed'] += 1
+        if len(self.stats['errors']) < self.max_errors:
+            self.stats['errors'].append((line_number, errors))
+
+    def resolve(self, batch: List[Row]) -> List[Tuple[int, int, Dict[str, Any]]]:
+        """
+        Replace category slugs and vendor IDs with primary keys using the cached lookups
+        """
+        self.categories.load(
+            row['category'] for _, row in batch
+            if isinstance(row, dict) and CachedLookup.is_key(row.get('category'))
+        )
+        self.vendors.load(
+            int(row.get('vendor_id', self.default_vendor_id))
+            for _, row in batch
+            if isinstance(row, dict) and str(row.get('vendor_id', self.default_vendor_id)).isdigit()
+        )
+
+        resolved = []
+        for line_number, row in batch:
+            if not isinstance(row, dict):
+                self.fail(line_number, {'non_field_errors': ['Expected an object.']})
+                continue
+            if '__error__' in row:
+                self.fail(line_number, {'non_field_errors': [row['__error__']]})
+                continue
+
+            vendor_key = str(row.pop('vendor_id', self.default_vendor_id))
+            vendor_id = self.vendors.get(int(vendor_key)) if vendor_key.isdigit() else None
+            if vendor_id is None:
+                self.fail(line_number, {'vendor_id': ['Vendor does not exist.']})
+                continue
+
+            if 'category' in row:
+                category = row.pop('category')
+                if not CachedLookup.is_key(category):
+                    self.fail(line_number, {'category': ['Expected a category slug.']})
+                    continue
+                category_id = self.categories.get(category)
+                if category_id is None:
+                    self.fail(line_number, {'category': ['Category does not exist.']})
+                    continue
+                row['category_id'] = category_id
+
+            resolved.append((line_number, vendor_id, row))
+        return resolved
+
+    def validate(self, rows: List[Tuple[int, int, Dict[str, Any]]]) -> Dict[int, Dict[int, Dict[str, Any]]]:
+        """
+        Validate rows and group the valid ones by vendor
+        """
+        by_vendor: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        for line_number, vendor_id, row in rows:
+            try:
+                data = self.serializer.run_validation(row)
+            except ValidationError as exc:
+                self.fail(line_number, exc.detail)
+                continue
+            by_vendor.setdefault(vendor_id, {})[line_number] = data
+        return by_vendor
+
+    def upsert(self, by_vendor: Dict[int, Dict[int, Dict[str, Any]]]) -> None:
+        """
+        Upsert each vendor's rows with one INSERT for new slugs and one upsert for existing ones
+        """
+        for vendor_id, rows in by_vendor.items():
+            products, errors, created = self.service.bulk_upsert_products(vendor_id, rows)
+            self.stats['created'] += created
+            self.stats['updated'] += len(products) - created
+            for line_number, detail in sorted(errors.items()):
+                self.fail(line_number, detail)
+
+    def run(self, rows: Iterable[Row], batch_size: int) -> Dict[str, Any]:
+        for batch in batched(rows, batch_size):
+            self.stats['processed'] += len(batch)
+            self.upsert(self.validate(self.resolve(batch)))
+        return self.stats
+
+
+def import_chunk(path: str, file_format: str, start: int, end: Optional[int], first_line: int,
+                 fieldnames: Optional[List[str]], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Import one byte range of the file. Runs in a worker process when --workers > 1.
+    """
+    if not apps.ready:
+        django.setup()
+    pipeline = ImportPipeline(options['vendor_id'], options['max_errors'])
+    rows = parse_rows(path, file_format, start, end, first_line, fieldnames)
+    return pipeline.run(rows, options['batch_size'])
+
+
+def split_file(path: str, workers: int, header_end: int) -> List[Tuple[int, Optional[int], int]]:
+    """
+    Split the file body into line-aligned byte ranges, one per worker.
+    Returns (start, end, first line number) for each range; line numbers
+    are found by counting newlines block by block, so memory stays constant.
+    CSV records must not contain embedded newlines when splitting.
+    """
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, workers):
+            f.seek(max(header_end, size * i // workers))
+            f.readline()
+            boundaries.append(f.tell())
+    boundaries.append(size)
+    boundaries = sorted(set(boundaries))
+
+    ranges = []
+    line_number = 1
+    with open(path, 'rb') as f:
+        for start, end in zip(boundaries, boundaries[1:]):
+            ranges.append((start, end, line_number))
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                block = f.read(min(remaining, 1 << 20))
+                line_number += block.count(b'\n')
+                remaining -= len(block)
+    return ranges
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV or NDJSON product catalog into the database with batched upserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to a .csv or .ndjson file')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='File format (default: from extension)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per upsert statement')
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes, each importing a chunk of the file')
+        parser.add_argument('--vendor-id', type=int, help='Vendor for rows without a vendor_id column')
+        parser.add_argument('--max-errors', type=int, default=100, help='Maximum number of row failures to report')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+        file_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        workers = max(1, options['workers'])
+
+        fieldnames = None
+        header_end = 0
+        if file_format == 'csv':
+            with open(path, 'rb') as f:
+                header = f.readline()
+                header_end = f.tell()
+            fieldnames = next(csv.reader([header.decode('utf-8-sig')]), [])
+
+        started = time.perf_counter()
+        if workers == 1:
+            results = [import_chunk(path, file_format, 0, None, 1, fieldnames, options)]
+        else:
+            # Children must not share the parent's database connections
+            connections.close_all()
+            chunks = split_file(path, workers, header_end)
+            context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = [
+                    executor.submit(import_chunk, path, file_format, start, end, first_line, fieldnames, options)
+                    for start, end, first_line in chunks
+                ]
+                results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+        totals = {key: sum(result[key] for result in results) for key in ('processed', 'created', 'updated', 'failed')}
+        errors = sorted(
+            (error for result in results for error in result['errors']), key=lambda error: error[0]
+        )[:options['max_errors']]
+
+        for line_number, detail in errors:
+            self.stderr.write(f'line {line_number}: {json.dumps(detail)}')
+        if totals['failed'] > len(errors):
+            self.stderr.write(f"... and {totals['failed'] - len(errors)} more failures")
+
+        rate = totals['processed'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {totals['processed']} rows in {elapsed:.2f}s ({rate:.0f} rows/s): "
+            f"{totals['created']} created, {totals['updated']} updated, {totals['failed']} failed"
+        ))
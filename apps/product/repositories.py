@@ -75,6 +75,22 @@ class ProductRepository(BaseRepository):
         """
         return self.model_class.objects.filter(vendor_id=vendor_id)
     
+    def get_vendor_ids_by_slugs(self, slugs: List[str], for_update: bool = False) -> Dict[str, int]:
+        """
+        Map each existing slug to the ID of the vendor that owns it,
+        locking the rows (inside a transaction) when for_update is set
+        """
+        queryset = self.model_class.objects.filter(slug__in=slugs)
+        if for_update:
+            queryset = queryset.select_for_update()
+        return dict(queryset.values_list('slug', 'vendor_id'))
+    
+    def get_by_vendor_id_and_slugs(self, vendor_id: int, slugs: List[str]) -> Dict[str, Product]:
+        """
+        Get a vendor's products by slug, keyed by slug
+        """
+        return self.model_class.objects.filter(vendor_id=vendor_id).in_bulk(slugs, field_name='slug')
+    
     def get_by_category_id(self, category_id: int) -> QuerySet:
         """
         Get products by category ID
@@ -23,6 +23,28 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = ('id', 'vendor', 'category', 'name', 'slug', 'description', 'price', 'stock', 'is_available', 'created_at', 'updated_at')
         read_only_fields = ('slug', 'created_at', 'updated_at')
 
+class ProductBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a single row of a bulk product create/update.
+    Performs no database lookups; category existence and slug ownership
+    are checked once for the whole batch by ProductService.
+    """
+    category_id = serializers.IntegerField()
+    # Declared explicitly to skip the per-row UniqueValidator query
+    slug = serializers.SlugField(max_length=50, required=False)
+
+    class Meta:
+        model = Product
+        fields = ('category_id', 'name', 'slug', 'description', 'price', 'stock', 'is_available')
+
+    def validate_price(self, value):
+        """
+        Validate that the price is positive
+        """
+        if value <= 0:
+            raise serializers.ValidationError("Price must be greater than zero")
+        return value
+
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating and updating products
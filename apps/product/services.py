@@ -1,8 +1,10 @@
 from apps.core.services import BaseService
 from .repositories import ProductRepository, CategoryRepository
 from .models import Product, Category
-from typing import Optional, List, Dict, Any, Union
-from django.db.models import QuerySet
+from typing import Optional, List, Dict, Any, Union, Tuple
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet, F
+from django.utils.text import slugify
 
 
 class CategoryService(BaseService):
@@ -67,8 +69,15 @@ class ProductService(BaseService):
     Service for Product model
     """
     
+    # Fields overwritten when a bulk upsert hits an existing slug (reactivating soft-deleted products)
+    BULK_UPSERT_FIELDS = ['category', 'name', 'description', 'price', 'stock', 'is_available', 'is_active', 'updated_at']
+    BULK_BATCH_SIZE = 1000
+    # Bulk upserts tried again when a new slug is inserted by another request in between
+    BULK_UPSERT_ATTEMPTS = 3
+    
     def __init__(self):
         super().__init__(ProductRepository())
+        self.category_service = CategoryService()
     
     def get_by_slug(self, slug: str) -> Optional[Product]:
         """
@@ -153,6 +162,150 @@ class ProductService(BaseService):
             return product
         return None
     
+    def update_stock_many(self, quantities: Dict[int, int], products: Optional[Dict[int, Product]] = None) -> List[Product]:
+        """
+        Update stock for several products in a single query.
+        quantities maps product ID to the (signed) stock delta.
+        """
+        if products is None:
+            products = self.get_many(quantities.keys())
+
+        updated = []
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if product:
+                updated.append((product, product.stock + quantity))
+                # Apply the delta in the database so concurrent writers don't clobber each other
+                product.stock = F('stock') + quantity
+
+        self.bulk_update([product for product, _ in updated], ['stock'])
+
+        # Reflect the new values on the in-memory instances
+        for product, stock in updated:
+            product.stock = stock
+        return [product for product, _ in updated]
+    
+    def bulk_upsert_products(self, vendor_id: int, rows: Dict[int, Dict[str, Any]]) -> Tuple[Dict[int, Product], Dict[int, Any], int]:
+        """
+        Create or replace a vendor's products by slug.
+        rows maps the row index in the request to its validated data.
+        Returns the upserted products and the errors (both keyed by row
+        index) and the number of rows that created a new product.
+        """
+        errors = {}
+        max_length = Product._meta.get_field('slug').max_length
+        for index, row in rows.items():
+            if row.get('slug'):
+                continue
+            row['slug'] = slugify(row['name'])
+            # A bad generated slug would fail the whole INSERT, not just this row
+            if not row['slug']:
+                errors[index] = {'slug': ['Could not generate a slug from the name; provide one.']}
+            elif len(row['slug']) > max_length:
+                errors[index] = {'slug': [
+                    f'Slug generated from the name is longer than {max_length} characters; provide one.'
+                ]}
+
+        for attempt in range(1, self.BULK_UPSERT_ATTEMPTS + 1):
+            row_errors = dict(errors)
+            new = []
+            try:
+                with transaction.atomic():
+                    # Existing slugs stay locked until they are written, so their owners cannot change
+                    owners = self._validate_bulk_rows(vendor_id, rows, row_errors, lock=True)
+                    products = {
+                        index: Product(vendor_id=vendor_id, is_active=True, **row)
+                        for index, row in rows.items()
+                        if index not in row_errors
+                    }
+                    new = [product for product in products.values() if product.slug not in owners]
+                    existing = [product for product in products.values() if product.slug in owners]
+                    # A plain INSERT: a slug taken since the check fails it instead of
+                    # updating a product that may belong to another vendor
+                    if new:
+                        self.bulk_create(new, batch_size=self.BULK_BATCH_SIZE)
+                    if existing:
+                        self.bulk_create(
+                            existing,
+                            batch_size=self.BULK_BATCH_SIZE,
+                            update_conflicts=True,
+                            unique_fields=['slug'],
+                            update_fields=self.BULK_UPSERT_FIELDS
+                        )
+                return products, row_errors, len(new)
+            except IntegrityError:
+                # Check the batch again only when one of the new slugs was inserted meanwhile
+                taken = self.repository.get_vendor_ids_by_slugs([product.slug for product in new])
+                if attempt == self.BULK_UPSERT_ATTEMPTS or not taken:
+                    raise
+    
+    def bulk_update_products(self, vendor_id: int, rows: Dict[int, Dict[str, Any]]) -> Tuple[Dict[int, Product], Dict[int, Any]]:
+        """
+        Partially update a vendor's existing products, matched by slug.
+        rows maps the row index in the request to its validated data.
+        Returns the updated products and the errors, both keyed by row index.
+        """
+        errors = {}
+        for index, row in rows.items():
+            if not row.get('slug'):
+                errors[index] = {'slug': ['This field is required.']}
+        self._validate_bulk_rows(vendor_id, rows, errors)
+
+        existing = self.repository.get_by_vendor_id_and_slugs(
+            vendor_id, [row['slug'] for index, row in rows.items() if index not in errors]
+        )
+
+        products = {}
+        fields = set()
+        for index, row in rows.items():
+            if index in errors:
+                continue
+            product = existing.get(row['slug'])
+            if not product:
+                errors[index] = {'slug': ['Product not found.']}
+                continue
+            for key, value in row.items():
+                setattr(product, key, value)
+            fields.update(row.keys())
+            products[index] = product
+
+        fields.discard('slug')
+        if 'category_id' in fields:
+            fields.remove('category_id')
+            fields.add('category')
+        if products and fields:
+            self.bulk_update(products.values(), sorted(fields), batch_size=self.BULK_BATCH_SIZE)
+
+        return products, errors
+    
+    def _validate_bulk_rows(self, vendor_id: int, rows: Dict[int, Dict[str, Any]], errors: Dict[int, Any],
+                            lock: bool = False) -> Dict[str, int]:
+        """
+        Run the checks that need the database once for the whole batch:
+        category existence, duplicate slugs and slug ownership.
+        Returns the vendor ID owning each already existing slug, with those
+        rows locked until the end of the transaction when lock is set.
+        """
+        category_ids = {row['category_id'] for row in rows.values() if 'category_id' in row}
+        categories = self.category_service.get_many(category_ids)
+
+        slugs = [row['slug'] for index, row in rows.items() if index not in errors]
+        owners = self.repository.get_vendor_ids_by_slugs(slugs, for_update=lock)
+
+        seen = set()
+        for index, row in rows.items():
+            if index in errors:
+                continue
+            if 'category_id' in row and row['category_id'] not in categories:
+                errors[index] = {'category_id': ['Category does not exist']}
+            elif row['slug'] in seen:
+                errors[index] = {'slug': ['Duplicate slug in batch.']}
+            elif owners.get(row['slug'], vendor_id) != vendor_id:
+                errors[index] = {'slug': ['Slug is already used by another vendor.']}
+            seen.add(row['slug'])
+
+        return owners
+    
     def mark_as_available(self, product_id: int) -> Optional[Product]:
         """
         Mark a product as available
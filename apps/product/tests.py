@@ -1,10 +1,21 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import Product, Category
 from apps.vendor.models import Vendor
-from apps.core.tests import BaseAPITestCase
+from apps.core.tests import BaseAPITestCase, BaseTestCase
+from .repositories import ProductRepository
+from .services import ProductService
 
 User = get_user_model()
 
@@ -221,6 +232,27 @@ class ProductAPITests(BaseAPITestCase):
         self.assert_status(response, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)  # 1 product from setup
 
+    def test_product_list_query_budget(self):
+        """Test that the product list runs O(1) queries in the page size"""
+        url = reverse('product-list')
+        self.authenticate_as_customer()
+
+        def grow(size):
+            for i in range(Product.objects.count(), size):
+                Product.objects.create(
+                    vendor=self.vendor,
+                    category=Category.objects.create(name=f'Budget Category {i}'),
+                    name=f'Budget Product {i}',
+                    description='Budget product',
+                    price=10,
+                    stock=5,
+                )
+
+        self.assert_scales(
+            'product-list', lambda: self.client.get(url, {'page_size': 20}), grow,
+            sizes=(1, 20), max_queries=3, max_time_ratio=4,
+        )
+
     def test_product_detail(self):
         """Test retrieving product detail"""
         url = reverse('product-detail', kwargs={'pk': self.product.id})
@@ -470,3 +502,532 @@ class ProductAPITests(BaseAPITestCase):
         self.assert_status(response, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
         self.assertEqual(response.data['results'][0]['name'], 'Expensive Product')
+
+
+class ProductResponseCacheTests(BaseAPITestCase):
+    """
+    Test cases for the full-response cache of the catalog endpoints
+    """
+    def setUp(self):
+        super().setUp()
+
+        self.vendor = Vendor.objects.create(
+            user=self.vendor_user,
+            company_name='Test Vendor',
+            address='123 Vendor St'
+        )
+        self.category = Category.objects.create(name='Test Category')
+        self.product = Product.objects.create(
+            vendor=self.vendor,
+            category=self.category,
+            name='Cached Product',
+            description='Cached',
+            price=10,
+            stock=5
+        )
+
+    def test_anonymous_list_is_cached(self):
+        """Test that a repeated anonymous list is served from the cache without queries"""
+        url = reverse('product-list')
+
+        first = self.client.get(url, {'page': 1, 'ordering': 'name'})
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            second = self.client.get(url, {'ordering': 'name', 'page': 1})
+
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertIn('s-maxage', second['Cache-Control'])
+        self.assertIn('Authorization', second['Vary'])
+
+    def test_write_invalidates_list(self):
+        """Test that saving a product drops every cached list that includes products"""
+        url = reverse('product-list')
+        self.client.get(url)
+
+        self.product.name = 'Renamed Product'
+        self.product.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['name'], 'Renamed Product')
+
+    def test_vendor_scope_is_not_shared(self):
+        """Test that a vendor's own-products list is cached separately from the public one"""
+        other_user = User.objects.create_user(
+            username='other_vendor', email='other@example.com', password='password123', role=User.Role.VENDOR
+        )
+        other_vendor = Vendor.objects.create(user=other_user, company_name='Other', address='1 Other St')
+        Product.objects.create(
+            vendor=other_vendor, category=self.category, name='Other Product', description='x', price=1, stock=1
+        )
+        url = reverse('product-list')
+
+        self.authenticate_as_customer()
+        customer_response = self.client.get(url)
+        self.authenticate_as_vendor()
+        vendor_response = self.client.get(url)
+
+        self.assertEqual(customer_response.data['count'], 2)
+        self.assertEqual(vendor_response['X-Cache'], 'MISS')
+        self.assertEqual(vendor_response.data['count'], 1)
+        self.assertIn('private', vendor_response['Cache-Control'])
+
+    def test_category_list_is_cached_and_invalidated(self):
+        """Test the category list cache and its invalidation"""
+        url = reverse('category-list')
+        self.authenticate_as_customer()
+
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        Category.objects.create(name='New Category')
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class ProductConditionalGetTests(BaseAPITestCase):
+    """
+    Test cases for ETag and Last-Modified handling
+    """
+    def setUp(self):
+        super().setUp()
+
+        self.vendor = Vendor.objects.create(
+            user=self.vendor_user,
+            company_name='Test Vendor',
+            address='123 Vendor St'
+        )
+        self.category = Category.objects.create(name='Test Category')
+        self.product = Product.objects.create(
+            vendor=self.vendor,
+            category=self.category,
+            name='Conditional Product',
+            description='Conditional',
+            price=10,
+            stock=5
+        )
+        self.authenticate_as_customer()
+
+    def test_detail_not_modified(self):
+        """Test that a matching If-None-Match gets a 304 from the single query loading the product"""
+        url = reverse('product-detail', kwargs={'pk': self.product.id})
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assert_status(not_modified, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(not_modified.content, b'')
+
+    def test_detail_modified_since(self):
+        """Test If-Modified-Since against the product timestamp"""
+        url = reverse('product-detail', kwargs={'pk': self.product.id})
+        last_modified = self.client.get(url)['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assert_status(response, status.HTTP_304_NOT_MODIFIED)
+
+    def test_related_change_changes_etag(self):
+        """Test that a change to an embedded category produces a new ETag"""
+        url = reverse('product-detail', kwargs={'pk': self.product.id})
+        etag = self.client.get(url)['ETag']
+
+        self.category.name = 'Renamed Category'
+        self.category.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['category']['name'], 'Renamed Category')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_vendor_user_change_changes_etag(self):
+        """Test that a change to the embedded vendor's user produces a new ETag"""
+        url = reverse('product-detail', kwargs={'pk': self.product.id})
+        etag = self.client.get(url)['ETag']
+
+        self.vendor_user.first_name = 'Renamed'
+        self.vendor_user.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['vendor']['user']['first_name'], 'Renamed')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_not_modified(self):
+        """Test list validators, both with and without a cached response"""
+        url = reverse('product-list')
+        etag = self.client.get(url)['ETag']
+
+        # Served from the response cache
+        self.assert_status(self.client.get(url, HTTP_IF_NONE_MATCH=etag), status.HTTP_304_NOT_MODIFIED)
+
+        # Computed by the view
+        cache.clear()
+        self.assert_status(self.client.get(url, HTTP_IF_NONE_MATCH=etag), status.HTTP_304_NOT_MODIFIED)
+
+        Product.objects.create(
+            vendor=self.vendor, category=self.category, name='New Product', description='x', price=1, stock=1
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertNotIn('Last-Modified', response)
+
+
+    def test_list_validators_need_no_query(self):
+        """Test that list ETags are read off the loaded page, with or without preconditions"""
+        url = reverse('product-list')
+        with CaptureQueriesContext(connection) as plain:
+            etag = self.client.get(url)['ETag']
+        cache.clear()
+        with CaptureQueriesContext(connection) as conditional:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assert_status(response, status.HTTP_304_NOT_MODIFIED)
+        for queries in (plain, conditional):
+            self.assertFalse([query for query in queries.captured_queries if 'MAX(' in query['sql'].upper()])
+
+
+class ProductServiceBulkTests(BaseTestCase):
+    """
+    Test cases for the batch operations of ProductService
+    """
+    def setUp(self):
+        super().setUp()
+
+        self.vendor = Vendor.objects.create(
+            user=self.vendor_user,
+            company_name='Test Vendor',
+            address='123 Vendor St'
+        )
+        self.category = Category.objects.create(name='Test Category')
+        self.service = ProductService()
+        self.products = self.service.bulk_create([
+            {
+                'vendor': self.vendor,
+                'category': self.category,
+                'name': f'Product {i}',
+                'slug': f'product-{i}',
+                'description': 'Bulk product',
+                'price': 10 + i,
+                'stock': 5,
+            }
+            for i in range(5)
+        ])
+
+    def test_get_many(self):
+        """Test fetching several products in a single query"""
+        ids = [product.id for product in self.products[:3]]
+
+        with self.assertNumQueries(1):
+            products = self.service.get_many(ids)
+
+        self.assertEqual(set(products.keys()), set(ids))
+        self.assertEqual(self.service.get_many([]), {})
+
+    def test_bulk_update_bumps_updated_at(self):
+        """Test that bulk_update also bumps updated_at"""
+        before = Product.objects.get(pk=self.products[0].id).updated_at
+        for product in self.products:
+            product.price = 1
+
+        self.service.bulk_update(self.products, fields=['price'])
+
+        product = Product.objects.get(pk=self.products[0].id)
+        self.assertEqual(product.price, 1)
+        self.assertGreater(product.updated_at, before)
+
+    def test_bulk_soft_delete(self):
+        """Test soft deleting several products at once"""
+        ids = [product.id for product in self.products[:2]]
+
+        count = self.service.bulk_soft_delete(ids)
+
+        self.assertEqual(count, 2)
+        self.assertEqual(Product.objects.filter(is_active=False).count(), 2)
+
+    def test_update_stock_many(self):
+        """Test updating stock of several products in a single UPDATE"""
+        quantities = {self.products[0].id: -2, self.products[1].id: 3}
+
+        self.service.update_stock_many(quantities)
+
+        self.assertEqual(Product.objects.get(pk=self.products[0].id).stock, 3)
+        self.assertEqual(Product.objects.get(pk=self.products[1].id).stock, 8)
+
+    def test_iterate(self):
+        """Test iterating over products in batches"""
+        batches = list(self.service.iterate(batch_size=2))
+
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(
+            [product.id for batch in batches for product in batch],
+            sorted(product.id for product in self.products)
+        )
+
+
+class ProductBulkAPITests(BaseAPITestCase):
+    """
+    Test cases for the bulk product endpoints
+    """
+    def setUp(self):
+        super().setUp()
+
+        self.vendor = Vendor.objects.create(
+            user=self.vendor_user,
+            company_name='Test Vendor',
+            address='123 Vendor St'
+        )
+        self.category = Category.objects.create(name='Test Category')
+        self.url = reverse('product-bulk')
+
+    def _row(self, i, **kwargs):
+        row = {
+            'category_id': self.category.id,
+            'name': f'Bulk Product {i}',
+            'description': 'Bulk product',
+            'price': '9.99',
+            'stock': 3,
+        }
+        row.update(kwargs)
+        return row
+
+    def test_bulk_create_products(self):
+        """Test creating many products in one request"""
+        self.authenticate_as_vendor()
+
+        rows = [self._row(i) for i in range(20)]
+        # Including the savepoint around the checks and the INSERT
+        with self.assertNumQueries(6):
+            response = self.client.post(self.url, rows, format='json')
+
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 20)
+        self.assertEqual(response.data['failed'], 0)
+        self.assertIsNotNone(response.data['results'][0]['id'])
+        self.assertEqual(Product.objects.filter(vendor=self.vendor).count(), 20)
+        self.assertTrue(Product.objects.filter(slug='bulk-product-0').exists())
+
+    def test_bulk_upsert_updates_existing_by_slug(self):
+        """Test that posting an existing slug replaces the product"""
+        self.authenticate_as_vendor()
+        self.client.post(self.url, [self._row(1)], format='json')
+
+        response = self.client.post(self.url, [self._row(1, price='19.99'), self._row(2)], format='json')
+
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(str(Product.objects.get(slug='bulk-product-1').price), '19.99')
+
+    def test_bulk_create_reports_row_errors(self):
+        """Test that invalid rows are reported without failing the batch"""
+        self.authenticate_as_vendor()
+
+        rows = [
+            self._row(1),
+            self._row(2, price='-1'),
+            self._row(3, category_id=999),
+            self._row(4, slug='bulk-product-1'),
+        ]
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3])
+        self.assertIn('price', response.data['errors'][0]['errors'])
+        self.assertIn('category_id', response.data['errors'][1]['errors'])
+        self.assertIn('slug', response.data['errors'][2]['errors'])
+
+    def test_bulk_create_reports_unusable_generated_slugs(self):
+        """Test that names giving an over-long or empty slug fail only their own row"""
+        self.authenticate_as_vendor()
+
+        rows = [
+            self._row(1),
+            self._row(2, name='x' * 60),
+            self._row(3, name='!!!'),
+            self._row(4, name='y' * 60, slug='short'),
+        ]
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('slug', response.data['errors'][0]['errors'])
+        self.assertTrue(Product.objects.filter(slug='short').exists())
+
+    def test_bulk_create_rejects_other_vendors_slug(self):
+        """Test that a vendor cannot overwrite another vendor's product"""
+        other_user = User.objects.create_user(
+            username='other_vendor', email='other_vendor@example.com',
+            password='password123', role=User.Role.VENDOR
+        )
+        other_vendor = Vendor.objects.create(user=other_user, company_name='Other', address='Other St')
+        Product.objects.create(
+            vendor=other_vendor, category=self.category, name='Bulk Product 1',
+            description='Theirs', price=5, stock=1
+        )
+        self.authenticate_as_vendor()
+
+        response = self.client.post(self.url, [self._row(1)], format='json')
+
+        self.assert_status(response, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Product.objects.get(slug='bulk-product-1').vendor, other_vendor)
+
+    def test_bulk_create_slug_taken_after_check(self):
+        """Test that a slug another vendor inserts after the ownership check is not overwritten"""
+        other_user = User.objects.create_user(
+            username='other_vendor', email='other_vendor@example.com',
+            password='password123', role=User.Role.VENDOR
+        )
+        other_vendor = Vendor.objects.create(user=other_user, company_name='Other', address='Other St')
+        Product.objects.create(
+            vendor=other_vendor, category=self.category, name='Bulk Product 1',
+            description='Theirs', price=5, stock=1
+        )
+        self.authenticate_as_vendor()
+        get_vendor_ids_by_slugs = ProductRepository.get_vendor_ids_by_slugs
+        calls = []
+
+        def check_before_insert(repository, slugs, **kwargs):
+            owners = get_vendor_ids_by_slugs(repository, slugs, **kwargs)
+            calls.append(slugs)
+            # The first check runs before the other vendor's request commits its product
+            return {} if len(calls) == 1 else owners
+
+        with mock.patch.object(ProductRepository, 'get_vendor_ids_by_slugs', check_before_insert):
+            response = self.client.post(self.url, [self._row(1), self._row(2)], format='json')
+
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['index'], 0)
+        self.assertIn('slug', response.data['errors'][0]['errors'])
+        theirs = Product.objects.get(slug='bulk-product-1')
+        self.assertEqual(theirs.vendor, other_vendor)
+        self.assertEqual(theirs.description, 'Theirs')
+        self.assertTrue(Product.objects.filter(slug='bulk-product-2', vendor=self.vendor).exists())
+        self.assertEqual(len(calls), 3)
+
+    def test_bulk_upsert_reactivates_soft_deleted_product(self):
+        """Test that upserting the slug of a soft-deleted product restores it"""
+        self.authenticate_as_vendor()
+        self.client.post(self.url, [self._row(1)], format='json')
+        Product.objects.get(slug='bulk-product-1').soft_delete()
+
+        response = self.client.post(self.url, [self._row(1, price='19.99')], format='json')
+
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 1)
+        product = Product.objects.get(slug='bulk-product-1')
+        self.assertTrue(product.is_active)
+        self.assertEqual(str(product.price), '19.99')
+
+    def test_bulk_partial_update(self):
+        """Test partially updating many products by slug"""
+        self.authenticate_as_vendor()
+        self.client.post(self.url, [self._row(i) for i in range(3)], format='json')
+
+        rows = [
+            {'slug': 'bulk-product-0', 'stock': 50},
+            {'slug': 'bulk-product-1', 'is_available': False},
+            {'slug': 'missing-product', 'stock': 1},
+        ]
+        response = self.client.patch(self.url, rows, format='json')
+
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['errors'][0]['index'], 2)
+        self.assertEqual(Product.objects.get(slug='bulk-product-0').stock, 50)
+        self.assertFalse(Product.objects.get(slug='bulk-product-1').is_available)
+
+    def test_bulk_create_as_customer(self):
+        """Test that customers cannot use the bulk endpoint"""
+        self.authenticate_as_customer()
+
+        response = self.client.post(self.url, [self._row(1)], format='json')
+
+        self.assert_status(response, status.HTTP_403_FORBIDDEN)
+
+
+class ImportProductsCommandTests(BaseTestCase):
+    """
+    Test cases for the import_products management command
+    """
+    def setUp(self):
+        super().setUp()
+
+        self.vendor = Vendor.objects.create(
+            user=self.vendor_user,
+            company_name='Test Vendor',
+            address='123 Vendor St'
+        )
+        self.category = Category.objects.create(name='Test Category')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_import_csv(self):
+        """Test importing a CSV catalog with per-row failures"""
+        path = self._write('catalog.csv', (
+            'name,description,price,stock,category\n'
+            'Widget,A widget,9.99,5,test-category\n'
+            'Gadget,A gadget,-1,5,test-category\n'
+            'Gizmo,A gizmo,4.50,2,missing-category\n'
+            'Doohickey,A doohickey,1.00,,test-category\n'
+        ))
+        stdout, stderr = StringIO(), StringIO()
+
+        call_command('import_products', path, vendor_id=self.vendor.id, batch_size=2, stdout=stdout, stderr=stderr)
+
+        self.assertEqual(
+            sorted(Product.objects.values_list('slug', flat=True)),
+            ['doohickey', 'widget']
+        )
+        self.assertIn('2 created, 0 updated, 2 failed', stdout.getvalue())
+        self.assertIn('line 3:', stderr.getvalue())
+        self.assertIn('line 4:', stderr.getvalue())
+
+    def test_import_ndjson_upserts(self):
+        """Test importing NDJSON twice updates rows instead of duplicating them"""
+        rows = [
+            {'name': 'Widget', 'description': 'A widget', 'price': '9.99', 'stock': 5,
+             'category_id': self.category.id, 'vendor_id': self.vendor.id},
+            {'name': 'Gadget', 'description': 'A gadget', 'price': '19.99', 'stock': 1,
+             'category_id': self.category.id, 'vendor_id': self.vendor.id},
+        ]
+        path = self._write('catalog.ndjson', '\n'.join(json.dumps(row) for row in rows) + '\n')
+
+        call_command('import_products', path, stdout=StringIO(), stderr=StringIO())
+        stdout = StringIO()
+        call_command('import_products', path, stdout=stdout, stderr=StringIO())
+
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertIn('0 created, 2 updated, 0 failed', stdout.getvalue())
+
+    def test_import_ndjson_rejects_non_scalar_category(self):
+        """Test that a list or object category fails its own row instead of the import"""
+        rows = [
+            {'name': 'Widget', 'description': 'A widget', 'price': '9.99', 'stock': 5, 'category': 'test-category'},
+            {'name': 'Gadget', 'description': 'A gadget', 'price': '1.00', 'stock': 1, 'category': ['test-category']},
+            {'name': 'Gizmo', 'description': 'A gizmo', 'price': '1.00', 'stock': 1, 'category': {'slug': 'x'}},
+        ]
+        path = self._write('catalog.ndjson', '\n'.join(json.dumps(row) for row in rows) + '\n')
+        stdout, stderr = StringIO(), StringIO()
+
+        call_command('import_products', path, vendor_id=self.vendor.id, stdout=stdout, stderr=stderr)
+
+        self.assertEqual(list(Product.objects.values_list('slug', flat=True)), ['widget'])
+        self.assertIn('1 created, 0 updated, 2 failed', stdout.getvalue())
+        self.assertIn('Expected a category slug.', stderr.getvalue())
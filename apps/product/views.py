@@ -1,11 +1,13 @@
-from rest_framework import permissions, filters
+from rest_framework import permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .serializers import ProductSerializer, ProductCreateUpdateSerializer, CategorySerializer
+from .serializers import ProductSerializer, ProductCreateUpdateSerializer, ProductBulkItemSerializer, CategorySerializer
 from .permissions import IsVendorOwnerOrReadOnly
-from apps.user.permissions import IsAdmin
+from apps.user.permissions import IsAdmin, IsVendor
 from .services import CategoryService, ProductService
+from apps.core.response_cache import PUBLIC_SCOPE, cache_response
 from apps.core.views import BaseModelViewSet
 
 class CategoryViewSet(BaseModelViewSet):
@@ -24,6 +26,10 @@ class CategoryViewSet(BaseModelViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
 
+    @cache_response('category')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 class ProductViewSet(BaseModelViewSet):
     """
     API endpoint for products
@@ -40,6 +46,9 @@ class ProductViewSet(BaseModelViewSet):
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'price', 'created_at']
     permission_classes = [IsVendorOwnerOrReadOnly]
+    # Products embed their vendor (with its user) and category
+    conditional_fields = ('updated_at', 'vendor__updated_at', 'vendor__user__updated_at', 'category__updated_at')
+    bulk_max_rows = 10000
 
     def get_queryset(self):
         service = self.get_service()
@@ -62,9 +71,25 @@ class ProductViewSet(BaseModelViewSet):
             if not self.request.query_params.get('all'):
                 queryset = service.get_by_vendor_id(user.vendor_profile.id)
 
-        return queryset
+        # Serialized with the vendor (and its user) and the category of every row
+        return queryset.select_related('vendor__user', 'category')
+
+    def get_response_cache_scope(self, request):
+        """
+        Vendors listing without ?all only see their own products
+        """
+        user = request.user
+        if user.is_authenticated and user.is_vendor() and self.action == 'list' and not request.query_params.get('all'):
+            return f'vendor:{user.vendor_profile.id}'
+        return PUBLIC_SCOPE
+
+    # Products embed their category and vendor (with its user)
+    @cache_response('product', 'category', 'vendor', 'user')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @cache_response('product', 'category', 'vendor', 'user')
     def featured(self, request):
         """
         Get featured products
@@ -74,6 +99,61 @@ class ProductViewSet(BaseModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post', 'patch'], permission_classes=[IsVendor])
+    def bulk(self, request):
+        """
+        Create or update many products of the current vendor in one request.
+        POST upserts full rows by slug, PATCH partially updates existing
+        products matched by slug. Each row is validated independently and
+        failures are reported per row index.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({"detail": "Expected a list of products."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.bulk_max_rows:
+            return Response(
+                {"detail": f"At most {self.bulk_max_rows} products can be sent at once."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Validate every row with a single serializer instance
+        partial = request.method == 'PATCH'
+        row_serializer = ProductBulkItemSerializer(partial=partial)
+        valid_rows = {}
+        errors = {}
+        for index, row in enumerate(rows):
+            try:
+                valid_rows[index] = row_serializer.run_validation(row)
+            except ValidationError as exc:
+                errors[index] = exc.detail
+
+        service = self.get_service()
+        vendor_id = request.user.vendor_profile.id
+        if partial:
+            products, row_errors = service.bulk_update_products(vendor_id, valid_rows)
+            created = 0
+        else:
+            products, row_errors, created = service.bulk_upsert_products(vendor_id, valid_rows)
+        errors.update(row_errors)
+
+        response_status = status.HTTP_200_OK
+        if errors and not products:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response({
+            'created': created,
+            'updated': len(products) - created,
+            'failed': len(errors),
+            'results': [
+                {'index': index, 'id': product.id, 'slug': product.slug}
+                for index, product in sorted(products.items())
+            ],
+            'errors': [
+                {'index': index, 'errors': detail}
+                for index, detail in sorted(errors.items())
+            ],
+        }, status=response_status)
+
     def perform_create(self, serializer):
         service = self.get_service()
         validated_data = serializer.validated_data
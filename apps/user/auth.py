@@ -1,13 +1,191 @@
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainSerializer, TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework import status, permissions, exceptions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.throttling import BaseThrottle
 from .serializers import UserSerializer
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
+import logging
+import math
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+# (key, limit, window in milliseconds)
+Limit = Tuple[str, int, int]
+
+RATE_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """
+    Parse a DRF-style rate such as '10/min' into (limit, window in milliseconds)
+    """
+    num, period = rate.split('/')
+    return int(num), RATE_PERIODS[period[0]] * 1000
+
+
+class InMemorySlidingWindowLimiter:
+    """
+    Per-process sliding window log limiter.
+    Each key keeps the timestamps of its last ``limit`` accepted hits, so a
+    hit is allowed when fewer than ``limit`` of them fall inside the window.
+    A single lock makes check-and-record atomic across threads.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._hits: Dict[str, Deque[int]] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, limits: List[Limit]) -> float:
+        """
+        Record a hit on every key if all of them are under their limit.
+        Returns 0 when allowed, otherwise the seconds until a slot frees up.
+        """
+        now = time.monotonic_ns() // 1_000_000
+        with self._lock:
+            wait = 0
+            for key, limit, window in limits:
+                hits = self._hits.get(key)
+                if hits is not None and len(hits) >= limit and hits[0] > now - window:
+                    wait = max(wait, hits[0] + window - now)
+            if wait:
+                return wait / 1000
+
+            if len(self._hits) >= self.max_keys:
+                self._prune(now)
+            for key, limit, window in limits:
+                hits = self._hits.get(key)
+                if hits is None or hits.maxlen != limit:
+                    hits = self._hits[key] = deque(hits or (), maxlen=limit)
+                hits.append(now)
+            return 0
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hits.clear()
+
+    def _prune(self, now: int) -> None:
+        # Drop keys whose newest hit is older than the longest window we use
+        longest = max((parse_rate(rate)[1] for rate in get_login_rate_limits().values()), default=0)
+        for key in [key for key, hits in self._hits.items() if not hits or hits[-1] <= now - longest]:
+            del self._hits[key]
+        # Still full: evict the oldest keys
+        while len(self._hits) >= self.max_keys:
+            del self._hits[next(iter(self._hits))]
+
+
+class RedisSlidingWindowLimiter:
+    """
+    Sliding window log limiter shared by all workers through Redis.
+    Every key is a sorted set of hit timestamps; a Lua script trims,
+    counts and records all keys atomically in one round-trip. If Redis is
+    unreachable, the per-process limiter is used instead.
+    """
+
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local wait = 0
+    for i, key in ipairs(KEYS) do
+        local limit = tonumber(ARGV[i * 2])
+        local window = tonumber(ARGV[i * 2 + 1])
+        redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+        if redis.call('ZCARD', key) >= limit then
+            local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+            wait = math.max(wait, tonumber(oldest[2]) + window - now)
+        end
+    end
+    if wait > 0 then
+        return wait
+    end
+    local member = ARGV[#ARGV]
+    for i, key in ipairs(KEYS) do
+        redis.call('ZADD', key, now, member)
+        redis.call('PEXPIRE', key, tonumber(ARGV[i * 2 + 1]))
+    end
+    return 0
+    """
+
+    def __init__(self, client, fallback: Optional[InMemorySlidingWindowLimiter] = None):
+        self.client = client
+        self.script = client.register_script(self.SCRIPT)
+        self.fallback = fallback or InMemorySlidingWindowLimiter()
+
+    def hit(self, limits: List[Limit]) -> float:
+        from redis.exceptions import RedisError
+
+        args = [time.time_ns() // 1_000_000]
+        for _, limit, window in limits:
+            args.extend([limit, window])
+        args.append(uuid.uuid4().hex)
+        try:
+            return int(self.script(keys=[key for key, _, _ in limits], args=args)) / 1000
+        except RedisError:
+            logger.warning('Login rate limiter cannot reach Redis; using the in-process limiter')
+            return self.fallback.hit(limits)
+
+    def reset(self, key: str) -> None:
+        from redis.exceptions import RedisError
+
+        try:
+            self.client.delete(key)
+        except RedisError:
+            self.fallback.reset(key)
+
+
+def get_login_rate_limits() -> Dict[str, str]:
+    return getattr(settings, 'LOGIN_RATE_LIMITS', None) or {}
+
+
+@lru_cache(maxsize=None)
+def get_login_rate_limiter():
+    """
+    Redis-backed limiter when the default cache is Redis, otherwise the in-process one
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if 'django_redis' in backend:
+        from django_redis import get_redis_connection
+        return RedisSlidingWindowLimiter(get_redis_connection('default'))
+    client = getattr(caches['default'], 'get_client', None)
+    if client is not None and hasattr(client(), 'register_script'):
+        return RedisSlidingWindowLimiter(client())
+    return InMemorySlidingWindowLimiter()
+
+
+@receiver(setting_changed)
+def reset_login_rate_limiter(setting, **kwargs):
+    if setting in ('CACHES', 'LOGIN_RATE_LIMITS'):
+        get_login_rate_limiter.cache_clear()
+
+
+def login_rate_limit_keys(request, username: str) -> Dict[str, str]:
+    """
+    Limiter keys for the client IP (REMOTE_ADDR, or the proxy-appended address with NUM_PROXIES) and the username
+    """
+    return {
+        'ip': f'login_rl:ip:{BaseThrottle().get_ident(request)}',
+        'username': f'login_rl:username:{username.lower()}',
+    }
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     Custom token serializer to include user role and other info
@@ -24,17 +202,39 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return token
 
     def validate(self, attrs):
-        # Check if user exists
-        user = User.objects.filter(username=attrs['username']).first()
+        # Reject over-limit clients before any password hashing happens
+        request = self.context.get('request')
+        rates = get_login_rate_limits()
+        keys = login_rate_limit_keys(request, attrs.get(self.username_field, '')) if request and rates else {}
+        limits = [(keys[scope], *parse_rate(rate)) for scope, rate in rates.items() if rate and scope in keys]
+        if limits:
+            wait = get_login_rate_limiter().hit(limits)
+            if wait:
+                raise exceptions.Throttled(wait=math.ceil(wait), detail='Too many login attempts.')
+
+        # Authenticate first: the backend loads the user with a single query and
+        # checks the password (re-hashing it if the work factor changed). The
+        # verification check then reuses that instance instead of querying again,
+        # and only reveals the verification status to callers with the password.
+        data = TokenObtainSerializer.validate(self, attrs)
 
         # Check if email is verified
-        if user and not user.is_email_verified:
+        if not self.user.is_email_verified:
             raise exceptions.AuthenticationFailed(
                 'Email not verified. Please check your email for verification instructions.',
                 code='email_not_verified'
             )
 
-        data = super().validate(attrs)
+        refresh = self.get_token(self.user)
+        data['refresh'] = str(refresh)
+        data['access'] = str(refresh.access_token)
+
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
+
+        # A successful login clears the account's failures, but not the IP's
+        if 'username' in keys:
+            get_login_rate_limiter().reset(keys['username'])
 
         # Add extra responses
         data['user_id'] = self.user.id
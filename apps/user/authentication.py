@@ -0,0 +1,112 @@
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from apps.vendor.models import Vendor
+
+User = get_user_model()
+
+# Never cached; loaded lazily on first access (e.g. check_password)
+UNCACHED_FIELDS = {'password'}
+
+
+def user_cache_key(user_id: Any) -> str:
+    """
+    Cache key for the authentication snapshot of a user
+    """
+    return f'user_auth_{user_id}'
+
+
+def invalidate_user_cache(user_id: Any) -> None:
+    """
+    Drop the cached authentication snapshot of a user
+    """
+    cache.delete(user_cache_key(user_id))
+
+
+def _cached_field_names():
+    return [field.attname for field in User._meta.concrete_fields if field.attname not in UNCACHED_FIELDS]
+
+
+def build_user_snapshot(user_id: Any) -> Optional[Dict[str, Any]]:
+    """
+    Load a user and their vendor ID with a single query.
+    Only a hash of the password is kept, for CHECK_REVOKE_TOKEN.
+    """
+    field_names = _cached_field_names()
+    row = (
+        User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+        .values_list(*field_names, 'password', 'vendor_profile__id')
+        .first()
+    )
+    if row is None:
+        return None
+    return {
+        'fields': dict(zip(field_names, row[:-2])),
+        'password_hash': get_md5_hash_password(row[-2]),
+        'vendor_id': row[-1],
+    }
+
+
+def user_from_snapshot(snapshot: Dict[str, Any]):
+    """
+    Rebuild a User instance from a cached snapshot.
+    Uncached fields are deferred, and vendor_profile is pre-populated so
+    ``user.vendor_profile.id`` does not hit the database.
+    """
+    fields = snapshot['fields']
+    db = router.db_for_read(User)
+    user = User.from_db(db, list(fields), list(fields.values()))
+
+    vendor = None
+    if snapshot['vendor_id'] is not None:
+        vendor = Vendor.from_db(db, ['id', 'user_id'], [snapshot['vendor_id'], user.pk])
+        vendor._state.fields_cache['user'] = user
+    # Caching None makes user.vendor_profile raise DoesNotExist without a query
+    User.vendor_profile.related.set_cached_value(user, vendor)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the user from a short-lived cache
+    instead of querying the User (and Vendor) row on every request.
+
+    The snapshot holds every user column except the password plus the
+    vendor ID, and is dropped by the user app's signals whenever the user
+    or their vendor profile is saved or deleted, so role changes,
+    deactivation and password changes take effect on the next request.
+    AUTH_USER_CACHE_TIMEOUT bounds staleness for writes that bypass signals.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        key = user_cache_key(user_id)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = build_user_snapshot(user_id)
+            if snapshot is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            cache.set(key, snapshot, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300))
+
+        user = user_from_snapshot(snapshot)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != snapshot['password_hash']:
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 hasher whose work factor comes from settings.PASSWORD_HASH_ITERATIONS
+    (Django's default when unset).
+
+    It keeps the ``pbkdf2_sha256`` algorithm name, so existing hashes keep
+    verifying with the iteration count stored in them. Django's
+    check_password() asks the preferred hasher whether a hash must be
+    updated, so a hash with a different count is transparently re-encoded
+    with the configured one on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-19 08:01
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_user_email_verification_token_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='email_verification_token',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='email_verification_token_created_at',
+        ),
+    ]
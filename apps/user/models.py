@@ -1,10 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
-from django.utils import timezone
-import random
-import string
-from datetime import datetime, timedelta
+from .otp import issue_otp, verify_otp
 
 class User(AbstractUser):
     """
@@ -27,10 +24,11 @@ class User(AbstractUser):
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
 
-    # Email verification fields
+    # Email verification; OTPs live in the cache (see apps.user.otp)
     is_email_verified = models.BooleanField(default=False)
-    email_verification_token = models.CharField(max_length=100, blank=True, null=True)
-    email_verification_token_created_at = models.DateTimeField(blank=True, null=True)
+
+    # Part of the ETags of the resources that embed the user
+    updated_at = models.DateTimeField(auto_now=True)
 
     def is_admin(self):
         return self.role == self.Role.ADMIN
@@ -43,29 +41,14 @@ class User(AbstractUser):
 
     def generate_email_verification_token(self):
         """Generate a 6-digit OTP for email verification"""
-        otp = ''.join(random.choices(string.digits, k=6))
-        self.email_verification_token = otp
-        self.email_verification_token_created_at = timezone.now()
-        self.save(update_fields=['email_verification_token', 'email_verification_token_created_at'])
-        return otp
+        return issue_otp(self.pk)
 
     def verify_email(self, token):
         """Verify the email with the provided token"""
-        # Check if token is valid
-        if not self.email_verification_token or self.email_verification_token != token:
-            return False
-
-        # Check if token is expired (10 minutes)
-        if not self.email_verification_token_created_at:
-            return False
-
-        expiration_time = self.email_verification_token_created_at + timedelta(minutes=10)
-        if timezone.now() > expiration_time:
+        if not verify_otp(self.pk, token):
             return False
 
-        # Mark email as verified
+        # Mark email as verified; the only write in the OTP flow
         self.is_email_verified = True
-        self.email_verification_token = None
-        self.email_verification_token_created_at = None
-        self.save(update_fields=['is_email_verified', 'email_verification_token', 'email_verification_token_created_at'])
+        self.save(update_fields=['is_email_verified', 'updated_at'])
         return True
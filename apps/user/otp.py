@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare, salted_hmac
+import secrets
+
+KEY_SALT = 'apps.user.otp'
+
+
+def _code_key(user_id):
+    return f'otp_code_{user_id}'
+
+
+def _attempts_key(user_id):
+    return f'otp_attempts_{user_id}'
+
+
+def _digest(user_id, otp):
+    # Only an HMAC of the code is cached, so a cache dump does not reveal live codes
+    return salted_hmac(KEY_SALT, f'{user_id}:{otp}').hexdigest()
+
+
+def issue_otp(user_id):
+    """
+    Generate a 6-digit OTP for a user and store its digest in the cache.
+    A new code replaces the previous one and resets the attempt counter.
+    """
+    otp = f'{secrets.randbelow(10 ** 6):06d}'
+    timeout = getattr(settings, 'OTP_EXPIRY_SECONDS', 600)
+    cache.set_many({_code_key(user_id): _digest(user_id, otp), _attempts_key(user_id): 0}, timeout)
+    return otp
+
+
+def verify_otp(user_id, otp):
+    """
+    Check an OTP against the cached digest.
+    Every check counts as an attempt; after OTP_MAX_ATTEMPTS the code is
+    discarded so it cannot be brute-forced. A valid code is consumed.
+    """
+    try:
+        attempts = cache.incr(_attempts_key(user_id))
+    except ValueError:
+        # No code issued, or it expired
+        return False
+
+    if attempts > getattr(settings, 'OTP_MAX_ATTEMPTS', 5):
+        cache.delete_many([_code_key(user_id), _attempts_key(user_id)])
+        return False
+
+    digest = cache.get(_code_key(user_id))
+    if digest is None or not constant_time_compare(digest, _digest(user_id, otp)):
+        return False
+
+    cache.delete_many([_code_key(user_id), _attempts_key(user_id)])
+    return True
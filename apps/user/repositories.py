@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from apps.core.repositories import BaseRepository
 from typing import Optional, List, Dict, Any, Union
 from django.db.models import Q, QuerySet
+from .otp import issue_otp
 
 User = get_user_model()
 
@@ -101,9 +102,7 @@ class UserRepository(BaseRepository):
     
     def generate_email_verification_token(self, user_id: int) -> Optional[str]:
         """
-        Generate an email verification token for a user
+        Generate an email verification token for a user.
+        The code is kept in the cache, so the user row is not read or written.
         """
-        user = self.get_by_id(user_id)
-        if user:
-            return user.generate_email_verification_token()
-        return None
+        return issue_otp(user_id)
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
-from .utils import send_otp_email
+from .tasks import claim_otp_email, queue_otp_email
 
 User = get_user_model()
 
@@ -39,9 +39,9 @@ class UserSerializer(serializers.ModelSerializer):
         # Create the user
         user = User.objects.create_user(**validated_data)
 
-        # Generate OTP and send verification email
-        otp = user.generate_email_verification_token()
-        send_otp_email(user, otp)
+        # Queue the verification email; the task issues the OTP
+        claim_otp_email(user.id)
+        queue_otp_email(user.id)
 
         return user
 
@@ -73,7 +73,6 @@ class EmailVerificationSerializer(serializers.Serializer):
 
     def validate(self, attrs):
         email = attrs.get('email')
-        otp = attrs.get('otp')
 
         try:
             user = User.objects.get(email=email)
@@ -83,9 +82,7 @@ class EmailVerificationSerializer(serializers.Serializer):
         if user.is_email_verified:
             raise serializers.ValidationError({"email": "Email is already verified."})
 
-        if not user.verify_email(otp):
-            raise serializers.ValidationError({"otp": "Invalid or expired OTP."})
-
+        attrs['user'] = user
         return attrs
 
 class ResendOTPSerializer(serializers.Serializer):
@@ -3,7 +3,7 @@ from .repositories import UserRepository
 from django.contrib.auth import get_user_model
 from typing import Optional, List, Dict, Any, Union
 from django.db.models import QuerySet
-from .utils import send_otp_email
+from .tasks import claim_otp_email, queue_otp_email
 
 User = get_user_model()
 
@@ -65,9 +65,9 @@ class UserService(BaseService):
         # Create the user
         user = self.repository.create_user(**kwargs)
         
-        # Generate OTP and send verification email
-        otp = self.repository.generate_email_verification_token(user.id)
-        send_otp_email(user, otp)
+        # Queue the verification email; the task issues the OTP
+        claim_otp_email(user.id)
+        queue_otp_email(user.id)
         
         return user
     
@@ -91,12 +91,14 @@ class UserService(BaseService):
     
     def resend_verification_email(self, user_id: int) -> bool:
         """
-        Resend verification email
+        Resend verification email.
+        Clicks within OTP_RESEND_COOLDOWN of the last email succeed without
+        issuing a new code or sending another email.
         """
         user = self.get_by_id(user_id)
         if user and not user.is_email_verified:
-            otp = self.repository.generate_email_verification_token(user_id)
-            send_otp_email(user, otp)
+            if claim_otp_email(user_id):
+                queue_otp_email(user_id)
             return True
         return False
     
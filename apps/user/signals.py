@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.core.signals import bulk_changed, register_model_signals
+from apps.vendor.models import Vendor
+from .authentication import invalidate_user_cache, user_cache_key
+from django.core.cache import cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Users are embedded in vendor and product payloads, so they carry cache tags like BaseModel subclasses
+register_model_signals(User)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Drop the cached authentication snapshot when a user changes
+    (role, deactivation, password or any other field)
+    """
+    invalidate_user_cache(instance.pk)
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+def vendor_profile_changed(sender, instance, **kwargs):
+    """
+    Drop the cached authentication snapshot when a vendor profile is created or removed
+    """
+    invalidate_user_cache(instance.user_id)
+
+
+@receiver(bulk_changed, sender=User)
+def users_bulk_changed(sender, pks=None, **kwargs):
+    """
+    Drop the cached authentication snapshots of users touched by a bulk operation
+    """
+    cache.delete_many([user_cache_key(pk) for pk in pks or []])
+    logger.debug(f"Authentication cache invalidated for {len(pks or [])} users")
@@ -0,0 +1,86 @@
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from smtplib import SMTPException, SMTPServerDisconnected
+from .otp import issue_otp
+from .utils import send_otp_email, close_email_connection
+import logging
+
+logger = logging.getLogger('apps')
+
+
+def get_otp_recipient(user_id):
+    """
+    The email and username of a user still waiting for verification, or None
+    """
+    return get_user_model().objects.filter(pk=user_id, is_email_verified=False).values_list(
+        'email', 'username'
+    ).first()
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(SMTPException, OSError),
+    retry_backoff=True,
+    retry_backoff_max=300,
+    retry_jitter=True,
+    max_retries=5,
+    ignore_result=True,
+)
+def send_otp_email_task(self, user_id):
+    """
+    Issue an OTP for a user and email it over the worker's pooled SMTP
+    connection. Only the user ID travels through the broker, so the code
+    never sits in task arguments; a retry issues a new code, replacing the
+    one whose email failed. Transient SMTP and network errors are retried
+    with exponential backoff.
+    """
+    recipient = get_otp_recipient(user_id)
+    if recipient is None:
+        return
+    email, username = recipient
+    otp = issue_otp(user_id)
+    try:
+        send_otp_email(email, username, otp)
+    except (SMTPException, OSError) as exc:
+        # Drop the pooled connection so the retry reconnects
+        close_email_connection()
+        if isinstance(exc, SMTPServerDisconnected) and self.request.retries == 0:
+            # Idle connection closed by the server: reconnect once without waiting
+            send_otp_email(email, username, otp)
+            return
+        logger.warning(f"Sending OTP email to user {user_id} failed (attempt {self.request.retries + 1}): {exc}")
+        raise
+
+
+def claim_otp_email(user_id):
+    """
+    Return True if no OTP email was queued for this user within
+    OTP_RESEND_COOLDOWN seconds, and start a new cooldown. Repeated
+    resend clicks therefore produce one email (and one code).
+    """
+    return cache.add(f'otp_email_{user_id}', True, getattr(settings, 'OTP_RESEND_COOLDOWN', 60))
+
+
+def queue_otp_email(user_id):
+    """
+    Queue an OTP email once the current transaction commits, so the API
+    response never waits for SMTP. The task issues the code itself.
+    """
+    def enqueue():
+        try:
+            send_otp_email_task.delay(user_id)
+        except Exception:
+            # Broker unavailable: deliver in-process rather than lose the OTP
+            logger.exception(f"Could not queue OTP email for user {user_id}; sending synchronously")
+            recipient = get_otp_recipient(user_id)
+            if recipient is None:
+                return
+            try:
+                send_otp_email(*recipient, issue_otp(user_id))
+            except Exception:
+                logger.exception(f"Sending OTP email to user {user_id} failed")
+
+    transaction.on_commit(enqueue)
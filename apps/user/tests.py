@@ -1,8 +1,21 @@
+import threading
+from smtplib import SMTPException
+from unittest import mock
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from apps.core.tests import BaseAPITestCase
+from apps.vendor.models import Vendor
+from .auth import InMemorySlidingWindowLimiter, get_login_rate_limiter
+from .authentication import CachedJWTAuthentication, user_cache_key
+from .otp import verify_otp
+from .tasks import send_otp_email_task
+from .utils import close_email_connection, get_email_connection
 
 User = get_user_model()
 
@@ -313,6 +326,46 @@ class AuthAPITests(BaseAPITestCase):
         response = self.client.post(url, data, format='json')
         self.assert_status(response, status.HTTP_401_UNAUTHORIZED)
 
+    def test_login_uses_single_query(self):
+        """Test that login loads the user once for verification and password checks"""
+        url = reverse('token_obtain_pair')
+        data = {'username': 'customer', 'password': 'password123'}
+
+        with self.assertNumQueries(1):
+            response = self.client.post(url, data, format='json')
+        self.assert_status(response, status.HTTP_200_OK)
+
+    def test_login_unverified_email(self):
+        """Test that unverified users are told so only when the password is correct"""
+        self.customer_user.is_email_verified = False
+        self.customer_user.save()
+        url = reverse('token_obtain_pair')
+
+        response = self.client.post(url, {'username': 'customer', 'password': 'password123'}, format='json')
+        self.assert_status(response, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('Email not verified', str(response.data))
+        self.assertNotIn('access', response.data)
+
+        response = self.client.post(url, {'username': 'customer', 'password': 'wrongpassword'}, format='json')
+        self.assert_status(response, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn('Email not verified', str(response.data))
+
+    def test_login_rehashes_password_with_configured_work_factor(self):
+        """Test that changing PASSWORD_HASH_ITERATIONS re-hashes the password on login"""
+        url = reverse('token_obtain_pair')
+        data = {'username': 'customer', 'password': 'password123'}
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            response = self.client.post(url, data, format='json')
+        self.assert_status(response, status.HTTP_200_OK)
+
+        self.customer_user.refresh_from_db()
+        self.assertTrue(self.customer_user.password.startswith('pbkdf2_sha256$1000$'))
+
+        # Old and new hashes both keep working
+        response = self.client.post(url, data, format='json')
+        self.assert_status(response, status.HTTP_200_OK)
+
     def test_token_refresh(self):
         """Test refreshing token"""
         # First login to get refresh token
@@ -386,3 +439,326 @@ class AuthAPITests(BaseAPITestCase):
         # This might return 200 or 400 depending on implementation
         # We're just testing that the endpoint exists and responds
         self.assertIn(response.status_code, [status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST])
+
+
+class OTPEmailTests(BaseAPITestCase):
+    """
+    Test cases for asynchronous OTP email delivery
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_register_queues_email_after_commit(self):
+        """Test that registration queues the OTP email instead of sending it inline"""
+        data = {
+            'username': 'newuser',
+            'email': 'newuser@example.com',
+            'password': 'newuserpassword',
+            'password2': 'newuserpassword',
+            'first_name': 'New',
+            'last_name': 'User',
+        }
+
+        with mock.patch('apps.user.tasks.send_otp_email_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('register'), data, format='json')
+                delay.assert_not_called()
+
+        self.assert_status(response, status.HTTP_201_CREATED)
+        # Only the user ID goes through the broker, never the code
+        delay.assert_called_once_with(User.objects.get(username='newuser').id)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_resend_is_deduplicated(self):
+        """Test that repeated resend clicks queue a single email"""
+        self.customer_user.is_email_verified = False
+        self.customer_user.save()
+        url = reverse('resend_otp')
+
+        with mock.patch('apps.user.tasks.send_otp_email_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(3):
+                    response = self.client.post(url, {'email': 'customer@example.com'}, format='json')
+                    self.assert_status(response, status.HTTP_200_OK)
+
+        delay.assert_called_once()
+
+    def test_task_issues_code_and_sends_html_and_text(self):
+        """Test that the task issues the code, renders both bodies and sends the email"""
+        self.customer_user.is_email_verified = False
+        self.customer_user.save()
+        with mock.patch('apps.user.tasks.issue_otp', return_value='123456') as issue:
+            send_otp_email_task.apply(args=(self.customer_user.id,))
+
+        issue.assert_called_once_with(self.customer_user.id)
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['customer@example.com'])
+        self.assertIn('123456', message.body)
+        self.assertNotIn('<', message.body)
+        self.assertIn('123456', message.alternatives[0][0])
+
+    def test_task_sends_a_code_that_verifies(self):
+        """Test that the emailed code is the one stored for the user"""
+        self.customer_user.is_email_verified = False
+        self.customer_user.save()
+        with mock.patch('apps.user.tasks.send_otp_email') as send:
+            send_otp_email_task.apply(args=(self.customer_user.id,))
+
+        email, username, otp = send.call_args.args
+        self.assertEqual((email, username), ('customer@example.com', 'customer'))
+        self.assertTrue(verify_otp(self.customer_user.id, otp))
+
+    def test_task_skips_verified_users(self):
+        """Test that no code is issued or sent once the email is verified"""
+        send_otp_email_task.apply(args=(self.customer_user.id,))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_task_retries_smtp_errors(self):
+        """Test that SMTP failures are retried and then reported"""
+        self.customer_user.is_email_verified = False
+        self.customer_user.save()
+        with mock.patch('apps.user.tasks.send_otp_email', side_effect=SMTPException('down')) as send:
+            result = send_otp_email_task.apply(args=(self.customer_user.id,))
+
+        self.assertTrue(result.failed())
+        self.assertEqual(send.call_count, send_otp_email_task.max_retries + 1)
+
+    def test_email_connection_is_reused(self):
+        """Test that the SMTP connection is pooled per thread"""
+        close_email_connection()
+        self.assertIs(get_email_connection(), get_email_connection())
+        close_email_connection()
+
+
+class OTPVerificationTests(BaseAPITestCase):
+    """
+    Test cases for cache-backed OTP verification
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.customer_user.is_email_verified = False
+        self.customer_user.save()
+        self.url = reverse('verify_email')
+
+    def verify(self, otp):
+        return self.client.post(self.url, {'email': 'customer@example.com', 'otp': otp}, format='json')
+
+    def test_issuing_otp_does_not_touch_the_database(self):
+        """Test that generating an OTP needs no database write"""
+        with self.assertNumQueries(0):
+            otp = self.customer_user.generate_email_verification_token()
+        self.assertRegex(otp, r'^\d{6}$')
+
+    def test_verify_email_with_valid_otp(self):
+        """Test that a valid OTP verifies the email with a single write"""
+        otp = self.customer_user.generate_email_verification_token()
+
+        # Look up the user by email, then write is_email_verified
+        with self.assertNumQueries(2):
+            response = self.verify(otp)
+        self.assert_status(response, status.HTTP_200_OK)
+
+        self.customer_user.refresh_from_db()
+        self.assertTrue(self.customer_user.is_email_verified)
+
+    def test_verify_email_with_invalid_otp(self):
+        """Test that a wrong OTP is rejected"""
+        otp = self.customer_user.generate_email_verification_token()
+        wrong = '000000' if otp != '000000' else '111111'
+
+        response = self.verify(wrong)
+        self.assert_status(response, status.HTTP_400_BAD_REQUEST)
+        self.customer_user.refresh_from_db()
+        self.assertFalse(self.customer_user.is_email_verified)
+
+    @override_settings(OTP_MAX_ATTEMPTS=3)
+    def test_otp_is_discarded_after_max_attempts(self):
+        """Test that brute-forcing stops once the attempts are used up"""
+        otp = self.customer_user.generate_email_verification_token()
+        wrong = '000000' if otp != '000000' else '111111'
+
+        for _ in range(3):
+            self.assertFalse(verify_otp(self.customer_user.id, wrong))
+        self.assertFalse(verify_otp(self.customer_user.id, otp))
+
+    def test_otp_is_single_use_and_replaced_on_reissue(self):
+        """Test that a code works once and a new code invalidates the old one"""
+        first = self.customer_user.generate_email_verification_token()
+        second = self.customer_user.generate_email_verification_token()
+        if first != second:
+            self.assertFalse(verify_otp(self.customer_user.id, first))
+        self.assertTrue(verify_otp(self.customer_user.id, second))
+        self.assertFalse(verify_otp(self.customer_user.id, second))
+
+
+class LoginRateLimitTests(BaseAPITestCase):
+    """
+    Test cases for login rate limiting
+    """
+
+    def setUp(self):
+        super().setUp()
+        get_login_rate_limiter.cache_clear()
+        self.url = reverse('token_obtain_pair')
+
+    def login(self, username='customer', password='wrongpassword'):
+        return self.client.post(self.url, {'username': username, 'password': password}, format='json')
+
+    @override_settings(LOGIN_RATE_LIMITS={'username': '2/min'})
+    def test_username_limit_rejects_before_authenticating(self):
+        """Test that over-limit attempts are rejected without touching the database"""
+        self.assert_status(self.login(), status.HTTP_401_UNAUTHORIZED)
+        self.assert_status(self.login(), status.HTTP_401_UNAUTHORIZED)
+
+        with self.assertNumQueries(0):
+            response = self.login(password='password123')
+        self.assert_status(response, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+        # Other accounts are unaffected
+        self.assert_status(self.login('vendor', 'password123'), status.HTTP_200_OK)
+
+    @override_settings(LOGIN_RATE_LIMITS={'username': '2/min'})
+    def test_successful_login_resets_username_limit(self):
+        """Test that a successful login clears the account's window"""
+        self.assert_status(self.login(), status.HTTP_401_UNAUTHORIZED)
+        self.assert_status(self.login(password='password123'), status.HTTP_200_OK)
+        self.assert_status(self.login(), status.HTTP_401_UNAUTHORIZED)
+        self.assert_status(self.login(), status.HTTP_401_UNAUTHORIZED)
+        self.assert_status(self.login(), status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(LOGIN_RATE_LIMITS={'ip': '2/min', 'username': '10/min'})
+    def test_ip_limit_spans_usernames(self):
+        """Test that credential stuffing across accounts from one IP is limited"""
+        self.assert_status(self.login('customer'), status.HTTP_401_UNAUTHORIZED)
+        self.assert_status(self.login('vendor'), status.HTTP_401_UNAUTHORIZED)
+        self.assert_status(self.login('admin', 'password123'), status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(LOGIN_RATE_LIMITS={'ip': '2/min', 'username': '10/min'})
+    def test_ip_limit_ignores_spoofed_forwarded_for(self):
+        """Test that rotating X-Forwarded-For from one address does not evade the IP limit"""
+        for attempt, expected in enumerate([status.HTTP_401_UNAUTHORIZED] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS]):
+            response = self.client.post(self.url, {'username': 'customer', 'password': 'wrongpassword'},
+                                        format='json', HTTP_X_FORWARDED_FOR=f'203.0.113.{attempt}')
+            self.assert_status(response, expected)
+
+    @override_settings(LOGIN_RATE_LIMITS={'ip': '2/min', 'username': '10/min'})
+    def test_ip_limit_behind_proxy_uses_appended_address(self):
+        """Test that behind one proxy only the address it appended is used"""
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            for attempt, expected in enumerate([status.HTTP_401_UNAUTHORIZED] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS]):
+                response = self.client.post(self.url, {'username': 'customer', 'password': 'wrongpassword'},
+                                            format='json', HTTP_X_FORWARDED_FOR=f'203.0.113.{attempt}, 198.51.100.7')
+                self.assert_status(response, expected)
+            # Another client behind the same proxy has its own window
+            response = self.client.post(self.url, {'username': 'customer', 'password': 'wrongpassword'},
+                                        format='json', HTTP_X_FORWARDED_FOR='198.51.100.8')
+            self.assert_status(response, status.HTTP_401_UNAUTHORIZED)
+
+    def test_in_memory_limiter_is_thread_safe(self):
+        """Test that concurrent hits never exceed the limit"""
+        limiter = InMemorySlidingWindowLimiter()
+        allowed = []
+
+        def hit():
+            for _ in range(50):
+                if not limiter.hit([('key', 100, 60000)]):
+                    allowed.append(1)
+
+        threads = [threading.Thread(target=hit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(allowed), 100)
+
+    def test_in_memory_limiter_window_slides(self):
+        """Test that hits expire once they leave the window"""
+        limiter = InMemorySlidingWindowLimiter()
+        with mock.patch('apps.user.auth.time.monotonic_ns', return_value=0):
+            self.assertEqual(limiter.hit([('key', 1, 1000)]), 0)
+        with mock.patch('apps.user.auth.time.monotonic_ns', return_value=400_000_000):
+            self.assertAlmostEqual(limiter.hit([('key', 1, 1000)]), 0.6)
+        with mock.patch('apps.user.auth.time.monotonic_ns', return_value=1_000_000_000):
+            self.assertEqual(limiter.hit([('key', 1, 1000)]), 0)
+
+
+class CachedJWTAuthenticationTests(BaseAPITestCase):
+    """
+    Test cases for cache-backed JWT user resolution
+    """
+
+    def get_user(self, user):
+        token = RefreshToken.for_user(user).access_token
+        return CachedJWTAuthentication().get_user(token)
+
+    def test_user_is_cached(self):
+        """Test that only the first request loads the user from the database"""
+        url = reverse('user-me')
+        self.authenticate_as_customer()
+
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assert_status(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['username'], 'customer')
+
+    def test_vendor_profile_is_cached(self):
+        """Test that the vendor profile ID is resolved without a query"""
+        vendor = Vendor.objects.create(user=self.vendor_user, company_name='Vendor Co', address='1 Main St')
+        self.get_user(self.vendor_user)
+
+        with self.assertNumQueries(0):
+            user = self.get_user(self.vendor_user)
+            self.assertEqual(user.vendor_profile.id, vendor.id)
+            self.assertTrue(user.is_vendor())
+
+        customer = self.get_user(self.customer_user)
+        with self.assertNumQueries(0):
+            self.assertFalse(hasattr(customer, 'vendor_profile'))
+
+    def test_password_is_loaded_lazily(self):
+        """Test that the password is not cached but still available"""
+        user = self.get_user(self.customer_user)
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('password123'))
+
+    def test_role_change_invalidates_cache(self):
+        """Test that a role change applies to the next request"""
+        url = reverse('user-list')
+        self.authenticate_as_customer()
+        self.assert_status(self.client.get(url), status.HTTP_403_FORBIDDEN)
+
+        self.customer_user.role = User.Role.ADMIN
+        self.customer_user.save()
+        self.assert_status(self.client.get(url), status.HTTP_200_OK)
+
+    def test_deactivation_invalidates_cache(self):
+        """Test that a deactivated user is rejected on the next request"""
+        url = reverse('user-me')
+        self.authenticate_as_customer()
+        self.assert_status(self.client.get(url), status.HTTP_200_OK)
+
+        self.customer_user.is_active = False
+        self.customer_user.save()
+        self.assert_status(self.client.get(url), status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_cache(self):
+        """Test that a password change drops the cached snapshot"""
+        self.get_user(self.customer_user)
+        key = user_cache_key(self.customer_user.id)
+        old_hash = cache.get(key)['password_hash']
+
+        self.customer_user.set_password('newpassword123')
+        self.customer_user.save()
+        self.assertIsNone(cache.get(key))
+
+        user = self.get_user(self.customer_user)
+        self.assertNotEqual(cache.get(key)['password_hash'], old_hash)
+        self.assertTrue(user.check_password('newpassword123'))
@@ -1,25 +1,64 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.template.loader import get_template
+from functools import lru_cache
+import threading
 
-def send_otp_email(user, otp):
+_local = threading.local()
+
+
+@lru_cache(maxsize=None)
+def get_email_templates(name):
+    """
+    Load and compile the HTML and plain text versions of an email template once per process
+    """
+    return get_template(f'{name}.html'), get_template(f'{name}.txt')
+
+
+def get_email_connection():
+    """
+    Return this thread's email connection, opening it on first use.
+    The connection stays open between messages, so a worker does not
+    reconnect (and redo the TLS handshake) for every email.
+    """
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        _local.connection = connection
+    return connection
+
+
+def close_email_connection():
+    """
+    Close this thread's email connection, e.g. after the server dropped it
+    """
+    connection = getattr(_local, 'connection', None)
+    _local.connection = None
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def send_otp_email(email, username, otp, connection=None):
     """
     Send OTP verification email to the user
     """
-    subject = 'Verify Your Email Address'
-    html_message = render_to_string('user/email/email_verification.html', {
-        'user': user,
+    html_template, text_template = get_email_templates('user/email/email_verification')
+    context = {
+        'user': {'username': username},
         'otp': otp,
         'site_name': 'E-commerce API'
-    })
-    plain_message = strip_tags(html_message)
-    
-    return send_mail(
-        subject,
-        plain_message,
+    }
+
+    message = EmailMultiAlternatives(
+        'Verify Your Email Address',
+        text_template.render(context),
         settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        html_message=html_message,
-        fail_silently=False,
+        [email],
+        connection=connection or get_email_connection(),
     )
+    message.attach_alternative(html_template.render(context), 'text/html')
+    return message.send()
@@ -68,17 +68,10 @@ class UserViewSet(BaseModelViewSet):
         serializer = EmailVerificationSerializer(data=request.data)
         if serializer.is_valid():
             email = serializer.validated_data['email']
-            token = serializer.validated_data['token']
+            user = serializer.validated_data['user']
 
-            # Get the user by email
-            service = self.get_service()
-            user = service.get_by_email(email)
-
-            if not user:
-                return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
-
-            # Verify the email
-            if service.verify_email(user.id, token):
+            # Verify the email; the user row is only written on success
+            if user.verify_email(serializer.validated_data['otp']):
                 return Response({
                     'message': 'Email verified successfully. You can now log in.',
                     'email': email
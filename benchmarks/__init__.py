@@ -0,0 +1,7 @@
+"""
+Load tests for the API: seed a synthetic dataset, drive the real URL
+routes in-process or through gunicorn, report throughput and latency
+percentiles per endpoint and compare them against a stored baseline.
+
+Run with ``python -m benchmarks --help``; see benchmarks/README.md.
+"""
@@ -0,0 +1,131 @@
+"""
+Connection setup cost per request: ``python -m benchmarks.connections``.
+
+Runs the database part of Django's request cycle (close old connections,
+run a query, close old connections) with each connection management mode
+of the settings:
+
+- ``per-request``: CONN_MAX_AGE=0, a new connection for every request
+- ``persistent``: the connection is kept between requests
+- ``health-checked``: kept, and checked at the start of each request
+- ``pool``: a psycopg pool (PostgreSQL with psycopg 3 and psycopg_pool only)
+
+and reports the latency of each, and what the other modes save per request
+compared to opening a new connection.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+MODES = ('per-request', 'persistent', 'health-checked', 'pool')
+# Connections of the benchmark get their own alias, so a pool does not replace the project's
+ALIAS = 'connection-bench'
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.connections', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000, help='Measured requests per mode')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per mode')
+    parser.add_argument('--query', default='SELECT 1', help='Query run by each request')
+    parser.add_argument('--only', action='append', choices=MODES, metavar='MODE',
+                        help='Run only this mode (repeatable)')
+    return parser.parse_args(argv)
+
+
+def database_settings(mode: str) -> Dict:
+    from django.conf import settings
+
+    database = {**settings.DATABASES['default'], 'OPTIONS': dict(settings.DATABASES['default'].get('OPTIONS', {}))}
+    database['OPTIONS'].pop('pool', None)
+    database['CONN_MAX_AGE'] = 0 if mode in ('per-request', 'pool') else None
+    database['CONN_HEALTH_CHECKS'] = mode in ('health-checked', 'pool')
+    if mode == 'pool':
+        database['OPTIONS']['pool'] = {**settings.DB_POOL_OPTIONS, 'min_size': 1, 'max_size': 1}
+    return database
+
+
+def unsupported(mode: str) -> Optional[str]:
+    """
+    Why ``mode`` cannot run against the configured database, if it cannot
+    """
+    from django.db import connection
+
+    if mode != 'pool':
+        return None
+    if connection.vendor != 'postgresql':
+        return f'needs PostgreSQL, not {connection.vendor}'
+    if importlib.util.find_spec('psycopg') is None or importlib.util.find_spec('psycopg_pool') is None:
+        return "needs psycopg 3 with its pool: pip install 'psycopg[binary,pool]'"
+    return None
+
+
+def run_mode(mode: str, count: int, query: str) -> List[float]:
+    """
+    Latencies in seconds of ``count`` simulated requests
+    """
+    from django.db.utils import ConnectionHandler
+
+    # A handler needs a default database; only ALIAS is ever connected
+    connections = ConnectionHandler({'default': database_settings(mode), ALIAS: database_settings(mode)})
+    connection = connections[ALIAS]
+    latencies = []
+    try:
+        for _ in range(count):
+            started = time.perf_counter()
+            # What the request_started and request_finished signals do
+            connection.close_if_unusable_or_obsolete()
+            with connection.cursor() as cursor:
+                cursor.execute(query)
+                cursor.fetchall()
+            connection.close_if_unusable_or_obsolete()
+            latencies.append(time.perf_counter() - started)
+    finally:
+        connection.close()
+        if mode == 'pool':
+            connection.close_pool()
+    return latencies
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+
+    django.setup()
+    from django.conf import settings
+    from django.db import connection
+
+    from . import report
+
+    if connection.vendor == 'sqlite':
+        Path(settings.DATABASES['default']['NAME']).parent.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for mode in args.only or MODES:
+        reason = unsupported(mode)
+        if reason:
+            print(f'Skipping {mode}: {reason}', file=sys.stderr)
+            continue
+        run_mode(mode, args.warmup, args.query)
+        started = time.perf_counter()
+        latencies = run_mode(mode, args.requests, args.query)
+        results.append(report.ScenarioResult.from_latencies(mode, latencies, 0, time.perf_counter() - started))
+
+    print(f'{connection.vendor}, {args.requests} requests per mode running {args.query!r}')
+    print(report.format_table(results))
+    baseline = next((result for result in results if result.name == 'per-request'), None)
+    if baseline is not None:
+        print('\nSaved per request against a new connection (p50):')
+        for result in results:
+            if result is not baseline:
+                print(f'  {result.name}: {baseline.p50_ms - result.p50_ms:.3f} ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""
+Synthetic dataset for benchmark runs, built by the ``seed_data`` command
+with a fixed seed so every run sees the same data.
+"""
+import io
+from typing import Dict
+
+from django.core.management import call_command
+
+# seed_data options per scale
+SCALES: Dict[str, Dict[str, int]] = {
+    'tiny': {'customers': 50, 'vendors': 5, 'categories': 5, 'products': 200, 'orders': 200, 'notifications': 500},
+    'small': {
+        'customers': 500, 'vendors': 20, 'categories': 20, 'products': 5000, 'orders': 5000, 'notifications': 10000,
+    },
+    'medium': {
+        'customers': 5000, 'vendors': 100, 'categories': 50, 'products': 50000, 'orders': 50000,
+        'notifications': 100000,
+    },
+}
+
+
+def seed(scale: str, factor: float = 1.0, seed: int = 42, workers: int = 1) -> str:
+    """
+    Create the dataset in an empty database; returns the command's summary
+    """
+    output = io.StringIO()
+    call_command('seed_data', **SCALES[scale], scale=factor, seed=seed, workers=workers, verbosity=0, stdout=output)
+    return output.getvalue().strip()
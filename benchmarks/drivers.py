@@ -0,0 +1,101 @@
+"""
+Ways of sending requests to the application.
+
+``InProcessDriver`` calls the WSGI handler directly through Django's test
+client (full middleware and URL routing, no sockets). ``GunicornDriver``
+starts gunicorn on a local port and sends real HTTP requests from a pool
+of client threads.
+"""
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.test import Client
+
+# status, seconds
+Result = Tuple[int, float]
+
+
+class InProcessDriver:
+    name = 'inprocess'
+    # The test client shares one database connection
+    max_concurrency = 1
+
+    def __init__(self):
+        self.client = Client(raise_request_exception=False)
+
+    def request(self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes]) -> Result:
+        extra = {f"HTTP_{key.upper().replace('-', '_')}": value for key, value in headers.items()}
+        content_type = extra.pop('HTTP_CONTENT_TYPE', 'application/octet-stream')
+        started = time.perf_counter()
+        response = self.client.generic(method, path, data=body or b'', content_type=content_type, **extra)
+        return response.status_code, time.perf_counter() - started
+
+    def close(self) -> None:
+        pass
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class GunicornDriver:
+    name = 'gunicorn'
+    max_concurrency = None
+
+    def __init__(self, workers: int = 2, threads: int = 1, startup_timeout: float = 30):
+        self.port = _free_port()
+        env = {
+            **os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+            # The settings size the database connection pool from these
+            'GUNICORN_WORKERS': str(workers), 'GUNICORN_THREADS': str(threads),
+        }
+        self.process = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', 'ecommerce_api.wsgi:application',
+                '--bind', f'127.0.0.1:{self.port}', '--workers', str(workers), '--threads', str(threads),
+                '--log-level', 'warning',
+            ],
+            cwd=settings.BASE_DIR, env=env,
+        )
+        self._wait_until_ready(startup_timeout)
+
+    def _wait_until_ready(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with status {self.process.returncode}')
+            try:
+                with socket.create_connection(('127.0.0.1', self.port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.close()
+        raise RuntimeError(f'gunicorn did not start within {timeout}s')
+
+    def request(self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes]) -> Result:
+        # gunicorn's sync workers close the connection after each response
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers={'Host': 'localhost', **headers})
+            response = connection.getresponse()
+            response.read()
+            return response.status, time.perf_counter() - started
+        finally:
+            connection.close()
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
@@ -0,0 +1,107 @@
+"""
+Latency percentiles, result tables and comparison against a baseline.
+"""
+import json
+import math
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    errors: int
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+    @classmethod
+    def from_latencies(cls, name: str, latencies: List[float], errors: int, elapsed: float) -> 'ScenarioResult':
+        values = sorted(seconds * 1000 for seconds in latencies)
+        return cls(
+            name=name,
+            requests=len(values),
+            errors=errors,
+            rps=round(len(values) / elapsed, 2) if elapsed else 0.0,
+            p50_ms=round(percentile(values, 50), 2),
+            p95_ms=round(percentile(values, 95), 2),
+            p99_ms=round(percentile(values, 99), 2),
+            max_ms=round(values[-1], 2) if values else 0.0,
+        )
+
+
+@dataclass
+class Regression:
+    scenario: str
+    metric: str
+    baseline: float
+    current: float
+
+    def __str__(self) -> str:
+        summary = f'{self.scenario}: {self.metric} {self.baseline} -> {self.current}'
+        if not self.baseline:
+            return summary
+        return f'{summary} ({(self.current - self.baseline) / self.baseline * 100:+.1f}%)'
+
+
+COLUMNS = ('scenario', 'requests', 'errors', 'rps', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms')
+
+
+def format_table(results: List[ScenarioResult], baseline: Optional[Dict[str, ScenarioResult]] = None) -> str:
+    rows = []
+    for result in results:
+        row = [result.name, result.requests, result.errors, result.rps,
+               result.p50_ms, result.p95_ms, result.p99_ms, result.max_ms]
+        previous = (baseline or {}).get(result.name)
+        if previous is not None and previous.p95_ms:
+            row[5] = f'{result.p95_ms} ({(result.p95_ms - previous.p95_ms) / previous.p95_ms * 100:+.0f}%)'
+        rows.append([str(value) for value in row])
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(COLUMNS)]
+    lines = ['  '.join(column.ljust(width) for column, width in zip(COLUMNS, widths))]
+    lines.append('  '.join('-' * width for width in widths))
+    lines.extend('  '.join(value.ljust(width) for value, width in zip(row, widths)) for row in rows)
+    return '\n'.join(lines)
+
+
+def compare(results: List[ScenarioResult], baseline: Dict[str, ScenarioResult], tolerance: float) -> List[Regression]:
+    """
+    Scenarios whose p95 latency rose or whose throughput fell by more than
+    ``tolerance`` (a fraction) against the baseline, or that now fail
+    """
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.name)
+        if previous is None:
+            continue
+        if result.p95_ms > previous.p95_ms * (1 + tolerance):
+            regressions.append(Regression(result.name, 'p95_ms', previous.p95_ms, result.p95_ms))
+        if result.rps < previous.rps * (1 - tolerance):
+            regressions.append(Regression(result.name, 'rps', previous.rps, result.rps))
+        if result.errors > previous.errors:
+            regressions.append(Regression(result.name, 'errors', previous.errors, result.errors))
+    return regressions
+
+
+def save(path: Path, results: List[ScenarioResult], metadata: Dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {'metadata': metadata, 'results': [asdict(result) for result in results]}
+    path.write_text(json.dumps(payload, indent=2) + '\n')
+
+
+def load(path: Path) -> Dict[str, ScenarioResult]:
+    payload = json.loads(path.read_text())
+    return {entry['name']: ScenarioResult(**entry) for entry in payload['results']}
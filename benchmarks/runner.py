@@ -0,0 +1,186 @@
+"""
+Command line entry point: ``python -m benchmarks``.
+"""
+import argparse
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__)
+    parser.add_argument('--scale', default='small', help='Dataset size: tiny, small or medium (default: small)')
+    parser.add_argument('--factor', type=float, default=1.0, help='Multiply every row count of the scale')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the dataset and the requests')
+    parser.add_argument('--seed-workers', type=int, default=1, help='Worker processes seeding the dataset')
+    parser.add_argument('--reuse', action='store_true', help='Keep the existing benchmark database')
+    parser.add_argument('--server', choices=('inprocess', 'gunicorn'), default='inprocess')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker')
+    parser.add_argument('--concurrency', type=int, default=4, help='Client threads (gunicorn only)')
+    parser.add_argument('--requests', type=int, default=500, help='Measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per scenario')
+    parser.add_argument('--only', action='append', metavar='SCENARIO', help='Run only this scenario (repeatable)')
+    parser.add_argument('--baseline', type=Path, help='Compare against this results file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed p95/throughput change against the baseline (default: 0.2)')
+    parser.add_argument('--save-baseline', type=Path, metavar='PATH', help='Also write the results to PATH')
+    parser.add_argument('--output', type=Path, help='Results file (default: benchmarks/results/<timestamp>.json)')
+    return parser.parse_args(argv)
+
+
+def setup_django() -> None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+
+    django.setup()
+
+
+def prepare_database(args: argparse.Namespace) -> None:
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+
+    from .dataset import seed
+
+    if args.reuse:
+        call_command('migrate', verbosity=0)
+        return
+    if connection.vendor == 'sqlite':
+        connection.close()
+        database = Path(settings.DATABASES['default']['NAME'])
+        database.parent.mkdir(parents=True, exist_ok=True)
+        database.unlink(missing_ok=True)
+        call_command('migrate', verbosity=0)
+    else:
+        call_command('migrate', verbosity=0)
+        call_command('flush', interactive=False, verbosity=0)
+
+    print(f'{args.scale} x{args.factor}: {seed(args.scale, args.factor, args.seed, args.seed_workers)}')
+
+
+def run_scenario(driver, scenario, rng: random.Random, count: int, concurrency: int):
+    """
+    Send ``count`` requests; returns (latencies, errors, elapsed seconds)
+    """
+    requests = [scenario.build(rng) for _ in range(count)]
+
+    def send(request):
+        try:
+            status, seconds = driver.request(*request)
+        except OSError:
+            return None, False
+        return seconds, status == scenario.expected_status
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            outcomes = list(pool.map(send, requests))
+    else:
+        outcomes = [send(request) for request in requests]
+    elapsed = time.perf_counter() - started
+
+    latencies = [seconds for seconds, ok in outcomes if seconds is not None]
+    errors = sum(1 for _, ok in outcomes if not ok)
+    return latencies, errors, elapsed
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    setup_django()
+
+    import django
+    from django.db import connection
+
+    from . import report
+    from .dataset import SCALES
+    from .drivers import GunicornDriver, InProcessDriver
+    from .scenarios import Actors, build_scenarios
+
+    if args.scale not in SCALES:
+        print(f'Unknown scale {args.scale!r}; choose from {", ".join(SCALES)}', file=sys.stderr)
+        return 2
+
+    prepare_database(args)
+    scenarios = build_scenarios(Actors())
+    if args.only:
+        unknown = set(args.only) - {scenario.name for scenario in scenarios}
+        if unknown:
+            print(f'Unknown scenario(s): {", ".join(sorted(unknown))}', file=sys.stderr)
+            return 2
+        scenarios = [scenario for scenario in scenarios if scenario.name in args.only]
+
+    if args.server == 'gunicorn':
+        # Workers open their own connections
+        connection.close()
+        driver = GunicornDriver(workers=args.workers, threads=args.threads)
+        concurrency = args.concurrency
+    else:
+        driver = InProcessDriver()
+        concurrency = 1
+
+    rng = random.Random(args.seed)
+    results = []
+    try:
+        for scenario in scenarios:
+            run_scenario(driver, scenario, rng, args.warmup, concurrency)
+            latencies, errors, elapsed = run_scenario(driver, scenario, rng, args.requests, concurrency)
+            results.append(report.ScenarioResult.from_latencies(scenario.name, latencies, errors, elapsed))
+    finally:
+        driver.close()
+
+    baseline = report.load(args.baseline) if args.baseline else None
+    print(report.format_table(results, baseline))
+
+    metadata = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'scale': args.scale,
+        'factor': args.factor,
+        'seed': args.seed,
+        'server': driver.name,
+        'workers': args.workers if args.server == 'gunicorn' else 1,
+        'threads': args.threads if args.server == 'gunicorn' else 1,
+        'concurrency': concurrency,
+        'requests': args.requests,
+        'database': connection.vendor,
+        'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+        'pool': bool(connection.settings_dict['OPTIONS'].get('pool')),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+    }
+    output = args.output or RESULTS_DIR / f'{datetime.now():%Y%m%d-%H%M%S}.json'
+    report.save(output, results, metadata)
+    print(f'Results written to {output}')
+    if args.save_baseline:
+        report.save(args.save_baseline, results, metadata)
+        print(f'Baseline written to {args.save_baseline}')
+
+    if baseline is not None:
+        regressions = report.compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:')
+            for regression in regressions:
+                print(f'  {regression}')
+            return 1
+        print(f'\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}')
+    return 0
@@ -0,0 +1,91 @@
+"""
+The endpoints under test. Each scenario builds one request at a time from
+the seeded data, authenticated as the role the endpoint is meant for.
+"""
+import json
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.core.management.commands.seed_data import WORDS
+from apps.product.models import Product
+
+User = get_user_model()
+
+# method, path, headers, body
+Request = Tuple[str, str, Dict[str, str], Optional[bytes]]
+
+MIN_STOCK = 1000
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: Callable[[random.Random], Request]
+    expected_status: int = 200
+
+
+class Actors:
+    """
+    Access tokens for a sample of the seeded customers and vendors
+    """
+
+    def __init__(self, sample_size: int = 50):
+        self.customers = self._tokens(User.Role.CUSTOMER, sample_size)
+        self.vendors = self._tokens(User.Role.VENDOR, sample_size)
+        # Ordered products must be available, with more stock than a run consumes
+        self.products = list(
+            Product.objects.filter(is_available=True, stock__gte=MIN_STOCK).values_list('pk', flat=True)[:1000]
+        )
+        self.product_pages = max(1, Product.objects.filter(is_active=True).count() // 10)
+
+    @staticmethod
+    def _tokens(role: str, sample_size: int) -> List[str]:
+        users = User.objects.filter(role=role).order_by('pk')[:sample_size]
+        return [str(RefreshToken.for_user(user).access_token) for user in users]
+
+    @staticmethod
+    def auth(token: str) -> Dict[str, str]:
+        return {'Authorization': f'Bearer {token}'}
+
+
+def build_scenarios(actors: Actors) -> List[Scenario]:
+    products_url = reverse('product-list')
+    orders_url = reverse('order-list')
+    vendor_orders_url = reverse('order-vendor-orders')
+    unread_url = reverse('notification-unread')
+
+    def product_list(rng):
+        # Mostly the first pages, as real traffic does
+        page = min(actors.product_pages, int(rng.paretovariate(1.5)))
+        return 'GET', f'{products_url}?page={page}', {}, None
+
+    def product_search(rng):
+        return 'GET', f'{products_url}?search={rng.choice(WORDS)}', {}, None
+
+    def order_create(rng):
+        items = [
+            {'product_id': product_id, 'quantity': rng.randint(1, 3)}
+            for product_id in rng.sample(actors.products, rng.randint(1, 3))
+        ]
+        body = json.dumps({'shipping_address': '1 Benchmark Avenue', 'items': items}).encode()
+        headers = {**actors.auth(rng.choice(actors.customers)), 'Content-Type': 'application/json'}
+        return 'POST', orders_url, headers, body
+
+    def vendor_orders(rng):
+        return 'GET', vendor_orders_url, actors.auth(rng.choice(actors.vendors)), None
+
+    def notifications_unread(rng):
+        return 'GET', unread_url, actors.auth(rng.choice(actors.customers)), None
+
+    return [
+        Scenario('product-list', product_list),
+        Scenario('product-search', product_search),
+        Scenario('order-create', order_create, expected_status=201),
+        Scenario('vendor-orders', vendor_orders),
+        Scenario('notifications-unread', notifications_unread),
+    ]
@@ -0,0 +1,52 @@
+"""
+Settings for benchmark runs: the project settings on a dedicated
+database, with throttling off and mail discarded.
+
+BENCH_DB_ENGINE selects the backend ('sqlite' by default, or
+'postgresql' with BENCH_DB_NAME/USER/PASSWORD/HOST/PORT). Connection
+management (DB_CONN_MAX_AGE, DB_POOL, ...) is configured as for the project.
+"""
+import os
+
+from ecommerce_api.settings import *  # noqa: F401,F403
+from ecommerce_api.settings import (
+    BASE_DIR, DB_CONN_HEALTH_CHECKS, DB_CONN_MAX_AGE, DB_POOL, DB_POOL_OPTIONS, REST_FRAMEWORK,
+)
+
+BENCH_DATA_DIR = BASE_DIR / 'benchmarks' / '.data'
+
+if os.environ.get('BENCH_DB_ENGINE', 'sqlite') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('BENCH_DB_NAME', 'ecommerce_bench'),
+            'USER': os.environ.get('BENCH_DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('BENCH_DB_PASSWORD', ''),
+            'HOST': os.environ.get('BENCH_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('BENCH_DB_PORT', '5432'),
+            # DB_CONN_MAX_AGE and DB_POOL apply as in production
+            'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'OPTIONS': {'pool': DB_POOL_OPTIONS} if DB_POOL else {},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('BENCH_DB_NAME', str(BENCH_DATA_DIR / 'bench.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            # Concurrent gunicorn workers wait for the write lock instead of failing:
+            # IMMEDIATE takes it at BEGIN, so a transaction never has to upgrade a read lock
+            'OPTIONS': {'timeout': 30, 'transaction_mode': 'IMMEDIATE'},
+        }
+    }
+
+DEBUG = False
+ALLOWED_HOSTS = ['localhost', '127.0.0.1', 'testserver']
+
+# Measure the application, not the rate limits
+REST_FRAMEWORK = {**REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': []}
+
+EMAIL_BACKEND = 'django.core.mail.backends.dummy.EmailBackend'
@@ -3,38 +3,9 @@
 # Exit on error
 set -e
 
-# Wait for database to be ready
+# Wait for database to be ready, connecting the way the application does
 echo "Waiting for database..."
-python -c "
-import sys
-import time
-import psycopg2
-
-# Maximum number of attempts
-max_attempts = 30
-attempt = 0
-
-while attempt < max_attempts:
-    try:
-        psycopg2.connect(
-            dbname='${DB_NAME}',
-            user='${DB_USER}',
-            password='${DB_PASSWORD}',
-            host='${DB_HOST}',
-            port='${DB_PORT}'
-        )
-        break
-    except psycopg2.OperationalError:
-        attempt += 1
-        print(f'Waiting for database... {attempt}/{max_attempts}')
-        time.sleep(1)
-
-if attempt == max_attempts:
-    print('Database connection failed')
-    sys.exit(1)
-
-print('Database connection established')
-"
+python manage.py wait_for_db --attempts 30 --interval 1
 
 # Apply database migrations
 echo "Applying database migrations..."
@@ -61,6 +61,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # First, so its timings cover the rest of the stack
+    'apps.core.middleware.RequestMetricsMiddleware',
+    # Removed at startup unless PROFILING['ENABLED']
+    'apps.core.middleware.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -105,6 +109,30 @@ DB_PASSWORD = os.environ.get('DB_PASSWORD', '')
 DB_HOST = os.environ.get('DB_HOST', '')
 DB_PORT = os.environ.get('DB_PORT', '')
 
+# Connection management
+# Each thread keeps its connection for DB_CONN_MAX_AGE seconds instead of
+# opening one per request (0 closes it after every request); with health
+# checks, a connection the server dropped meanwhile is replaced before reuse.
+# DB_POOL=True (PostgreSQL with psycopg 3 and psycopg_pool) shares a pool per
+# process instead. A gunicorn worker serves GUNICORN_THREADS requests at once,
+# so that is the pool's maximum size, lowered if needed so that the pools of
+# all GUNICORN_WORKERS workers stay within DB_MAX_CONNECTIONS.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+DB_POOL = os.environ.get('DB_POOL', 'False') == 'True'
+
+GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', 1))
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 1))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0)) or GUNICORN_THREADS
+if os.environ.get('DB_MAX_CONNECTIONS'):
+    DB_POOL_MAX_SIZE = max(1, min(DB_POOL_MAX_SIZE, int(os.environ['DB_MAX_CONNECTIONS']) // GUNICORN_WORKERS))
+DB_POOL_OPTIONS = {
+    'min_size': min(int(os.environ.get('DB_POOL_MIN_SIZE', 1)), DB_POOL_MAX_SIZE),
+    'max_size': DB_POOL_MAX_SIZE,
+    # Seconds a request waits for a free connection before failing
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+}
+
 DATABASES = {
     'default': {
         'ENGINE': DB_ENGINE,
@@ -113,9 +141,28 @@ DATABASES = {
         'PASSWORD': DB_PASSWORD,
         'HOST': DB_HOST,
         'PORT': DB_PORT,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
     }
 }
-
+if DB_POOL and DB_ENGINE == 'django.db.backends.postgresql':
+    # Connections return to the pool at the end of each request
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {'pool': DB_POOL_OPTIONS}
+
+
+# Password hashing
+# PBKDF2 iterations for new and re-hashed passwords (Django's default when unset).
+# Existing hashes are upgraded or downgraded on the next successful login.
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 0)) or None
+
+PASSWORD_HASHERS = [
+    'apps.user.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -163,10 +210,14 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Test runner with an optional report of the performance budgets
+# closest to their limit (manage.py test --budget-report N)
+TEST_RUNNER = 'apps.core.test_runner.BudgetReportRunner'
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.user.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -186,7 +237,18 @@ REST_FRAMEWORK = {
         'anon': '100/day',
         'user': '1000/day'
     },
-    'EXCEPTION_HANDLER': 'apps.core.utils.custom_exception_handler'
+    'EXCEPTION_HANDLER': 'apps.core.utils.custom_exception_handler',
+    # Reverse proxies in front of the app. Throttles and the login limiter key
+    # on the address the last of them appended to X-Forwarded-For; with none,
+    # on REMOTE_ADDR, so a client-supplied header is never trusted.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+# Sliding-window login limits, checked before password hashing. Shared
+# through Redis when REDIS_URL is set, per process otherwise.
+LOGIN_RATE_LIMITS = {
+    'ip': os.environ.get('LOGIN_RATE_LIMIT_IP', '30/min'),
+    'username': os.environ.get('LOGIN_RATE_LIMIT_USERNAME', '10/min'),
 }
 
 # Custom User model
@@ -201,6 +263,12 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@example.com')
 
+# Email verification OTPs (stored in the cache)
+# Minimum seconds between OTP emails to the same user; extra resend requests are ignored
+OTP_RESEND_COOLDOWN = int(os.environ.get('OTP_RESEND_COOLDOWN', 60))
+OTP_EXPIRY_SECONDS = int(os.environ.get('OTP_EXPIRY_SECONDS', 600))
+OTP_MAX_ATTEMPTS = int(os.environ.get('OTP_MAX_ATTEMPTS', 5))
+
 # JWT settings
 from datetime import timedelta
 
@@ -223,6 +291,9 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Seconds an authenticated user's snapshot is cached by CachedJWTAuthentication
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 300))
+
 # Cache settings
 CACHES = {
     'default': {
@@ -233,14 +304,23 @@ CACHES = {
 
 # For production, use Redis/Valkey cache if available
 if os.environ.get('REDIS_URL'):
+    # Redis shared by all workers, fronted by a short-lived in-process LRU whose
+    # entries are invalidated across processes over pub/sub (see apps.core.cache)
     CACHES['default'] = {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'apps.core.cache.TwoTierCache',
         'LOCATION': os.environ.get('REDIS_URL'),
         'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'L1_MAX_ENTRIES': int(os.environ.get('CACHE_L1_MAX_ENTRIES', 1000)),
+            'L1_TIMEOUT': float(os.environ.get('CACHE_L1_TIMEOUT', 5)),
         }
     }
 
+# Full-response cache for public catalog endpoints (apps.core.response_cache).
+# Anonymous responses may also be kept by shared caches (nginx) for
+# RESPONSE_CACHE_SHARED_MAX_AGE seconds; 0 marks every response private.
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60))
+RESPONSE_CACHE_SHARED_MAX_AGE = int(os.environ.get('RESPONSE_CACHE_SHARED_MAX_AGE', 5))
+
 # Celery Configuration
 CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
@@ -275,6 +355,10 @@ LOGGING = {
             'format': '{levelname} {asctime} {message}',
             'style': '{',
         },
+        'message_only': {
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'filters': {
         'require_debug_true': {
@@ -315,22 +399,110 @@ LOGGING = {
             'backupCount': 30,  # Keep logs for 30 days
             'formatter': 'verbose',
         },
+        # Hands records to a background thread that writes both log files,
+        # so file I/O never happens on a request thread
+        'queue': {
+            '()': 'apps.core.log_handlers.QueueListenerHandler',
+            'handlers': ['file', 'error_file'],
+        },
+        # One JSON object per line, for log shippers
+        'access_file': {
+            'level': 'INFO',
+            'class': 'logging.handlers.TimedRotatingFileHandler',
+            'filename': os.path.join(BASE_DIR, 'logs/access.log'),
+            'when': 'midnight',
+            'interval': 1,
+            'backupCount': 30,
+            'formatter': 'message_only',
+        },
+        'access_queue': {
+            '()': 'apps.core.log_handlers.QueueListenerHandler',
+            'handlers': ['access_file'],
+        },
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'],
+            'handlers': ['console', 'queue'],
             'level': 'INFO',
             'propagate': True,
         },
         'django.request': {
-            'handlers': ['mail_admins', 'error_file'],
+            'handlers': ['mail_admins', 'queue'],
             'level': 'ERROR',
             'propagate': False,
         },
+        'apps.core.access': {  # Per-request JSON access log
+            'handlers': ['access_queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
         'apps': {  # Application-specific logger
-            'handlers': ['console', 'file', 'error_file'],
+            'handlers': ['console', 'queue'],
             'level': 'INFO',
             'propagate': False,
         },
     },
 }
+
+# Request logging (apps.core.middleware.RequestLoggingMiddleware).
+# SAMPLE_RATE is the share of successful responses logged; 4xx/5xx are
+# always logged. Bodies and headers are only logged at DEBUG level.
+REQUEST_LOGGING = {
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', 1.0)),
+    'MAX_BODY_LENGTH': 2048,
+    'MASK_FIELDS': ['password', 'password2', 'old_password', 'new_password', 'token', 'refresh', 'access', 'otp'],
+}
+
+# Per-request SQL/cache/serializer timings (apps.core.middleware.RequestMetricsMiddleware),
+# logged as one JSON line per request on the 'apps.core.access' logger. The
+# Server-Timing header exposes them to clients, so it is off by default in production.
+REQUEST_METRICS = {
+    'ACCESS_LOG': os.environ.get('ACCESS_LOG', 'True') == 'True',
+    'SERVER_TIMING': os.environ.get('SERVER_TIMING', str(DEBUG)) == 'True',
+}
+
+# Prometheus metrics (apps.core.metrics), served at /metrics. When set, scrapes
+# must send 'Authorization: Bearer <token>'. Multi-process aggregation is
+# enabled by the PROMETHEUS_MULTIPROC_DIR environment variable, which must be
+# set before the processes start (see gunicorn.conf.py).
+METRICS_AUTH_TOKEN = os.environ.get('METRICS_AUTH_TOKEN', '')
+
+# Span tracing (apps.core.tracing) of every BaseService/BaseRepository public
+# method and of @traced functions, aggregated into per-function Prometheus histograms
+TRACING = {
+    'ENABLED': os.environ.get('TRACING_ENABLED', 'False') == 'True',
+}
+
+# Slow query log (apps.core.slow_queries): statements over THRESHOLD_MS are
+# aggregated by fingerprint into the SlowQuery table (admin, ranked by total
+# time) by a background thread, which also runs EXPLAIN (ANALYZE if
+# EXPLAIN_ANALYZE) on EXPLAIN_SAMPLE_RATE of the slow SELECTs.
+SLOW_QUERY_LOG = {
+    'ENABLED': os.environ.get('SLOW_QUERY_LOG_ENABLED', 'False') == 'True',
+    'THRESHOLD_MS': float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100)),
+    'EXPLAIN_SAMPLE_RATE': float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0.1)),
+    'EXPLAIN_ANALYZE': os.environ.get('SLOW_QUERY_EXPLAIN_ANALYZE', 'False') == 'True',
+    'EXPLAIN_INTERVAL': 3600,
+    'FLUSH_INTERVAL': 5,
+    'MAX_PENDING': 10000,
+}
+
+# Statistical request profiling (apps.core.middleware.ProfilingMiddleware).
+# When enabled, SAMPLE_RATE of the requests plus those sending a signed
+# X-Profile header (manage.py profiles --token) are sampled every INTERVAL_MS
+# and written per route to OUTPUT_DIR as folded stacks every DUMP_INTERVAL seconds.
+PROFILING = {
+    'ENABLED': os.environ.get('PROFILING_ENABLED', 'False') == 'True',
+    'SAMPLE_RATE': float(os.environ.get('PROFILING_SAMPLE_RATE', 0.0)),
+    'INTERVAL_MS': float(os.environ.get('PROFILING_INTERVAL_MS', 5)),
+    'OUTPUT_DIR': os.environ.get('PROFILING_OUTPUT_DIR', BASE_DIR / 'logs' / 'profiles'),
+    'DUMP_INTERVAL': 30,
+    'HEADER_MAX_AGE': 3600,
+    'MAX_DEPTH': 128,
+}
+
+# Order numbers
+# First node ID (0-1023) of this host in generated order numbers: each
+# gunicorn worker adds its index (see gunicorn.conf.py). Hosts sharing a
+# database need values at least GUNICORN_WORKERS apart; 0 when unset.
+ORDER_NUMBER_NODE_ID = int(os.environ['ORDER_NUMBER_NODE_ID']) if os.environ.get('ORDER_NUMBER_NODE_ID') else None
@@ -19,6 +19,7 @@ from django.urls import path, include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from apps.core.metrics import METRICS_ROUTE, metrics_view
 
 # API documentation schema
 schema_view = get_schema_view(
@@ -49,4 +50,7 @@ urlpatterns = [
     # API documentation
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name=METRICS_ROUTE),
 ]
@@ -0,0 +1,46 @@
+"""
+gunicorn settings, loaded automatically from the working directory.
+
+With PROMETHEUS_MULTIPROC_DIR set, every worker writes its metrics to
+mmap'd files in that directory (see apps.core.metrics). Files this host
+left behind in a previous run are removed on start, and the live gauges
+of a worker that exits are retired.
+
+Every worker gets an index unique among the live workers of the server
+(a replacement reuses the index of the worker it replaces), exported as
+GUNICORN_WORKER_INDEX for the order number node IDs (apps.order.utils).
+"""
+import glob
+import os
+import socket
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+# Also read by the settings to size the database connection pool
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# Same as apps.core.metrics.process_identifier(), without importing Django in the master
+HOST = socket.gethostname().replace('_', '-')
+
+
+def on_starting(server):
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for stale in glob.glob(os.path.join(path, f'*_{HOST}-*.db')):
+            os.remove(stale)
+
+
+def pre_fork(server, worker):
+    taken = {getattr(live, 'index', None) for live in server.WORKERS.values()}
+    worker.index = next(index for index in range(len(taken) + 1) if index not in taken)
+
+
+def post_fork(server, worker):
+    os.environ['GUNICORN_WORKER_INDEX'] = str(worker.index)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(f'{HOST}-{worker.pid}')
@@ -1,7 +1,8 @@
-# Run all tests
-python manage.py test apps.user.tests apps.vendor.tests apps.product.tests apps.order.tests apps.notification.tests --keepdb --parallel --failfast
+# Run all tests, then list the 10 performance budgets closest to their limit
+python manage.py test apps.core.tests apps.user.tests apps.vendor.tests apps.product.tests apps.order.tests apps.notification.tests --keepdb --parallel --failfast --budget-report 10
 
 # Run specific app tests (uncomment and modify as needed)
+# python manage.py test apps.core.tests
 # python manage.py test apps.user.tests
 # python manage.py test apps.vendor.tests
 # python manage.py test apps.product.tests